@@ -1,7 +1,14 @@
+import asyncio
+import json
+from typing import Dict, List, Optional, Tuple
 from fastapi import APIRouter, HTTPException, status, Depends
-from backend.services.embedding_service import get_text_embedding
-from backend.services.pinecone_service import retrieve_context_from_pinecone
-from backend.services.llm_model_service import get_health_advice
+from fastapi.responses import StreamingResponse
+from backend.services.embedding_service import get_text_embedding_async
+from backend.services.pinecone_service import retrieve_context_from_pinecone_async
+from backend.services.llm_model_service import get_health_advice_async, stream_health_advice, is_fallback_reply
+from backend.services.response_cache import response_cache, context_fingerprint, RESPONSE_CACHE_ENABLED
+from backend.services.chat_session_service import ConversationSession, SessionLoadError, session_store
+from backend.services.chat_history_writer import chat_history_writer, WriteBufferFull
 from backend.services.schemas import ConversationInput
 from backend.utils import logger
 
@@ -9,6 +16,69 @@ logger = logger.get_logger()
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
+def _extract_user_query(input_data: ConversationInput) -> str:
+    """Returns the latest user query, raising 400 if the conversation does not end with one."""
+    if not input_data.conversation_history:
+        logger.warning("Empty conversation history received.")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Conversation history cannot be empty."
+        )
+
+    last_entry = input_data.conversation_history[-1]
+    user_query = last_entry.get("content")
+
+    if last_entry.get("role") != "user" or not user_query:
+        logger.warning("Invalid or missing user query in conversation history.")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid or missing user query."
+        )
+    return user_query
+
+async def _resolve_conversation(input_data: ConversationInput) -> Tuple[Optional[ConversationSession], List[Dict[str, str]]]:
+    """
+    Returns the server-side session (if any) and the history ending with the user query.
+
+    With `conversation_id` and `message`, the history is the session's already-truncated
+    window plus the new message; otherwise it is the full `conversation_history` sent by the client.
+    """
+    if input_data.conversation_id and input_data.message is not None:
+        if not input_data.message.strip():
+            logger.warning("Empty message received for a session turn.")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid or missing user query."
+            )
+        try:
+            session = await session_store.get(input_data.conversation_id)
+        except SessionLoadError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Chat history is temporarily unavailable. Please try again later."
+            ) from e
+        return session, session.prompt_history() + [{"role": "user", "content": input_data.message}]
+
+    _extract_user_query(input_data)
+    return None, input_data.conversation_history
+
+async def _record_turn(session: ConversationSession, user_query: str, reply: str):
+    """Adds a completed turn to the session and queues it for persistent storage, off the event loop."""
+    start_seq = session.record_turn(user_query, reply)
+    try:
+        await asyncio.to_thread(
+            chat_history_writer.enqueue,
+            session.conversation_id,
+            [{"role": "user", "content": user_query}, {"role": "assistant", "content": reply}],
+            start_seq
+        )
+    except WriteBufferFull as e:
+        logger.error(f"Chat history of conversation {session.conversation_id} not persisted: {e}")
+
+def _sse_event(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
 @router.post("/get-health-advice", response_model=dict, status_code=status.HTTP_200_OK)
 async def get_health_advice_endpoint(input_data: ConversationInput):
     """
@@ -26,18 +96,26 @@ async def get_health_advice_endpoint(input_data: ConversationInput):
        - Ensures the entry is valid and contains a user's question.  
 
     2. **Generate Query Embedding:**  
-       - Uses the `get_text_embedding` service to generate vector embeddings for the extracted query.  
+       - Uses the `get_text_embedding_async` service to generate vector embeddings for the extracted query.  
+       - Concurrent requests are micro-batched into a single model call.  
+       - If a sufficiently similar question was answered after the same recent context,
+         the cached reply is returned right away (`"cached": true`) and steps 3-4 are skipped.  
 
     3. **Retrieve Contextual Information:**  
-       - Uses the `retrieve_context_from_pinecone` service to fetch relevant context 
-         based on the generated embeddings.  
+       - Uses the `retrieve_context_from_pinecone_async` service to fetch relevant context 
+         based on the generated embeddings, on a dedicated thread pool.  
 
     4. **Generate Assistant Reply:**  
        - Passes the extracted query, retrieved context, and full conversation history to the LLM model.  
+       - The request is awaited on the async Groq client, so other conversations proceed meanwhile.  
        - The LLM utilizes this information to provide a context-aware and personalized response.  
 
     ### Request Body
     - **conversation_history** (List[dict]): List of chat entries representing the conversation flow.
+    - **conversation_id** (str, optional) and **message** (str, optional): Session mode. The server keeps
+      the truncated history of the conversation, so the client sends only the new user message and
+      `conversation_history` is ignored. Sessions are seeded from stored chat history after a restart,
+      and each completed turn is queued for storage, so the client does not need to store it.
 
     **Example Request:**
     ```json
@@ -63,6 +141,7 @@ async def get_health_advice_endpoint(input_data: ConversationInput):
     ### Error Handling
     - **400 Bad Request:** Raised if the conversation history is empty or the latest user query is missing/invalid.  
     - **500 Internal Server Error:** Raised if an unexpected error occurs while generating the response.  
+    - **503 Service Unavailable:** Raised in session mode if the stored history cannot be loaded.  
 
     ### Notes
     - Ensure that the conversation history follows a proper role-based structure (`role: "user"` and `role: "assistant"`).  
@@ -70,34 +149,109 @@ async def get_health_advice_endpoint(input_data: ConversationInput):
     - The embedding and context retrieval services are essential to enhance the accuracy of the generated advice.  
     """
 
-    if not input_data.conversation_history:
-        logger.warning("Empty conversation history received.")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Conversation history cannot be empty."
-        )
+    session, conversation_history = await _resolve_conversation(input_data)
+    user_query = conversation_history[-1]["content"]
 
-    last_entry = input_data.conversation_history[-1]
-    user_query = last_entry.get("content")
+    try:
+        query_embeddings = await get_text_embedding_async(user_query)
+        fingerprint = context_fingerprint(conversation_history)
+        generation = response_cache.generation
+        if RESPONSE_CACHE_ENABLED:
+            cached_reply = response_cache.get(query_embeddings, fingerprint)
+            if cached_reply is not None:
+                if session is not None:
+                    await _record_turn(session, user_query, cached_reply)
+                return {"reply": cached_reply, "cached": True}
 
-    if last_entry.get("role") != "user" or not user_query:
-        logger.warning("Invalid or missing user query in conversation history.")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid or missing user query."
+        db_response = await retrieve_context_from_pinecone_async(query_embeddings, query=user_query)
+        assistant_reply = await get_health_advice_async(
+            user_query, db_response, conversation_history, truncate=session is None
         )
+        if not is_fallback_reply(assistant_reply):
+            if RESPONSE_CACHE_ENABLED:
+                response_cache.put(query_embeddings, fingerprint, assistant_reply, generation)
+            if session is not None:
+                await _record_turn(session, user_query, assistant_reply)
+        return {"reply": assistant_reply}
 
-    try:
-        query_embeddings = get_text_embedding(user_query)
-        db_response = retrieve_context_from_pinecone(query_embeddings)
-        assistant_reply = get_health_advice(
-            user_query, db_response, input_data.conversation_history
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error generating response. Please try again later."
         )
-        return {"reply": assistant_reply}
 
+@router.post("/stream-health-advice", status_code=status.HTTP_200_OK)
+async def stream_health_advice_endpoint(input_data: ConversationInput):
+    """
+    Streams health advice token by token as Server-Sent Events.
+
+    ### Overview
+    Same pipeline as `/chat/get-health-advice` (including the semantic response cache;
+    a cached reply is sent as a single token), but the reply is forwarded while the
+    LLM generates it, so the first words reach the user after one retrieval plus
+    the model's time-to-first-token instead of after the full completion.
+
+    ### Request Body
+    - **conversation_history** (List[dict]): List of chat entries representing the conversation flow.
+    - **conversation_id** / **message** (str, optional): Session mode, as in `/chat/get-health-advice`.
+
+    ### Response (`text/event-stream`)
+    ```
+    data: {"token": "You might"}
+
+    data: {"token": " consider"}
+
+    event: done
+    data: {"reply": "You might consider ..."}
+    ```
+
+    ### Error Handling
+    - **400 Bad Request:** Raised if the conversation history is empty or the latest user query is missing/invalid.  
+    - **500 Internal Server Error:** Raised if embedding or context retrieval fails, before the stream starts.  
+    - **503 Service Unavailable:** Raised in session mode if the stored history cannot be loaded.  
+    - LLM errors after the stream started are reported as a final token with a fallback message.
+    """
+    session, conversation_history = await _resolve_conversation(input_data)
+    user_query = conversation_history[-1]["content"]
+
+    try:
+        query_embeddings = await get_text_embedding_async(user_query)
+        fingerprint = context_fingerprint(conversation_history)
+        generation = response_cache.generation
+        cached_reply = response_cache.get(query_embeddings, fingerprint) if RESPONSE_CACHE_ENABLED else None
+        db_response = None
+        if cached_reply is None:
+            db_response = await retrieve_context_from_pinecone_async(query_embeddings, query=user_query)
     except Exception as e:
         logger.error(f"Unexpected error: {e}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error generating response. Please try again later."
         )
+
+    async def events():
+        if cached_reply is not None:
+            if session is not None:
+                await _record_turn(session, user_query, cached_reply)
+            yield _sse_event({"token": cached_reply})
+            yield _sse_event({"reply": cached_reply, "cached": True}, event="done")
+            return
+
+        reply = []
+        async for token in stream_health_advice(user_query, db_response, conversation_history, truncate=session is None):
+            reply.append(token)
+            yield _sse_event({"token": token})
+        reply = "".join(reply)
+        if not is_fallback_reply(reply):
+            if RESPONSE_CACHE_ENABLED:
+                response_cache.put(query_embeddings, fingerprint, reply, generation)
+            if session is not None:
+                await _record_turn(session, user_query, reply)
+        yield _sse_event({"reply": reply}, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,7 +1,11 @@
-from typing import Dict,List, Any, Union
-from fastapi import APIRouter, HTTPException, status, Query
-from backend.services.schemas import ChatHistoryRequest
+import asyncio
+from typing import Dict,List, Any, Optional, Union
+from fastapi import APIRouter, HTTPException, status, Query, Request, Response
+from fastapi.responses import JSONResponse
+from backend.services.schemas import ChatHistoryRequest, ChatHistoryAppendRequest
 from backend.services import supabase_service
+from backend.services.chat_history_writer import chat_history_writer, WriteBufferFull
+from backend.services.chat_history_store import select_range
 from backend.utils import logger
 
 logger = logger.get_logger()
@@ -16,6 +20,9 @@ async def add_chat_history(chat_history: ChatHistoryRequest) -> Dict[str, Any]:
     """
     Save chat conversation history in the database.
 
+    `messages` is the full conversation so far; messages that are already stored are
+    skipped, so only the new ones are written. Use `/chat-history/append` to send only new messages.
+
     **Request Body:**
     - `conversation_id` (str): Unique identifier for the chat session.
     - `messages` (List[Dict[str, str]]): List of messages exchanged during the session.
@@ -49,23 +56,114 @@ async def add_chat_history(chat_history: ChatHistoryRequest) -> Dict[str, Any]:
             detail="Unexpected error occurred. Please try again later."
         )
 
+@router.post('/append', response_model=Dict[str, Any], status_code=status.HTTP_202_ACCEPTED)
+async def append_chat_history(request: ChatHistoryAppendRequest) -> Dict[str, Any]:
+    """
+    Append new messages to a conversation.
+
+    The messages are written to the local write-ahead log and acknowledged right away;
+    a background writer stores them (as one append-only segment per conversation and
+    flush) shortly after. When `start_seq` is given, the append is idempotent: messages
+    whose sequence numbers are already stored are skipped, so retries never duplicate history.
+
+    **Request Body:**
+    - `conversation_id` (str): Unique identifier for the chat session.
+    - `messages` (List[Dict[str, str]]): Messages to append, oldest first.
+    - `start_seq` (int, optional): Sequence number of the first message (0-based).
+
+    **Responses:**
+    - **202 Accepted**: Messages queued; returns `queued` and, with `start_seq`, `next_seq`.
+    - **400 Bad Request**: Input data validation error.
+    - **503 Service Unavailable**: The write buffer is full; retry later.
+    """
+    try:
+        await asyncio.to_thread(
+            chat_history_writer.enqueue,
+            request.conversation_id,
+            request.messages,
+            request.start_seq
+        )
+    except WriteBufferFull as error:
+        logger.error(f"Chat history buffer full while appending to {request.conversation_id}: {error}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Chat history is being saved too slowly. Please try again later."
+        )
+    except (ValueError, TypeError) as error:
+        logger.error(f"Validation error while appending chat history: {error}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(error)
+        )
+    next_seq = request.start_seq + len(request.messages) if request.start_seq is not None else None
+    return {"success": True, "queued": len(request.messages), "next_seq": next_seq}
+
+def _history_etag(message_count: int) -> str:
+    # History is append-only, so its length identifies its content (for a given range)
+    return f'W/"{message_count}"'
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or etag[2:] in tags
+
 @router.get('/retrieve', response_model=Union[Dict[str, Any], None])
 async def get_chat_history(
-    conversation_id: str = Query(..., description="Conversation ID for chat history retrieval")
+    request: Request,
+    conversation_id: str = Query(..., description="Conversation ID for chat history retrieval"),
+    last: Optional[int] = Query(None, ge=0, description="Return only the last N messages"),
+    after_seq: Optional[int] = Query(None, ge=-1, description="Return only messages with a greater sequence number")
 ) -> Union[Dict[str, Any], None]:
     """
     Retrieve stored chat conversation history using a conversation ID.
 
-    **Query Parameter:**
+    Messages still waiting in the write-behind buffer are included. With `last` and/or
+    `after_seq`, only that range is returned and only the storage covering it is read;
+    `message_count` is always the length of the whole conversation.
+
+    The response carries an `ETag`. Send it back in `If-None-Match` to get
+    **304 Not Modified** (checked without reading any message) while the conversation is unchanged.
+
+    **Query Parameters:**
     - `conversation_id` (str): Unique identifier for the chat session.
+    - `last` (int, optional): Return only the last N messages (of those after `after_seq`).
+    - `after_seq` (int, optional): Return only messages with a greater sequence number, e.g. the last `seq` already shown.
 
     **Responses:**
     - **200 OK**: Successfully retrieved the chat history.
+    - **304 Not Modified**: The conversation has not changed since the `If-None-Match` ETag.
     - **404 Not Found**: No chat history found for the provided conversation ID.
     - **500 Internal Server Error**: Unexpected error occurred during retrieval.
     """
     try:
-        chat_history = supabase_service.retrieve_chat_history(conversation_id)
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            counted = await asyncio.to_thread(supabase_service.count_chat_messages, conversation_id)
+            if counted.get('success'):
+                stored_count = counted["message_count"] or 0
+                message_count = stored_count + len(chat_history_writer.pending_after(conversation_id, stored_count))
+                etag = _history_etag(message_count)
+                if message_count and _etag_matches(if_none_match, etag):
+                    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        chat_history = await asyncio.to_thread(supabase_service.retrieve_chat_history, conversation_id, after_seq, last)
+        if chat_history.get('success'):
+            data = chat_history["data"]
+            stored_count = data.get("message_count", len(data.get("messages", [])))
+            pending = chat_history_writer.pending_after(conversation_id, stored_count)
+            data["messages"] = select_range(data.get("messages", []) + pending, after_seq, last)
+            data["message_count"] = stored_count + len(pending)
+        else:
+            pending = chat_history_writer.pending_after(conversation_id, 0)
+            if pending:
+                chat_history = {
+                    "success": True,
+                    "data": {
+                        "conversation_id": conversation_id,
+                        "messages": select_range(pending, after_seq, last),
+                        "metadata": {},
+                        "message_count": len(pending)
+                    }
+                }
 
         if not chat_history.get('success'):
             error_message = chat_history.get('error', "Unknown error occurred.")
@@ -75,7 +173,13 @@ async def get_chat_history(
                 detail=f"Chat history not found for ID: {conversation_id}"
             )
 
-        return chat_history
+        return JSONResponse(
+            content=chat_history,
+            headers={"ETag": _history_etag(chat_history["data"]["message_count"]), "Cache-Control": "no-cache"}
+        )
+
+    except HTTPException:
+        raise
 
     except KeyError as key_error:
         logger.error(f"[500] Missing key in response data for ID {conversation_id}: {key_error}")
@@ -98,13 +202,48 @@ async def get_chat_history(
             detail="Unexpected error occurred while retrieving chat history. Please try again later."
         )
 
+@router.get("/conversations", response_model=Dict[str, Any])
+async def list_conversations(
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of conversations to return"),
+    cursor: Optional[str] = Query(None, description="`next_cursor` from the previous page")
+) -> Dict[str, Any]:
+    """
+    List conversations from the conversation index, newest first, one page at a time.
+
+    Each entry carries the conversation ID, creation time, a preview of the first message
+    and the message count, so no conversation has to be downloaded to list it. Messages
+    still waiting in the write-behind buffer are counted once they are flushed.
+
+    **Query Parameters:**
+    - `limit` (int): Page size (1-100, default 20).
+    - `cursor` (str, optional): Pass `next_cursor` from the previous response to get the next page.
+
+    **Responses:**
+    - **200 OK**: `conversations` and `next_cursor` (`null` on the last page).
+    - **400 Bad Request**: Malformed cursor.
+    - **500 Internal Server Error**: Unexpected error while reading the index.
+    """
+    try:
+        response = await asyncio.to_thread(supabase_service.list_conversation_index, limit, cursor)
+    except ValueError as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+    if not response['success']:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=response.get("error", "Failed to list conversations.")
+        )
+    return {"conversations": response["conversations"], "next_cursor": response["next_cursor"]}
+
 @router.get("/bucket-items", response_model=List[str])
 async def retrieve_bucket_items():
     """
-    API endpoint to retrieve item names from a specified Supabase storage bucket.
+    API endpoint to retrieve the IDs of all stored conversations.
+
+    Lists every conversation in one response; prefer `/chat-history/conversations`,
+    which is paginated and includes a preview of each conversation.
 
     Returns:
-        List[str]: A list of item names with '.json' removed, excluding the last item in the bucket.
+        List[str]: A list of conversation IDs.
 
     Raises:
         HTTPException: If an error occurs while fetching bucket items.
@@ -28,9 +28,11 @@ def upsert_data(request: UpsertRequest):
         }
         ```
 
+        Cached chat replies are invalidated, since they may rely on the previous data.
+
         ### Response:
         - **200:** Data upserted successfully.
-        - **500:** Internal server error.
+        - **500:** Internal server error, or one or more batches failed (listed in `failures`).
     """
     try:
         if not request.data:
@@ -38,7 +40,13 @@ def upsert_data(request: UpsertRequest):
         df = pd.DataFrame(request.data)
         if df.empty:
             raise HTTPException(status_code=400, detail="No valid data provided for upsert.")
-        pinecone_service.upsert_vector_data(df)
+        report = pinecone_service.upsert_vector_data(df)
+        if not report["success"]:
+            logger.error(f"Upsert finished with failed batches: {report['failures']}")
+            return JSONResponse(
+                content={"message": "Some batches failed to upsert.", "failures": report["failures"]},
+                status_code=500
+            )
         return JSONResponse(content={"message": "Data upserted successfully."}, status_code=200)
     except (ValueError, KeyError) as e:
         logger.error(f"Invalid data format: {e}")
@@ -58,6 +66,8 @@ def delete_records(request: DeleteRequest):
     {"ids_to_delete": ["id_123", "id_456"]}
     ```
 
+    Cached chat replies are invalidated, since they may rely on the deleted records.
+
     ### Response:
     - **200:** Records deleted successfully.
     - **400:** No valid IDs provided.
@@ -90,7 +100,8 @@ def fetch_metadata(request: MetadataRequest):
     {
         "prompt": "Tell me about mental health",
         "n_result": 3,
-        "score_threshold": 0.47
+        "score_threshold": 0.47,
+        "rerank": true
     }
     ```
 
@@ -110,7 +121,8 @@ def fetch_metadata(request: MetadataRequest):
             embedding, 
             request.prompt, 
             request.n_result, 
-            request.score_threshold
+            request.score_threshold,
+            pinecone_service.RERANK_ENABLED if request.rerank is None else request.rerank
         )
         if not metadata:
             raise HTTPException(status_code=404, detail="No relevant metadata found.")
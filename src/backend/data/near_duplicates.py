@@ -0,0 +1,209 @@
+import os
+import zlib
+from typing import List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from backend.utils import logger
+
+logger = logger.get_logger()
+
+load_dotenv()
+# Rows whose signatures are kept for matching; bounds memory to about (num_perm * 4 + bands * 16) bytes per row
+NEAR_DUP_MAX_INDEXED = int(os.getenv("NEAR_DUP_MAX_INDEXED", 1_000_000))
+DEFAULT_NUM_PERM = 64
+DEFAULT_SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_BAND_MULTIPLIER = np.uint64(0x100000001B3)
+_INITIAL_CAPACITY = 1024
+
+def _permutations(num_perm: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+    return a, b
+
+def _shingle_hashes(text: str, shingle_size: int) -> np.ndarray:
+    words = text.split()
+    if len(words) <= shingle_size:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    return np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+
+def minhash_signatures(texts: List[str], num_perm: int = DEFAULT_NUM_PERM, shingle_size: int = DEFAULT_SHINGLE_SIZE, seed: int = 1) -> np.ndarray:
+    """
+    Computes MinHash signatures over word shingles.
+
+    The fraction of equal positions in two signatures estimates the Jaccard
+    similarity of the two texts' shingle sets. Hashes are seeded and process
+    independent, so signatures computed in different worker processes compare.
+
+    Args:
+        texts (List[str]): Normalized texts.
+        num_perm (int): Signature length.
+        shingle_size (int): Words per shingle.
+        seed (int): Seed of the hash permutations.
+
+    Returns:
+        np.ndarray: Signatures, shape (len(texts), num_perm), dtype uint32.
+    """
+    a, b = _permutations(num_perm, seed)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    for row, text in enumerate(texts):
+        hashes = _shingle_hashes(text, shingle_size)
+        permuted = np.bitwise_and((np.outer(hashes, a) + b) % _MERSENNE_PRIME, _MAX_HASH)
+        signatures[row] = permuted.min(axis=0)
+    return signatures
+
+def lsh_parameters(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Picks the number of LSH bands and rows per band for a similarity threshold.
+
+    Two signatures share a band with probability 1 - (1 - s^rows)^bands, an S-curve
+    whose midpoint is about (1 / bands)^(1 / rows). The split with the highest
+    midpoint not above the threshold is chosen: candidates are verified against the
+    full signature, so extra candidates only cost time while missed ones are lost.
+
+    Returns:
+        Tuple[int, int]: (bands, rows per band).
+    """
+    splits = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    midpoint = lambda split: (1 / split[0]) ** (1 / split[1])
+    below = [split for split in splits if midpoint(split) <= threshold]
+    return max(below, key=midpoint) if below else min(splits, key=midpoint)
+
+def band_keys(signatures: np.ndarray, bands: int, rows: int) -> np.ndarray:
+    """Hashes each band of each signature to one 64-bit key, shape (n, bands)."""
+    banded = signatures[:, :bands * rows].reshape(len(signatures), bands, rows).astype(np.uint64)
+    keys = np.zeros((len(signatures), bands), dtype=np.uint64)
+    for position in range(rows):
+        keys = keys * _BAND_MULTIPLIER ^ banded[:, :, position]
+    return keys
+
+class NearDuplicateFilter:
+    """
+    Streaming near-duplicate filter based on MinHash and locality-sensitive hashing.
+
+    Rows are offered in order; a row whose estimated Jaccard similarity to an
+    earlier kept row reaches `threshold` is dropped and reported as merged into
+    it. Candidates are found through LSH bands: for each band, a sorted array maps
+    band keys to the first kept row with that key, so a lookup is a binary search
+    and memory grows with kept rows only. Signatures of the last `max_indexed`
+    kept rows are held in a ring buffer and used to confirm candidates; rows that
+    fell out of the window are no longer matched, which caps memory on corpora of
+    any size.
+
+    Args:
+        threshold (float): Minimum estimated Jaccard similarity of a near-duplicate.
+        num_perm (int): Signature length.
+        max_indexed (int): Kept rows available for matching.
+    """
+
+    def __init__(self, threshold: float, num_perm: int = DEFAULT_NUM_PERM, max_indexed: int = NEAR_DUP_MAX_INDEXED):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.max_indexed = max_indexed
+        self.bands, self.rows = lsh_parameters(threshold, num_perm)
+        self._keys = [np.empty(0, dtype=np.uint64) for _ in range(self.bands)]
+        self._ids = [np.empty(0, dtype=np.int64) for _ in range(self.bands)]
+        self._signatures = np.empty((min(_INITIAL_CAPACITY, max_indexed), num_perm), dtype=np.uint32)
+        self._labels = np.empty(len(self._signatures), dtype=np.int64)
+        self._next_id = 0
+        self.checked = 0
+        self.merged = 0
+
+    def _slot(self, row_id: int) -> Optional[int]:
+        if row_id < self._next_id - self.max_indexed:
+            return None
+        return row_id % self.max_indexed
+
+    def _store(self, signature: np.ndarray, label: int) -> int:
+        row_id = self._next_id
+        slot = row_id % self.max_indexed
+        if slot >= len(self._signatures):
+            capacity = min(len(self._signatures) * 2, self.max_indexed)
+            self._signatures = np.resize(self._signatures, (capacity, self.num_perm))
+            self._labels = np.resize(self._labels, capacity)
+        self._signatures[slot] = signature
+        self._labels[slot] = label
+        self._next_id += 1
+        return row_id
+
+    def _index(self, new_keys: List[dict]):
+        low = self._next_id - self.max_indexed
+        for band, entries in enumerate(new_keys):
+            keys, ids = self._keys[band], self._ids[band]
+            if len(keys) > 2 * self.max_indexed:
+                live = ids >= low
+                keys, ids = keys[live], ids[live]
+            if entries:
+                added_keys = np.fromiter(entries.keys(), dtype=np.uint64, count=len(entries))
+                added_ids = np.fromiter(entries.values(), dtype=np.int64, count=len(entries))
+                order = np.argsort(added_keys)
+                positions = np.searchsorted(keys, added_keys[order])
+                keys = np.insert(keys, positions, added_keys[order])
+                ids = np.insert(ids, positions, added_ids[order])
+            self._keys[band], self._ids[band] = keys, ids
+
+    def filter(self, signatures: np.ndarray, labels: List[int]) -> Tuple[np.ndarray, List[dict]]:
+        """
+        Checks a chunk of rows against every kept row, including earlier rows of the chunk.
+
+        Args:
+            signatures (np.ndarray): MinHash signatures of the chunk, shape (n, num_perm).
+            labels (List[int]): Identifier of each row in the report (e.g. its source row).
+
+        Returns:
+            Tuple[np.ndarray, List[dict]]: Boolean mask of the rows to keep, and one
+            `{"row", "duplicate_of", "similarity"}` record per dropped row.
+        """
+        keys = band_keys(signatures, self.bands, self.rows)
+        indexed = []
+        for band in range(self.bands):
+            band_index = self._keys[band]
+            positions = np.minimum(np.searchsorted(band_index, keys[:, band]), max(len(band_index) - 1, 0))
+            found = band_index[positions] == keys[:, band] if len(band_index) else np.zeros(len(keys), dtype=bool)
+            indexed.append(np.where(found, self._ids[band][positions] if len(band_index) else -1, -1))
+        indexed = np.stack(indexed, axis=1)
+
+        keep = np.ones(len(signatures), dtype=bool)
+        merges = []
+        new_keys = [{} for _ in range(self.bands)]
+        for row, signature in enumerate(signatures):
+            candidates = {int(row_id) for row_id in indexed[row] if row_id >= 0}
+            candidates.update(new_keys[band][int(key)] for band, key in enumerate(keys[row]) if int(key) in new_keys[band])
+            best_id, best_similarity = None, 0.0
+            for row_id in candidates:
+                slot = self._slot(row_id)
+                if slot is None:
+                    continue
+                similarity = np.count_nonzero(self._signatures[slot] == signature) / self.num_perm
+                if similarity > best_similarity:
+                    best_id, best_similarity = row_id, similarity
+            if best_id is not None and best_similarity >= self.threshold:
+                keep[row] = False
+                merges.append({
+                    "row": labels[row],
+                    "duplicate_of": int(self._labels[self._slot(best_id)]),
+                    "similarity": round(best_similarity, 3),
+                })
+                continue
+            row_id = self._store(signature, labels[row])
+            for band, key in enumerate(keys[row]):
+                new_keys[band].setdefault(int(key), row_id)
+
+        self._index(new_keys)
+        self.checked += len(signatures)
+        self.merged += len(merges)
+        return keep, merges
+
+    def stats(self) -> dict:
+        return {
+            "threshold": self.threshold,
+            "bands": self.bands,
+            "rows_per_band": self.rows,
+            "checked": self.checked,
+            "merged": self.merged,
+        }
@@ -1,9 +1,14 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from datetime import datetime
 from api_routes.chat_api import router as chat_router
 from api_routes.knowledge_base_api import router as knowledge_base_router
 from api_routes.chat_history_supabase_api import router as chat_history_router
+from backend.services import embedding_service, startup_service
+from backend.services.chat_history_writer import chat_history_writer
 
 description = (
     "Yuvabe Care Companion AI is designed to provide helpful and accurate "
@@ -11,10 +16,31 @@ description = (
     "knowledge bases and maintains chat history for improved user experience."
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts serving immediately and loads the models and vector index according to `STARTUP_MODE`:
+    "background" warms them up in a thread, "eager" waits for them before accepting
+    requests, and "lazy" loads each one on its first use.
+
+    Chat history left in the write-ahead log by a previous run is replayed at startup,
+    and buffered history and embedding cache writes are flushed on shutdown.
+    """
+    chat_history_writer.start()
+    if startup_service.STARTUP_MODE == "eager":
+        await asyncio.to_thread(startup_service.warm_up)
+    elif startup_service.STARTUP_MODE == "background":
+        startup_service.start_background_warmup()
+    yield
+    await asyncio.to_thread(chat_history_writer.close)
+    await asyncio.to_thread(embedding_service.embedding_cache.flush, 10)
+    embedding_service.batcher.stop()
+
 app = FastAPI(
     title="Yuvabe Care Companion AI",
     description=description,
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -22,7 +48,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Cache-Control"],
+    expose_headers=["Cache-Control", "ETag"],
 )
 
 @app.get("/", tags=["Root"], summary="Root Endpoint", response_model=dict)
@@ -33,6 +59,17 @@ def read_root():
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/health/live", tags=["Root"], summary="Liveness Probe", response_model=dict)
+def liveness():
+    """Reports that the process is up; does not wait for models or the vector index."""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+@app.get("/health/ready", tags=["Root"], summary="Readiness Probe", response_model=dict)
+def readiness():
+    """Returns 200 once the embedding model and vector index are loaded, 503 with warm-up progress until then."""
+    report = startup_service.readiness()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
 # Register Routes
 app.include_router(chat_router)
 app.include_router(knowledge_base_router)
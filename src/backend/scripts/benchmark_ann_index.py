@@ -0,0 +1,71 @@
+"""
+Recall-vs-latency benchmark of the IVF index against exact search.
+
+Builds a `LocalVectorIndex` (exact) and an `IVFVectorIndex` over the same vectors,
+runs the same queries against both and reports recall@k and latency for each
+`nprobe` value.
+
+Usage:
+    python -m backend.scripts.benchmark_ann_index --size 200000 --nlist 1024 --nprobe 1 4 16 64
+    python -m backend.scripts.benchmark_ann_index --vectors embeddings.npy --queries 500
+"""
+import argparse
+import time
+import numpy as np
+from backend.services.ann_index import IVFVectorIndex
+from backend.services.local_index import LocalVectorIndex
+
+def _synthetic_vectors(size, dimension, clusters, rng):
+    centers = rng.normal(size=(clusters, dimension))
+    labels = rng.integers(0, clusters, size)
+    return (centers[labels] + 0.6 * rng.normal(size=(size, dimension))).astype(np.float32)
+
+def _timed_queries(index, queries, top_k, **kwargs):
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        response = index.query(vector=query, top_k=top_k, **kwargs)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append({match["id"] for match in response["matches"]})
+    return results, np.asarray(latencies)
+
+def run_benchmark(vectors, queries, top_k, nlist, nprobes):
+    exact, ivf = LocalVectorIndex(dimension=vectors.shape[1]), IVFVectorIndex(dimension=vectors.shape[1], nlist=nlist)
+    batch_size = 10000
+    for start in range(0, len(vectors), batch_size):
+        batch = [(str(i), vectors[i], {}) for i in range(start, min(start + batch_size, len(vectors)))]
+        exact.upsert(vectors=batch)
+        ivf.upsert(vectors=batch, namespace="")
+
+    start = time.perf_counter()
+    ivf.train()
+    print(f"Trained {nlist} lists over {len(vectors)} vectors in {time.perf_counter() - start:.1f}s")
+
+    truth, exact_latency = _timed_queries(exact, queries, top_k)
+    print(f"{'search':>10} {'recall@' + str(top_k):>10} {'mean ms':>9} {'p99 ms':>8}")
+    print(f"{'exact':>10} {1.0:>10.4f} {exact_latency.mean():>9.3f} {np.percentile(exact_latency, 99):>8.3f}")
+    for nprobe in nprobes:
+        found, latency = _timed_queries(ivf, queries, top_k, nprobe=nprobe)
+        recall = np.mean([len(a & b) / max(len(b), 1) for a, b in zip(found, truth)])
+        print(f"{'nprobe=' + str(nprobe):>10} {recall:>10.4f} {latency.mean():>9.3f} {np.percentile(latency, 99):>8.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark IVF recall and latency against exact search.")
+    parser.add_argument("--vectors", help="Path to a .npy matrix of embeddings; synthetic data is used when omitted.")
+    parser.add_argument("--size", type=int, default=100000, help="Number of synthetic vectors.")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.vectors:
+        vectors = np.load(args.vectors).astype(np.float32)
+    else:
+        vectors = _synthetic_vectors(args.size, args.dimension, max(args.nlist // 4, 1), rng)
+    picks = rng.integers(0, len(vectors), args.queries)
+    queries = vectors[picks] + 0.1 * rng.normal(size=(args.queries, vectors.shape[1])).astype(np.float32)
+    run_benchmark(vectors, queries, args.top_k, args.nlist, args.nprobe)
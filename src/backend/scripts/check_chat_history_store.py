@@ -0,0 +1,171 @@
+"""
+Conformance checks for the chat history store backends.
+
+Runs the same checks against any `ChatHistoryStore`, so the Supabase and local
+backends are verified to behave identically (append semantics, idempotent retries,
+gap detection, ordering, range reads, listing, the conversation index and concurrent
+appends), and reports the time
+taken by each operation. Conversations are created under a random prefix, so the
+checks can run against a live bucket without touching real conversations.
+
+Usage:
+    python -m backend.scripts.check_chat_history_store --backend memory
+    python -m backend.scripts.check_chat_history_store --backend sqlite --path /tmp/chat_history.db
+    python -m backend.scripts.check_chat_history_store --backend supabase
+"""
+import argparse
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from backend.services.chat_history_store import ChatHistoryStore
+
+def _messages(prefix, count, offset=0):
+    return [
+        {"role": "user" if (offset + i) % 2 == 0 else "assistant", "content": f"{prefix} message {offset + i}"}
+        for i in range(count)
+    ]
+
+def _contents(store, conversation_id):
+    return [message["content"] for message in store.retrieve(conversation_id)["messages"]]
+
+def check_append_and_retrieve(store, conversation_id):
+    assert store.retrieve(conversation_id) is None, "unknown conversation should retrieve as None"
+    assert store.append(conversation_id, _messages("a", 2), start_seq=0) == {"appended": 2, "next_seq": 2}
+    assert store.append(conversation_id, _messages("a", 1, offset=2)) == {"appended": 1, "next_seq": 3}
+    data = store.retrieve(conversation_id)
+    assert data["conversation_id"] == conversation_id
+    assert [message["seq"] for message in data["messages"]] == [0, 1, 2]
+    assert [message["role"] for message in data["messages"]] == ["user", "assistant", "user"]
+    assert all(message.get("ts") for message in data["messages"]), "every message needs a timestamp"
+    assert data["metadata"].get("conversation_id") == conversation_id and data["metadata"].get("timestamp")
+
+def check_idempotent_retry(store, conversation_id):
+    batch = _messages("r", 2)
+    store.append(conversation_id, batch, start_seq=0)
+    assert store.append(conversation_id, batch, start_seq=0) == {"appended": 0, "next_seq": 2}
+    # A retry that overlaps the stored tail writes only the new part
+    assert store.append(conversation_id, batch[1:] + _messages("r", 1, offset=2), start_seq=1) == {"appended": 1, "next_seq": 3}
+    assert _contents(store, conversation_id) == [message["content"] for message in _messages("r", 3)]
+
+def check_gap_rejected(store, conversation_id):
+    store.append(conversation_id, _messages("g", 1), start_seq=0)
+    try:
+        store.append(conversation_id, _messages("g", 1, offset=5), start_seq=5)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("an append leaving a gap should raise ValueError")
+    assert _contents(store, conversation_id) == [message["content"] for message in _messages("g", 1)]
+
+def check_store_full_history(store, conversation_id):
+    history = _messages("s", 2)
+    store.store(conversation_id, history)
+    history += _messages("s", 2, offset=2)
+    assert store.store(conversation_id, history)["appended"] == 2
+    assert _contents(store, conversation_id) == [message["content"] for message in history]
+
+def check_range_reads(store, conversation_id, size=150):
+    history = _messages("t", size)
+    for start in range(0, size, 3):
+        store.append(conversation_id, history[start:start + 3], start_seq=start)
+    store.compact(conversation_id)
+    expected = [message["content"] for message in history]
+    assert store.count_messages(conversation_id) == size
+    assert store.count_messages(f"{conversation_id}-missing") is None
+
+    def contents(**kwargs):
+        data = store.retrieve(conversation_id, **kwargs)
+        assert data["message_count"] == size, "message_count must cover the whole conversation"
+        return [message["content"] for message in data["messages"]]
+
+    assert contents() == expected
+    assert contents(last=5) == expected[-5:]
+    assert contents(last=0) == []
+    assert contents(last=size * 2) == expected
+    assert contents(after_seq=140) == expected[141:]
+    assert contents(after_seq=-1) == expected
+    assert contents(after_seq=size - 1) == []
+    assert contents(after_seq=10, last=3) == expected[-3:]
+    assert contents(after_seq=145, last=10) == expected[146:]
+
+def check_listing(store, conversation_ids):
+    listed = set(store.list_conversations())
+    missing = [conversation_id for conversation_id in conversation_ids if conversation_id not in listed]
+    assert not missing, f"conversations missing from the listing: {missing}"
+
+def check_conversation_index(store, conversation_ids):
+    entries, cursor = [], None
+    while True:
+        page = store.list_conversation_index(limit=2, cursor=cursor)
+        assert len(page["conversations"]) <= 2
+        entries.extend(page["conversations"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    positions = [(entry["created_at"], entry["conversation_id"]) for entry in entries]
+    assert positions == sorted(positions, reverse=True), "index pages must be ordered newest first without overlap"
+    indexed = {entry["conversation_id"]: entry for entry in entries}
+    for conversation_id in conversation_ids:
+        data = store.retrieve(conversation_id)
+        entry = indexed.get(conversation_id)
+        assert entry is not None, f"{conversation_id} missing from the conversation index"
+        assert entry["message_count"] == len(data["messages"]), f"stale message count for {conversation_id}"
+        assert entry["preview"] == data["messages"][0]["content"][:len(entry["preview"])] and entry["preview"]
+    try:
+        store.list_conversation_index(limit=2, cursor="not a cursor")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("a malformed cursor should raise ValueError")
+
+def check_concurrent_appends(store, conversation_id, writers=8):
+    with ThreadPoolExecutor(max_workers=writers) as executor:
+        list(executor.map(lambda i: store.append(conversation_id, [{"role": "user", "content": f"writer {i}"}]), range(writers)))
+    data = store.retrieve(conversation_id)
+    assert [message["seq"] for message in data["messages"]] == list(range(writers)), "concurrent appends must not collide"
+    assert sorted(message["content"] for message in data["messages"]) == sorted(f"writer {i}" for i in range(writers))
+
+def run_conformance_checks(store: ChatHistoryStore, prefix: str = None) -> dict:
+    """
+    Runs every check against `store` and returns the elapsed milliseconds per check.
+
+    Raises:
+        AssertionError: On the first check the store fails.
+    """
+    prefix = prefix or f"conformance-{uuid.uuid4().hex[:8]}"
+    checks = [
+        ("append_and_retrieve", check_append_and_retrieve),
+        ("idempotent_retry", check_idempotent_retry),
+        ("gap_rejected", check_gap_rejected),
+        ("store_full_history", check_store_full_history),
+        ("range_reads", check_range_reads),
+        ("concurrent_appends", check_concurrent_appends),
+    ]
+    timings, conversation_ids = {}, []
+    for name, check in checks:
+        conversation_id = f"{prefix}-{name}"
+        conversation_ids.append(conversation_id)
+        start = time.perf_counter()
+        check(store, conversation_id)
+        timings[name] = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    check_listing(store, conversation_ids)
+    timings["listing"] = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    check_conversation_index(store, conversation_ids)
+    timings["conversation_index"] = (time.perf_counter() - start) * 1000
+    return timings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the chat history store conformance checks.")
+    parser.add_argument("--backend", choices=["memory", "sqlite", "supabase"], default="memory")
+    parser.add_argument("--path", default=None, help="SQLite database file (sqlite backend only).")
+    args = parser.parse_args()
+
+    from backend.services.supabase_service import SQLiteChatHistoryStore, create_chat_history_store
+    store = SQLiteChatHistoryStore(args.path) if args.backend == "sqlite" and args.path else create_chat_history_store(args.backend)
+
+    timings = run_conformance_checks(store)
+    print(f"{type(store).__name__}: all checks passed")
+    for name, elapsed in timings.items():
+        print(f"  {name:<22} {elapsed:8.2f} ms")
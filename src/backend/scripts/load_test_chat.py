@@ -0,0 +1,75 @@
+"""
+Load test of the chat endpoint at increasing concurrency.
+
+Sends `--requests` chat requests per concurrency level to a running API and
+reports throughput and latency percentiles for each level. With a non-blocking
+endpoint, throughput grows with concurrency until the LLM or vector store
+becomes the bottleneck; a blocking endpoint stays flat at ~1/latency.
+
+Usage:
+    python -m backend.scripts.load_test_chat --url http://localhost:8000 --concurrency 1 4 16 64
+    python -m backend.scripts.load_test_chat --requests 200 --query "How can I sleep better?"
+"""
+import argparse
+import asyncio
+import time
+import httpx
+import numpy as np
+
+QUERIES = [
+    "I've been feeling tired lately. What should I do?",
+    "What are common symptoms of dehydration?",
+    "How can I lower my blood pressure naturally?",
+    "Is it safe to exercise with a mild cold?",
+    "What foods are rich in iron?",
+]
+
+async def _send(client, url, query, latencies, errors):
+    payload = {"conversation_history": [{"role": "user", "content": query}]}
+    start = time.perf_counter()
+    try:
+        response = await client.post(url, json=payload)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+    except Exception as e:
+        errors.append(str(e))
+
+async def run_level(base_url, concurrency, total_requests, queries, timeout):
+    url = f"{base_url.rstrip('/')}/chat/get-health-advice"
+    latencies, errors = [], []
+    slots = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        async def worker(position):
+            async with slots:
+                await _send(client, url, queries[position % len(queries)], latencies, errors)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(position) for position in range(total_requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies = np.asarray(latencies) if latencies else np.zeros(1)
+    return {
+        "concurrency": concurrency,
+        "completed": total_requests - len(errors),
+        "errors": len(errors),
+        "throughput": (total_requests - len(errors)) / elapsed,
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure chat endpoint throughput at increasing concurrency.")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level.")
+    parser.add_argument("--query", action="append", help="Query to send (repeatable). Defaults to a built-in set.")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    print(f"{'concurrency':>11} {'ok':>6} {'errors':>6} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for concurrency in args.concurrency:
+        result = asyncio.run(run_level(args.url, concurrency, args.requests, args.query or QUERIES, args.timeout))
+        print(f"{result['concurrency']:>11} {result['completed']:>6} {result['errors']:>6} "
+              f"{result['throughput']:>8.2f} {result['p50']:>9.1f} {result['p99']:>9.1f}")
@@ -0,0 +1,247 @@
+import os
+from typing import List, Optional
+import numpy as np
+from dotenv import load_dotenv
+from backend.services.local_index import LocalVectorIndex, NamespaceStore, normalize_rows
+from backend.utils import logger
+
+logger = logger.get_logger()
+
+load_dotenv()
+ANN_NLIST = int(os.getenv("ANN_NLIST", 1024))
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", 16))
+TRAINING_POINTS_PER_LIST = 39
+MAX_TRAINING_POINTS_PER_LIST = 256
+KMEANS_ITERATIONS = 10
+ASSIGNMENT_CHUNK_SIZE = 65536
+
+CENTROIDS_FILE = "ivf_centroids.npy"
+ASSIGNMENTS_FILE = "ivf_assignments.i32"
+
+def _nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGNMENT_CHUNK_SIZE):
+        chunk = vectors[start:start + ASSIGNMENT_CHUNK_SIZE]
+        labels[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return labels
+
+def spherical_kmeans(data: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """
+    Clusters unit-length vectors with k-means on cosine similarity.
+
+    Args:
+        data (np.ndarray): Unit-length training vectors, shape (n, dimension).
+        k (int): Number of clusters.
+        iterations (int): Number of Lloyd iterations.
+        seed (int): Seed for centroid initialisation.
+
+    Returns:
+        np.ndarray: Unit-length centroids, shape (k, dimension).
+    """
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _nearest_centroids(data, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, data)
+        empty = np.bincount(labels, minlength=k) == 0
+        if empty.any():
+            sums[empty] = data[rng.choice(len(data), int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+class IVFNamespaceStore(NamespaceStore):
+    """
+    Namespace store with an inverted-file (IVF) index over its rows.
+
+    Vectors are partitioned by a spherical k-means coarse quantizer into `nlist` lists;
+    a query scans only the `nprobe` lists whose centroids are closest to it. Until
+    enough vectors exist to train the quantizer, queries fall back to exact search.
+    New vectors are assigned to their nearest list on insert, deletes are filtered by
+    the tombstone mask, and compaction rebuilds the lists.
+    """
+
+    def __init__(self, dimension: int, directory: Optional[str] = None, nlist: int = ANN_NLIST, nprobe: int = ANN_NPROBE):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.full(0, -1, dtype=np.int32)
+        self.lists: List[List[int]] = []
+        self._list_arrays: dict = {}
+        self._suspended = False
+        super().__init__(dimension, directory, auto_compact=False)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def upsert(self, records: List[tuple]) -> List[int]:
+        rows = super().upsert(records)
+        if self._suspended or not rows:
+            return rows
+        if self.is_trained:
+            self._assign(np.asarray(rows, dtype=np.int64))
+        elif self.size >= self.nlist * TRAINING_POINTS_PER_LIST:
+            self.train()
+        return rows
+
+    def delete(self, ids: List[str]):
+        super().delete(ids)
+        if self.needs_compaction:
+            self.compact()
+
+    def train(self):
+        """Trains the coarse quantizer on the stored vectors and rebuilds every list."""
+        live_rows = np.flatnonzero(self.alive[:self.count])
+        if len(live_rows) < self.nlist:
+            raise ValueError(f"At least {self.nlist} vectors are needed to train {self.nlist} lists.")
+        rng = np.random.default_rng(0)
+        sample_size = min(len(live_rows), self.nlist * MAX_TRAINING_POINTS_PER_LIST)
+        sample = np.sort(rng.choice(live_rows, sample_size, replace=False))
+        logger.info(f"Training IVF quantizer with {self.nlist} lists on {sample_size} vectors...")
+        self.centroids = spherical_kmeans(np.asarray(self.matrix[sample], dtype=np.float32), self.nlist)
+        self._rebuild_lists()
+        if self.directory:
+            np.save(os.path.join(self.directory, CENTROIDS_FILE), self.centroids)
+
+    def query(self, vector: List[float], top_k: int, nprobe: Optional[int] = None, **kwargs) -> List[tuple]:
+        if not self.is_trained:
+            return super().query(vector, top_k)
+        if self.size == 0 or top_k <= 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        probed = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        candidates = np.concatenate([self._list_array(list_id) for list_id in probed])
+        if self.deleted:
+            candidates = candidates[self.alive[candidates]]
+        if len(candidates) == 0:
+            return []
+
+        scores = self.matrix[candidates] @ query
+        top_k = min(top_k, len(candidates))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [(self.ids[row], float(scores[position]), self.metadata[row]) for row, position in zip(candidates[best], best)]
+
+    def compact(self):
+        self._suspended = True
+        try:
+            super().compact()
+        finally:
+            self._suspended = False
+        if self.is_trained:
+            self._rebuild_lists()
+
+    def _list_array(self, list_id: int) -> np.ndarray:
+        array = self._list_arrays.get(list_id)
+        if array is None:
+            array = self._list_arrays[list_id] = np.asarray(self.lists[list_id], dtype=np.int64)
+        return array
+
+    def _grow_assignments(self):
+        if len(self.assignments) < self.count:
+            grown = np.full(max(self.count, len(self.assignments) * 2), -1, dtype=np.int32)
+            grown[:len(self.assignments)] = self.assignments
+            self.assignments = grown
+
+    def _assign(self, rows: np.ndarray):
+        self._grow_assignments()
+        labels = _nearest_centroids(np.asarray(self.matrix[rows], dtype=np.float32), self.centroids)
+        for row, label in zip(rows.tolist(), labels.tolist()):
+            previous = int(self.assignments[row])
+            if previous == label:
+                continue
+            if previous >= 0:
+                self.lists[previous].remove(row)
+                self._list_arrays.pop(previous, None)
+            self.lists[label].append(row)
+            self._list_arrays.pop(label, None)
+            self.assignments[row] = label
+        self._append_assignments(rows, labels)
+
+    def _rebuild_lists(self):
+        live_rows = np.flatnonzero(self.alive[:self.count])
+        self.assignments = np.full(self.count, -1, dtype=np.int32)
+        self.lists = [[] for _ in range(self.nlist)]
+        self._list_arrays = {}
+        if len(live_rows):
+            self.assignments[live_rows] = _nearest_centroids(np.asarray(self.matrix[live_rows], dtype=np.float32), self.centroids)
+            self._fill_lists(live_rows)
+        if self.directory:
+            path = os.path.join(self.directory, ASSIGNMENTS_FILE)
+            if os.path.exists(path):
+                os.remove(path)
+            self._append_assignments(live_rows, self.assignments[live_rows])
+
+    def _fill_lists(self, rows: np.ndarray):
+        labels = self.assignments[rows]
+        order = np.argsort(labels, kind="stable")
+        boundaries = np.searchsorted(labels[order], np.arange(self.nlist + 1))
+        for list_id in range(self.nlist):
+            self.lists[list_id] = rows[order[boundaries[list_id]:boundaries[list_id + 1]]].tolist()
+
+    def _append_assignments(self, rows: np.ndarray, labels: np.ndarray):
+        if not self.directory or len(rows) == 0:
+            return
+        pairs = np.column_stack([rows, labels]).astype(np.int32)
+        with open(os.path.join(self.directory, ASSIGNMENTS_FILE), "ab") as file:
+            pairs.tofile(file)
+
+    def _load(self):
+        super()._load()
+        centroids_path = os.path.join(self.directory, CENTROIDS_FILE)
+        if not os.path.exists(centroids_path):
+            return
+        self.centroids = np.load(centroids_path)
+        self.nlist = len(self.centroids)
+        self.assignments = np.full(self.count, -1, dtype=np.int32)
+        assignments_path = os.path.join(self.directory, ASSIGNMENTS_FILE)
+        if os.path.exists(assignments_path):
+            pairs = np.fromfile(assignments_path, dtype=np.int32).reshape(-1, 2)
+            pairs = pairs[pairs[:, 0] < self.count]
+            # The file is append-only: keep the last assignment written for each row
+            rows, last_positions = np.unique(pairs[::-1, 0], return_index=True)
+            self.assignments[rows] = pairs[::-1, 1][last_positions]
+
+        live_rows = np.flatnonzero(self.alive[:self.count])
+        unassigned = live_rows[self.assignments[live_rows] < 0]
+        if len(unassigned):
+            self.assignments[unassigned] = _nearest_centroids(np.asarray(self.matrix[unassigned], dtype=np.float32), self.centroids)
+            self._append_assignments(unassigned, self.assignments[unassigned])
+        self.lists = [[] for _ in range(self.nlist)]
+        self._fill_lists(live_rows)
+
+class IVFVectorIndex(LocalVectorIndex):
+    """
+    Local approximate nearest-neighbour index (IVF) for large corpora.
+
+    Serves the same `query/upsert/delete` calls as `LocalVectorIndex`, persists to the
+    same directory layout plus the trained centroids and list assignments, and accepts
+    an `nprobe` keyword in `query` to trade recall for latency per request.
+
+    Args:
+        path (Optional[str]): Directory for persistent storage.
+        dimension (int): Vector dimension.
+        nlist (int): Number of inverted lists (clusters).
+        nprobe (int): Default number of lists scanned per query.
+
+    Example:
+        >>> index = IVFVectorIndex("vector-db", nlist=1024, nprobe=16)
+        >>> index.query(vector=embedding, top_k=3, namespace="ns", include_metadata=True, nprobe=32)
+    """
+
+    def __init__(self, path: Optional[str] = None, dimension: int = 384, nlist: int = ANN_NLIST, nprobe: int = ANN_NPROBE):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        super().__init__(path, dimension)
+
+    def _create_store(self, directory: Optional[str]) -> IVFNamespaceStore:
+        return IVFNamespaceStore(self.dimension, directory, self.nlist, self.nprobe)
+
+    def train(self, namespace: str = ""):
+        """Trains (or retrains) the quantizer of a namespace on its current vectors."""
+        with self._lock:
+            self._namespace(namespace).train()
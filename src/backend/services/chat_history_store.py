@@ -0,0 +1,154 @@
+import os
+import json
+import base64
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+LLM_MODEL_NAME = os.getenv('LLM_MODEL_NAME')
+# Characters of the first message kept in the conversation index
+PREVIEW_CHARS = 100
+
+class ChatHistoryStore(ABC):
+    """
+    Interface shared by the chat history storage backends.
+
+    A conversation is an ordered list of messages numbered from 0 by sequence number
+    (`seq`), plus metadata written when the conversation is created. Retrieved
+    conversations are dictionaries of the form::
+
+        {"conversation_id": str,
+         "messages": [{"seq": int, "role": str, "content": str, "ts": str}],
+         "metadata": {"conversation_id": str, "timestamp": str, "language": str, "model": str},
+         "message_count": int}
+
+    `message_count` is the length of the whole conversation, also when `retrieve`
+    returns only a range of it.
+
+    Every backend also maintains a conversation index, updated on each append, with
+    one entry per conversation::
+
+        {"conversation_id": str, "created_at": str, "preview": str, "message_count": int}
+
+    so conversations can be listed page by page without reading their messages.
+
+    Backends raise their own exceptions on storage errors; `supabase_service` turns
+    them into the `{"success": False, "error": ...}` responses used by the API.
+    """
+
+    @abstractmethod
+    def append(self, conversation_id: str, messages: List[Dict[str, str]], start_seq: Optional[int] = None) -> dict:
+        """
+        Appends messages to a conversation, creating it if needed.
+
+        With `start_seq` (the sequence number of the first message), messages that are
+        already stored are skipped, so retrying an append never duplicates history.
+        Without it, the messages are appended after the last stored one.
+
+        Returns:
+            dict: `appended` (number of messages written) and `next_seq`.
+
+        Raises:
+            ValueError: If `start_seq` is beyond the end of the stored conversation.
+        """
+
+    @abstractmethod
+    def retrieve(self, conversation_id: str, after_seq: Optional[int] = None, last: Optional[int] = None) -> Optional[dict]:
+        """
+        Returns the conversation ordered by sequence number, or `None` if it does not exist.
+
+        Backends read only the part of the conversation the range covers.
+
+        Args:
+            conversation_id (str): Unique identifier for the conversation.
+            after_seq (Optional[int]): Return only messages with a greater sequence number.
+            last (Optional[int]): Return only the last `last` of the selected messages.
+        """
+
+    @abstractmethod
+    def count_messages(self, conversation_id: str) -> Optional[int]:
+        """Returns the number of messages of a conversation without reading them, or `None` if it does not exist."""
+
+    @abstractmethod
+    def list_conversations(self) -> List[str]:
+        """Returns the IDs of all stored conversations, sorted."""
+
+    @abstractmethod
+    def list_conversation_index(self, limit: int, cursor: Optional[str] = None) -> dict:
+        """
+        Returns one page of the conversation index, newest conversation first.
+
+        Args:
+            limit (int): Maximum number of entries.
+            cursor (Optional[str]): `next_cursor` of the previous page; `None` for the first page.
+
+        Returns:
+            dict: `conversations` (index entries) and `next_cursor` (`None` on the last page).
+
+        Raises:
+            ValueError: If `cursor` is malformed.
+        """
+
+    def store(self, conversation_id: str, messages: List[Dict[str, str]]) -> dict:
+        """Stores a conversation given as the full list of its messages; only the new tail is written."""
+        return self.append(conversation_id, messages, start_seq=0)
+
+    def compact(self, conversation_id: str) -> int:
+        """
+        Merges the pieces a conversation is stored in, for backends that store it in pieces.
+
+        Returns:
+            int: Number of pieces merged (0 if there was nothing to do).
+        """
+        return 0
+
+def conversation_metadata(conversation_id: str, created_at: Optional[str] = None) -> dict:
+    """Returns the metadata stored with a new conversation."""
+    return {
+        "conversation_id": conversation_id,
+        "timestamp": created_at or datetime.now().isoformat(),
+        "language": "en",
+        "model": LLM_MODEL_NAME
+    }
+
+def message_record(seq: int, message: Dict[str, str], now: str) -> dict:
+    """Returns the stored form of a message: its sequence number, role, content and timestamp."""
+    return {"seq": seq, "role": message.get('role'), "content": message.get('content', ''), "ts": message.get('ts', now)}
+
+def select_range(messages: List[dict], after_seq: Optional[int] = None, last: Optional[int] = None) -> List[dict]:
+    """Applies the `after_seq` / `last` range of `ChatHistoryStore.retrieve` to messages ordered by sequence number."""
+    if after_seq is not None:
+        messages = [message for message in messages if message["seq"] > after_seq]
+    if last is not None:
+        messages = messages[-last:] if last > 0 else []
+    return messages
+
+def conversation_preview(messages: List[Dict[str, str]]) -> str:
+    """Returns the start of the first message, shown when listing conversations."""
+    return (messages[0].get('content') or '').strip()[:PREVIEW_CHARS] if messages else ''
+
+def encode_cursor(entry: dict) -> str:
+    """Returns the opaque cursor pointing after an index entry (ordering is by creation time, then ID)."""
+    position = json.dumps([entry["created_at"], entry["conversation_id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(position.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Returns the (created_at, conversation_id) position encoded in a cursor.
+
+    Raises:
+        ValueError: If the cursor was not produced by `encode_cursor`.
+    """
+    try:
+        created_at, conversation_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(created_at), str(conversation_id)
+    except Exception:
+        raise ValueError("Invalid cursor.")
+
+def index_page(entries: List[dict], limit: int) -> dict:
+    """Builds an index page from up to `limit + 1` entries, the extra one telling whether more pages exist."""
+    page = entries[:limit]
+    next_cursor = encode_cursor(page[-1]) if len(entries) > limit and page else None
+    return {"conversations": page, "next_cursor": next_cursor}
@@ -0,0 +1,348 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+from dotenv import load_dotenv
+from backend.utils import logger
+
+logger = logger.get_logger()
+
+load_dotenv()
+CHAT_HISTORY_WAL_PATH = os.getenv("CHAT_HISTORY_WAL_PATH", "src/backend/data/chat_history.wal")
+CHAT_HISTORY_BUFFER_MAX = int(os.getenv("CHAT_HISTORY_BUFFER_MAX", 10000))
+CHAT_HISTORY_FLUSH_INTERVAL = float(os.getenv("CHAT_HISTORY_FLUSH_INTERVAL", 2.0))
+CHAT_HISTORY_FLUSH_BATCH = int(os.getenv("CHAT_HISTORY_FLUSH_BATCH", 64))
+CHAT_HISTORY_WAL_FSYNC = os.getenv("CHAT_HISTORY_WAL_FSYNC", "true").lower() == "true"
+# Longest delay between retries of a conversation whose flush keeps failing
+MAX_RETRY_BACKOFF = 60.0
+
+class WriteBufferFull(Exception):
+    """Raised when the write-behind buffer holds `max_pending` messages and cannot accept more."""
+
+class ChatHistoryWriter:
+    """
+    Write-behind buffer for chat history appends.
+
+    `enqueue` records the append in a local write-ahead log (JSONL, optionally fsynced)
+    and returns immediately. A background worker flushes the buffered appends every
+    `flush_interval` seconds, or as soon as `flush_batch` conversations are waiting,
+    with one `append_fn` call per conversation: consecutive appends to the same
+    conversation are coalesced into a single batch. After every flush cycle the log
+    is rewritten to hold only what is still pending, and on start the log is replayed,
+    so acknowledged messages survive a crash. Appends carry `start_seq`, which makes a
+    replayed append that had already reached storage a no-op.
+
+    Args:
+        append_fn (Callable): `append_fn(conversation_id, messages, start_seq)` returning a dict with `success`.
+        wal_path (Optional[str]): Location of the write-ahead log; `None` keeps the buffer in memory only.
+        max_pending (int): Maximum number of buffered messages.
+        flush_interval (float): Seconds between flush cycles.
+        flush_batch (int): Number of waiting conversations that triggers an early flush.
+        fsync (bool): fsync the log after every append.
+
+    Example:
+        >>> writer = ChatHistoryWriter(supabase_service.append_chat_messages)
+        >>> writer.enqueue("conversation-1", [{"role": "user", "content": "Hi"}], start_seq=0)
+        >>> writer.close()
+    """
+
+    def __init__(self, append_fn: Callable[[str, list, Optional[int]], dict], wal_path: Optional[str] = CHAT_HISTORY_WAL_PATH,
+                 max_pending: int = CHAT_HISTORY_BUFFER_MAX, flush_interval: float = CHAT_HISTORY_FLUSH_INTERVAL,
+                 flush_batch: int = CHAT_HISTORY_FLUSH_BATCH, fsync: bool = CHAT_HISTORY_WAL_FSYNC):
+        self.append_fn = append_fn
+        self.wal_path = wal_path
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.fsync = fsync
+        self.flushed_messages = 0
+        self.failed_flushes = 0
+        self._pending: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self._inflight: Dict[str, List[dict]] = {}
+        self._retry_at: Dict[str, float] = {}
+        self._failures: Dict[str, int] = {}
+        self._pending_count = 0
+        self._condition = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._wal = None
+        self._stopping = False
+        self._flush_requested = False
+        self._cycles_started = 0
+        self._cycles_finished = 0
+        self._last_cycle_failed = False
+
+    def start(self):
+        """Replays the write-ahead log and starts the background worker (idempotent)."""
+        with self._condition:
+            if self._worker is not None:
+                return
+            self._stopping = False
+            self._replay()
+            self._worker = threading.Thread(target=self._run, name="chat-history-writer", daemon=True)
+            self._worker.start()
+
+    def enqueue(self, conversation_id: str, messages: List[dict], start_seq: Optional[int] = None):
+        """
+        Buffers an append and makes it durable in the write-ahead log.
+
+        Args:
+            conversation_id (str): Unique identifier for the conversation.
+            messages (List[dict]): Messages to append, oldest first.
+            start_seq (Optional[int]): Sequence number of the first message.
+
+        Raises:
+            WriteBufferFull: If the buffer already holds `max_pending` messages.
+        """
+        if not messages:
+            return
+        self.start()
+        batch = {"start_seq": start_seq, "messages": [{"role": message.get("role"), "content": message.get("content", "")} for message in messages]}
+        with self._condition:
+            if self._pending_count + len(batch["messages"]) > self.max_pending:
+                raise WriteBufferFull(f"Chat history buffer is full ({self._pending_count} messages pending).")
+            self._write_wal(conversation_id, batch)
+            self._pending_count += self._add(self._pending, conversation_id, batch)
+            if len(self._pending) >= self.flush_batch:
+                self._condition.notify_all()
+
+    def pending_messages(self, conversation_id: str, stored_messages: List[dict]) -> List[dict]:
+        """
+        Returns `stored_messages` followed by the buffered messages not stored yet.
+
+        Lets readers see their own writes before the buffer is flushed. Returned
+        buffered messages carry a `seq` like stored ones.
+        """
+        return list(stored_messages) + self.pending_after(conversation_id, len(stored_messages))
+
+    def pending_after(self, conversation_id: str, stored_count: int) -> List[dict]:
+        """
+        Returns the buffered messages that follow the first `stored_count` stored messages.
+
+        Args:
+            conversation_id (str): Unique identifier for the conversation.
+            stored_count (int): Number of messages of the conversation already in storage.
+
+        Returns:
+            List[dict]: Buffered messages with their `seq`, oldest first.
+        """
+        with self._condition:
+            batches = self._inflight.get(conversation_id, []) + self._pending.get(conversation_id, [])
+        messages, next_seq = [], stored_count
+        for batch in batches:
+            start_seq = batch["start_seq"] if batch["start_seq"] is not None else next_seq
+            for message in batch["messages"][max(next_seq - start_seq, 0):]:
+                messages.append({**message, "seq": next_seq})
+                next_seq += 1
+        return messages
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Runs a flush cycle now and waits for it.
+
+        Returns:
+            bool: True if everything buffered before the call was stored, False on failure or timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            if self._worker is None:
+                return not self._pending
+            target_cycle = self._cycles_started + 1
+            self._flush_requested = True
+            self._retry_at.clear()
+            self._condition.notify_all()
+            while self._cycles_finished < target_cycle:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return not self._last_cycle_failed
+
+    def close(self, timeout: Optional[float] = 30.0):
+        """Flushes what can be flushed within `timeout`, then stops the worker; the rest stays in the log."""
+        if self._worker is None:
+            return
+        if not self.flush(timeout):
+            logger.warning(f"Chat history writer stopped with {self._pending_count} message(s) still in the write-ahead log.")
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+            worker, self._worker = self._worker, None
+        worker.join(timeout)
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "pending_messages": self._pending_count,
+                "pending_conversations": len(self._pending) + len(self._inflight),
+                "flushed_messages": self.flushed_messages,
+                "failed_flushes": self.failed_flushes,
+            }
+
+    @staticmethod
+    def _add(target: Dict[str, List[dict]], conversation_id: str, batch: dict, front: bool = False) -> int:
+        """
+        Adds a batch to a conversation's queue, merging it into the adjacent batch when contiguous.
+
+        Returns:
+            int: Change in the number of queued messages (a retried append may overlap the queue).
+        """
+        batches = target.setdefault(conversation_id, [])
+        if front:
+            batches.insert(0, batch)
+            return len(batch["messages"])
+        if batches:
+            last = batches[-1]
+            if last["start_seq"] is None and batch["start_seq"] is None:
+                last["messages"] = last["messages"] + batch["messages"]
+                return len(batch["messages"])
+            if last["start_seq"] is not None and batch["start_seq"] is not None:
+                end = last["start_seq"] + len(last["messages"])
+                if last["start_seq"] <= batch["start_seq"] <= end:
+                    before = len(last["messages"])
+                    last["messages"] = last["messages"][:batch["start_seq"] - last["start_seq"]] + batch["messages"]
+                    return len(last["messages"]) - before
+        batches.append(batch)
+        return len(batch["messages"])
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._stopping and not self._flush_requested:
+                    self._wait_for_ready()
+                if self._stopping:
+                    return
+                self._flush_requested = False
+                self._cycles_started += 1
+                now = time.monotonic()
+                ready = [conversation_id for conversation_id in self._pending if self._retry_at.get(conversation_id, 0) <= now]
+                self._inflight = {conversation_id: self._pending.pop(conversation_id) for conversation_id in ready}
+                inflight = dict(self._inflight)
+
+            results = {conversation_id: self._flush_conversation(conversation_id, batches) for conversation_id, batches in inflight.items()}
+
+            with self._condition:
+                self._last_cycle_failed = False
+                for conversation_id, (remaining, stored) in results.items():
+                    self._pending_count -= stored
+                    self.flushed_messages += stored
+                    if remaining:
+                        self._last_cycle_failed = True
+                        self.failed_flushes += 1
+                        failures = self._failures[conversation_id] = self._failures.get(conversation_id, 0) + 1
+                        self._retry_at[conversation_id] = time.monotonic() + min(2 ** failures, MAX_RETRY_BACKOFF)
+                        for batch in reversed(remaining):
+                            self._add(self._pending, conversation_id, batch, front=True)
+                        self._pending.move_to_end(conversation_id, last=False)
+                    else:
+                        self._failures.pop(conversation_id, None)
+                        self._retry_at.pop(conversation_id, None)
+                self._inflight = {}
+                if results:
+                    self._rewrite_wal()
+                self._cycles_finished += 1
+                self._condition.notify_all()
+
+    def _wait_for_ready(self):
+        """
+        Waits for the next flush cycle; called with the condition held.
+
+        Only conversations out of retry backoff count towards `flush_batch`, and when
+        every pending conversation is backing off, the wait ends when the first backoff
+        does, so the worker never spins while nothing can be flushed.
+        """
+        now = time.monotonic()
+        retry_at = [self._retry_at.get(conversation_id, 0) for conversation_id in self._pending]
+        ready = sum(1 for moment in retry_at if moment <= now)
+        if ready >= self.flush_batch:
+            return
+        timeout = self.flush_interval
+        if retry_at and not ready:
+            timeout = min(timeout, min(retry_at) - now)
+        self._condition.wait(timeout)
+
+    def _flush_conversation(self, conversation_id: str, batches: List[dict]):
+        """Appends the batches of one conversation in order; returns the unflushed batches and the number of messages handled."""
+        handled = 0
+        for position, batch in enumerate(batches):
+            try:
+                response = self.append_fn(conversation_id, batch["messages"], batch["start_seq"])
+            except ValueError as e:
+                # Gaps never resolve by retrying; drop the batch rather than block the conversation
+                logger.error(f"Dropping buffered chat history for conversation {conversation_id}: {e}")
+                handled += len(batch["messages"])
+                continue
+            except Exception as e:
+                response = {"success": False, "error": str(e)}
+            if not response.get("success"):
+                logger.error(f"Failed to flush chat history of conversation {conversation_id}: {response.get('error')}")
+                return batches[position:], handled
+            handled += len(batch["messages"])
+        return [], handled
+
+    def _replay(self):
+        if not self.wal_path or not os.path.exists(self.wal_path):
+            return
+        replayed = 0
+        with open(self.wal_path, "r", encoding="utf-8") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from a crash mid-write
+                    logger.warning("Skipping incomplete chat history write-ahead log record.")
+                    continue
+                batch = {"start_seq": record["start_seq"], "messages": record["messages"]}
+                self._pending_count += self._add(self._pending, record["conversation_id"], batch)
+                replayed += len(batch["messages"])
+        if replayed:
+            logger.info(f"Replayed {replayed} buffered chat message(s) from '{self.wal_path}'.")
+        self._rewrite_wal()
+
+    def _open_wal(self):
+        if self._wal is None and self.wal_path:
+            directory = os.path.dirname(self.wal_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            self._wal = open(self.wal_path, "a", encoding="utf-8")
+        return self._wal
+
+    def _write_wal(self, conversation_id: str, batch: dict):
+        wal = self._open_wal()
+        if wal is None:
+            return
+        wal.write(json.dumps({"conversation_id": conversation_id, **batch}, separators=(",", ":")) + "\n")
+        wal.flush()
+        if self.fsync:
+            os.fsync(wal.fileno())
+
+    def _rewrite_wal(self):
+        if not self.wal_path:
+            return
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+        temp_path = f"{self.wal_path}.tmp"
+        directory = os.path.dirname(self.wal_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(temp_path, "w", encoding="utf-8") as file:
+            for source in (self._inflight, self._pending):
+                for conversation_id, batches in source.items():
+                    for batch in batches:
+                        file.write(json.dumps({"conversation_id": conversation_id, **batch}, separators=(",", ":")) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.wal_path)
+
+def _append_to_storage(conversation_id: str, messages: list, start_seq: Optional[int]) -> dict:
+    from backend.services import supabase_service
+    return supabase_service.append_chat_messages(conversation_id, messages, start_seq)
+
+chat_history_writer = ChatHistoryWriter(_append_to_storage)
@@ -0,0 +1,180 @@
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+from dotenv import load_dotenv
+from backend.services.llm_model_service import (
+    MAX_HISTORY_TOKENS, HISTORY_SUMMARY_ENABLED, HISTORY_SUMMARY_TOKENS,
+    summarize_dropped_messages, truncate_conversation_history
+)
+from backend.services.tokenizer_service import count_message_tokens
+from backend.utils import logger
+
+logger = logger.get_logger()
+
+load_dotenv()
+CHAT_SESSION_MAX = int(os.getenv("CHAT_SESSION_MAX", 10000))
+CHAT_SESSION_TTL_SECONDS = float(os.getenv("CHAT_SESSION_TTL_SECONDS", 3600))
+# Dropped user messages kept per session to build the summary of older turns
+SESSION_SUMMARY_SOURCE_MESSAGES = 16
+# Stored messages read to seed a session; enough to fill the prompt window and the summary
+SESSION_SEED_MESSAGES = int(os.getenv("SESSION_SEED_MESSAGES", 200))
+
+class SessionLoadError(Exception):
+    """Raised when the stored history of a conversation cannot be loaded to seed its session."""
+
+class ConversationSession:
+    """
+    Server-side state of one conversation: the prompt window, already truncated.
+
+    Each message is tokenized once when it is appended. The window is a deque
+    trimmed from the left as soon as it exceeds `max_tokens`, so adding a turn
+    costs O(1) amortized however long the conversation gets.
+
+    Args:
+        conversation_id (str): Unique identifier for the conversation.
+        max_tokens (int): Token budget of the prompt window.
+        summarize (bool): Keep recently dropped user messages to summarize them in the prompt.
+    """
+
+    def __init__(self, conversation_id: str, max_tokens: int = MAX_HISTORY_TOKENS, summarize: bool = HISTORY_SUMMARY_ENABLED):
+        self.conversation_id = conversation_id
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+        self.window: deque = deque()
+        self.window_tokens = 0
+        self.message_count = 0
+        self.dropped: deque = deque(maxlen=SESSION_SUMMARY_SOURCE_MESSAGES)
+        self.last_access = time.time()
+
+    def append(self, message: Dict[str, str]):
+        """Adds a message to the window and drops the oldest ones beyond the token budget."""
+        message = {"role": message.get("role"), "content": message.get("content", "")}
+        tokens = count_message_tokens(message)
+        self.window.append((message, tokens))
+        self.window_tokens += tokens
+        self.message_count += 1
+        while self.window_tokens > self.max_tokens and len(self.window) > 1:
+            dropped, dropped_tokens = self.window.popleft()
+            self.window_tokens -= dropped_tokens
+            if dropped.get("role") == "user":
+                self.dropped.append(dropped)
+
+    def record_turn(self, user_message: str, assistant_reply: str) -> int:
+        """
+        Appends a completed turn; both messages are added together so concurrent turns never interleave.
+
+        Returns:
+            int: Sequence number of the user message in the conversation.
+        """
+        start_seq = self.message_count
+        self.append({"role": "user", "content": user_message})
+        self.append({"role": "assistant", "content": assistant_reply})
+        return start_seq
+
+    def seed(self, messages: List[Dict[str, str]]):
+        """
+        Initializes the window from stored history, tokenizing only the messages that fit.
+
+        `messages` may be the tail of the conversation; their `seq` gives the conversation length.
+        """
+        kept = truncate_conversation_history(messages, self.max_tokens, summarize=False)
+        self.dropped.extend(message for message in messages[:len(messages) - len(kept)] if message.get("role") == "user")
+        for message in kept:
+            self.append(message)
+        self.message_count = messages[-1].get("seq", len(messages) - 1) + 1 if messages else 0
+
+    def prompt_history(self) -> List[Dict[str, str]]:
+        """Returns the messages to send to the LLM, with a summary of dropped turns when enabled."""
+        history = [message for message, _ in self.window]
+        if self.summarize and self.dropped:
+            summary = summarize_dropped_messages(list(self.dropped), HISTORY_SUMMARY_TOKENS)
+            if summary is not None:
+                history.insert(0, summary)
+        return history
+
+class SessionStore:
+    """
+    LRU store of `ConversationSession`s keyed by conversation ID.
+
+    On a miss, `loader` (if given) is called in a worker thread with the conversation
+    ID and returns the stored messages used to seed the new session, so a restarted
+    server resumes conversations from persistent history. If the loader fails, no
+    session is cached: an unseeded session would number its turns from 0 and the
+    stores would skip them as already stored. Sessions idle for more than
+    `ttl_seconds` are dropped; when more than `max_sessions` exist, the least recently
+    used one is dropped.
+
+    Args:
+        loader (Optional[Callable[[str], List[dict]]]): Loads the stored messages of a conversation.
+        max_sessions (int): Maximum number of sessions kept in memory.
+        ttl_seconds (Optional[float]): Idle lifetime of a session; `None` or 0 disables expiry.
+    """
+
+    def __init__(self, loader: Optional[Callable[[str], List[dict]]] = None, max_sessions: int = CHAT_SESSION_MAX, ttl_seconds: Optional[float] = CHAT_SESSION_TTL_SECONDS):
+        self.loader = loader
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds or None
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, conversation_id: str) -> ConversationSession:
+        """
+        Returns the session of a conversation, creating (and seeding) it if needed.
+
+        Raises:
+            SessionLoadError: If the stored history could not be loaded.
+        """
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(conversation_id)
+            if session is not None and not self._is_expired(session, now):
+                self._sessions.move_to_end(conversation_id)
+                session.last_access = now
+                return session
+
+        session = ConversationSession(conversation_id)
+        if self.loader is not None:
+            try:
+                messages = await asyncio.to_thread(self.loader, conversation_id)
+                if messages:
+                    session.seed(messages)
+            except Exception as e:
+                logger.error(f"Failed to load stored history for conversation {conversation_id}: {e}")
+                raise SessionLoadError(f"Stored history of conversation {conversation_id} is unavailable.") from e
+
+        with self._lock:
+            # Another request may have created the session while the history was loading
+            existing = self._sessions.get(conversation_id)
+            if existing is not None and not self._is_expired(existing, now):
+                return existing
+            self._sessions[conversation_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def discard(self, conversation_id: str):
+        """Drops the in-memory session, e.g. after its stored history was replaced."""
+        with self._lock:
+            self._sessions.pop(conversation_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _is_expired(self, session: ConversationSession, now: float) -> bool:
+        return self.ttl_seconds is not None and now - session.last_access > self.ttl_seconds
+
+def _load_stored_messages(conversation_id: str) -> List[dict]:
+    from backend.services import supabase_service
+    from backend.services.chat_history_writer import chat_history_writer
+    stored = supabase_service.retrieve_chat_history(conversation_id, last=SESSION_SEED_MESSAGES)
+    if not stored.get("success") and "error" in stored:
+        raise RuntimeError(stored["error"])
+    data = stored.get("data", {}) if stored.get("success") else {}
+    messages = data.get("messages", [])
+    # Turns still waiting in the write-behind buffer belong to the history too
+    return messages + chat_history_writer.pending_after(conversation_id, data.get("message_count", len(messages)))
+
+session_store = SessionStore(loader=_load_stored_messages)
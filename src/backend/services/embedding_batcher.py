@@ -0,0 +1,125 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+from backend.utils import logger
+
+logger = logger.get_logger()
+
+_STOP = object()
+
+class EmbeddingBatcher:
+    """
+    Collects embedding requests that arrive within a short time window and encodes
+    them together in a single model call.
+
+    Callers submit one text at a time and receive a `concurrent.futures.Future`.
+    A background worker drains the queue, waits at most `max_wait_ms` for more
+    requests (or until `max_batch_size` is reached), encodes the whole batch with
+    `encode_fn` and resolves every waiting future with its own vector.
+
+    Args:
+        encode_fn (Callable[[List[str]], List[List[float]]]): Encodes a list of texts.
+        max_batch_size (int): Maximum number of texts encoded in one call.
+        max_wait_ms (float): Maximum time to wait for a batch to fill up.
+
+    Example:
+        >>> batcher = EmbeddingBatcher(encode_texts, max_batch_size=32, max_wait_ms=5)
+        >>> vector = batcher.submit("what causes headache").result()
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], List[List[float]]], max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms cannot be negative.")
+
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches_processed = 0
+        self.items_processed = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, text: str) -> Future:
+        """
+        Queues a text for encoding.
+
+        Args:
+            text (str): Text to encode.
+
+        Returns:
+            Future: Resolves to the embedding (List[float]) of the given text.
+        """
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stops the background worker after the already queued requests are encoded."""
+        with self._lock:
+            worker = self._worker
+            if worker is None:
+                return
+            self._queue.put(_STOP)
+            self._worker = None
+        worker.join(timeout)
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect_batch(self, first) -> Tuple[List[tuple], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch, stop_requested = self._collect_batch(first)
+            self._process(batch)
+            if stop_requested:
+                return
+
+    def _process(self, batch: List[tuple]):
+        pending = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not pending:
+            return
+
+        # Identical questions in the same window are encoded only once
+        unique_texts = list(dict.fromkeys(text for text, _ in pending))
+        try:
+            vectors = self.encode_fn(unique_texts)
+        except Exception as e:
+            logger.error(f"Error encoding embedding batch of size {len(unique_texts)}: {e}")
+            for _, future in pending:
+                future.set_exception(e)
+            return
+
+        vectors_by_text = dict(zip(unique_texts, vectors))
+        for text, future in pending:
+            future.set_result(vectors_by_text[text])
+
+        self.batches_processed += 1
+        self.items_processed += len(pending)
+        logger.debug(f"Encoded embedding batch: {len(pending)} requests, {len(unique_texts)} unique texts.")
@@ -0,0 +1,244 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, List
+import numpy as np
+from backend.utils import logger
+
+logger = logger.get_logger()
+
+# Approximate per-entry bookkeeping cost (OrderedDict node, tuple, array header)
+_ENTRY_OVERHEAD_BYTES = 200
+
+def normalize_query(text: str) -> str:
+    """
+    Normalizes query text so that trivially different spellings share one cache entry.
+
+    Args:
+        text (str): Raw query text.
+
+    Returns:
+        str: Lower-cased text with surrounding and repeated whitespace collapsed.
+    """
+    return " ".join(text.lower().split())
+
+class EmbeddingCache:
+    """
+    Byte-bounded LRU cache with TTL eviction for query embeddings.
+
+    Entries are keyed on the normalized query text and stored as float32 arrays.
+    When `spill_path` is set, every entry is also written to a SQLite file so the
+    cache survives restarts; entries evicted from memory are reloaded from disk on
+    the next lookup. Spill writes are handed to a background thread that commits
+    them in batches, and disk reads happen outside the cache lock, so `put` never
+    waits for the disk and a memory hit never waits for another thread's disk read.
+
+    Args:
+        max_bytes (int): Upper bound for the in-memory size of the cache.
+        ttl_seconds (Optional[float]): Entry lifetime; `None` or 0 disables expiry.
+        spill_path (Optional[str]): Path of the on-disk SQLite spill file.
+
+    Example:
+        >>> cache = EmbeddingCache(max_bytes=16 * 1024 * 1024, ttl_seconds=3600)
+        >>> cache.put("What causes headache?", [0.1, 0.2])
+        >>> cache.get("what causes  headache?")
+        [0.1, 0.2]
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: Optional[float] = 86400, spill_path: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds or None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._spill_condition = threading.Condition()
+        self._spill_queue: List[tuple] = []
+        self._spill_writer: Optional[threading.Thread] = None
+        self._spill_busy = False
+        self._disk = self._open_spill(spill_path) if spill_path else None
+
+    @property
+    def spills(self) -> bool:
+        """True if entries are also kept in a spill file."""
+        return self._disk is not None
+
+    def get(self, text: str, from_disk: bool = True) -> Optional[List[float]]:
+        """
+        Returns the cached embedding for the given text, or `None` on a miss.
+
+        Args:
+            text (str): Query text (normalized internally).
+            from_disk (bool): Look the text up in the spill file after a memory miss.
+                              Without it, a memory miss that the spill file could still
+                              answer is not counted as a miss, so async callers can check
+                              memory on the event loop and read the disk in a worker thread.
+
+        Returns:
+            Optional[List[float]]: Cached embedding vector.
+        """
+        key = normalize_query(text)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                vector, created_at = entry
+                if not self._is_expired(created_at, now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return vector.tolist()
+                self._remove(key)
+            if self._disk is None:
+                self.misses += 1
+                return None
+            if not from_disk:
+                return None
+
+        entry = self._load_from_disk(key, now)
+        with self._lock:
+            if entry is not None:
+                if key not in self._entries:
+                    self._insert(key, *entry)
+                self.hits += 1
+                return entry[0].tolist()
+            self.misses += 1
+            return None
+
+    def put(self, text: str, vector: List[float]):
+        """
+        Stores an embedding, evicting least recently used entries to respect `max_bytes`.
+
+        Args:
+            text (str): Query text (normalized internally).
+            vector (List[float]): Embedding to cache.
+        """
+        key = normalize_query(text)
+        array = np.asarray(vector, dtype=np.float32)
+        created_at = time.time()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._insert(key, array, created_at)
+        self._save_to_disk(key, array, created_at)
+
+    def clear(self):
+        """Removes every entry from memory and from the spill file."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+        if self._disk is not None:
+            with self._spill_condition:
+                self._spill_queue.clear()
+                # A batch taken before the clear must not land after it
+                self._spill_condition.wait_for(lambda: not self._spill_busy)
+            with self._disk_lock:
+                self._disk.execute("DELETE FROM embeddings")
+                self._disk.commit()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every queued spill write is committed.
+
+        Returns:
+            bool: True if the queue was drained within `timeout`.
+        """
+        with self._spill_condition:
+            return self._spill_condition.wait_for(lambda: not self._spill_queue and not self._spill_busy, timeout)
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and current memory usage."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    @staticmethod
+    def _entry_size(key: str, array: np.ndarray) -> int:
+        return array.nbytes + len(key.encode("utf-8")) + _ENTRY_OVERHEAD_BYTES
+
+    def _insert(self, key: str, array: np.ndarray, created_at: float):
+        size = self._entry_size(key, array)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (array, created_at)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        array, _ = self._entries.pop(key)
+        self.current_bytes -= self._entry_size(key, array)
+
+    def _open_spill(self, spill_path: str) -> Optional[sqlite3.Connection]:
+        try:
+            directory = os.path.dirname(spill_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            connection = sqlite3.connect(spill_path, check_same_thread=False)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, created_at REAL, vector BLOB)"
+            )
+            if self.ttl_seconds is not None:
+                connection.execute("DELETE FROM embeddings WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            connection.commit()
+            logger.info(f"Embedding cache spill file opened at: {spill_path}")
+            return connection
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open embedding cache spill file '{spill_path}': {e}")
+            return None
+
+    def _load_from_disk(self, key: str, now: float) -> Optional[tuple]:
+        if self._disk is None:
+            return None
+        try:
+            with self._disk_lock:
+                row = self._disk.execute("SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read from embedding cache spill file: {e}")
+            return None
+        if row is None or self._is_expired(row[1], now):
+            return None
+        return np.frombuffer(row[0], dtype=np.float32).copy(), row[1]
+
+    def _save_to_disk(self, key: str, array: np.ndarray, created_at: float):
+        if self._disk is None:
+            return
+        with self._spill_condition:
+            self._spill_queue.append((key, created_at, array.tobytes()))
+            if self._spill_writer is None:
+                self._spill_writer = threading.Thread(target=self._write_spill, name="embedding-cache-spill", daemon=True)
+                self._spill_writer.start()
+            self._spill_condition.notify_all()
+
+    def _write_spill(self):
+        """Commits queued spill writes, one transaction per batch that accumulated meanwhile."""
+        while True:
+            with self._spill_condition:
+                self._spill_busy = False
+                self._spill_condition.notify_all()
+                self._spill_condition.wait_for(lambda: self._spill_queue)
+                rows, self._spill_queue = self._spill_queue, []
+                self._spill_busy = True
+            try:
+                with self._disk_lock:
+                    self._disk.executemany("INSERT OR REPLACE INTO embeddings (key, created_at, vector) VALUES (?, ?, ?)", rows)
+                    self._disk.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to write to embedding cache spill file: {e}")
@@ -1,18 +1,197 @@
-from sentence_transformers import SentenceTransformer
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import os
+import asyncio
+import functools
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from backend.services.embedding_batcher import EmbeddingBatcher
+from backend.services.embedding_cache import EmbeddingCache
 from backend.utils import logger
 
 logger = logger.get_logger()
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+load_dotenv()
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", 5))
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", 86400))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH")
+EMBEDDING_BULK_BATCH_SIZE = int(os.getenv("EMBEDDING_BULK_BATCH_SIZE", 2048))
+EMBEDDING_ENCODE_WORKERS = int(os.getenv("EMBEDDING_ENCODE_WORKERS", os.cpu_count() or 1))
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_DIMENSION = 384
+MODEL_BATCH_SIZE = 64
+
+model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """
+    Returns the sentence-transformer model, loading it on first use.
+
+    Importing this module stays cheap; the weights are loaded by the first caller
+    (or by the startup warm-up) and shared afterwards.
+    """
+    global model
+    if model is None:
+        with _model_lock:
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+                logger.info(f"Loading embedding model '{EMBEDDING_MODEL_NAME}'...")
+                model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    return model
+
+def is_model_loaded():
+    return model is not None
+
+embedding_cache = EmbeddingCache(
+    max_bytes=EMBEDDING_CACHE_MAX_BYTES,
+    ttl_seconds=EMBEDDING_CACHE_TTL_SECONDS,
+    spill_path=EMBEDDING_CACHE_PATH
+)
 
 def get_text_embedding(text):
     try:
-        return model.encode(text, convert_to_tensor=True).cpu().numpy().tolist()
+        if isinstance(text, str):
+            cached = embedding_cache.get(text)
+            if cached is not None:
+                return cached
+            embedding = get_model().encode(text, convert_to_tensor=True).cpu().numpy().tolist()
+            embedding_cache.put(text, embedding)
+            return embedding
+        return get_model().encode(text, convert_to_tensor=True).cpu().numpy().tolist()
+    except Exception as e:
+        logger.error(f"Error generating embedding: {e}")
+        raise
+
+def encode_texts(texts):
+    """
+    Encodes a list of texts in a single forward pass.
+
+    Args:
+        texts (List[str]): Texts to encode.
+
+    Returns:
+        List[List[float]]: One embedding per input text, in the same order.
+    """
+    return get_model().encode(texts, batch_size=len(texts), convert_to_numpy=True).tolist()
+
+batcher = EmbeddingBatcher(
+    encode_texts,
+    max_batch_size=EMBEDDING_BATCH_SIZE,
+    max_wait_ms=EMBEDDING_BATCH_WAIT_MS
+)
+
+def start_encode_pool(num_workers=EMBEDDING_ENCODE_WORKERS):
+    """
+    Starts a multi-process encode pool that can be reused across `iter_bulk_embeddings` calls.
+
+    Args:
+        num_workers (int): Number of encoder processes.
+
+    Returns:
+        Optional[dict]: The pool, or `None` when a single worker is requested.
+    """
+    if num_workers <= 1:
+        return None
+    pool = get_model().start_multi_process_pool(target_devices=["cpu"] * num_workers)
+    logger.info(f"Started embedding pool with {num_workers} worker processes.")
+    return pool
+
+def stop_encode_pool(pool):
+    """Stops a pool created by `start_encode_pool`."""
+    if pool is not None:
+        get_model().stop_multi_process_pool(pool)
+
+def iter_bulk_embeddings(texts, batch_size=EMBEDDING_BULK_BATCH_SIZE, num_workers=EMBEDDING_ENCODE_WORKERS, pool=None):
+    """
+    Encodes a large collection of texts in length-sorted batches.
+
+    Texts are ordered by length before batching so each batch holds sequences of
+    similar size and wastes little work on padding. With more than one worker, the
+    batches are encoded by a multi-process pool spread over the available cores.
+    Batches are yielded as soon as they are ready, so callers can upload one batch
+    while the next is being encoded.
+
+    Args:
+        texts (Sequence[str]): Texts to encode.
+        batch_size (int): Number of texts per yielded batch.
+        num_workers (int): Number of encoder processes; 1 encodes in-process.
+        pool (Optional[dict]): Pool from `start_encode_pool` to reuse instead of starting one.
+
+    Yields:
+        Tuple[np.ndarray, np.ndarray]: Original positions of the batch texts and their
+        embeddings as a contiguous float32 matrix of shape (len(positions), EMBEDDING_DIMENSION).
+    """
+    texts = list(texts)
+    order = np.argsort(np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts)), kind="stable")
+    owns_pool = pool is None and len(texts) > batch_size
+    if owns_pool:
+        pool = start_encode_pool(num_workers)
+    try:
+        for start in range(0, len(order), batch_size):
+            positions = order[start:start + batch_size]
+            batch = [texts[position] for position in positions]
+            if pool is not None:
+                vectors = get_model().encode_multi_process(batch, pool, batch_size=MODEL_BATCH_SIZE)
+            else:
+                vectors = get_model().encode(batch, batch_size=MODEL_BATCH_SIZE, convert_to_numpy=True)
+            yield positions, np.ascontiguousarray(vectors, dtype=np.float32)
+    finally:
+        if owns_pool:
+            stop_encode_pool(pool)
+
+def encode_bulk(texts, batch_size=EMBEDDING_BULK_BATCH_SIZE, num_workers=EMBEDDING_ENCODE_WORKERS, pool=None):
+    """
+    Encodes a collection of texts into a single float32 matrix.
+
+    Args:
+        texts (Sequence[str]): Texts to encode.
+        batch_size (int): Number of texts encoded per batch.
+        num_workers (int): Number of encoder processes.
+        pool (Optional[dict]): Pool from `start_encode_pool` to reuse.
+
+    Returns:
+        np.ndarray: Matrix of shape (len(texts), EMBEDDING_DIMENSION), rows in input order.
+    """
+    texts = list(texts)
+    matrix = np.empty((len(texts), EMBEDDING_DIMENSION), dtype=np.float32)
+    for positions, vectors in iter_bulk_embeddings(texts, batch_size, num_workers, pool):
+        matrix[positions] = vectors
+    return matrix
+
+async def get_text_embedding_async(text: str):
+    """
+    Generates the embedding of a single query through the shared micro-batcher.
+
+    Repeated queries are answered from the embedding cache without a forward pass.
+    Concurrent cache misses arriving within `EMBEDDING_BATCH_WAIT_MS` are encoded together,
+    and the event loop is never blocked by the model forward pass.
+
+    Args:
+        text (str): Query text.
+
+    Returns:
+        List[float]: Embedding vector for the query.
+    """
+    cached = embedding_cache.get(text, from_disk=False)
+    if cached is None and embedding_cache.spills:
+        # The spill file is read in a worker thread so a memory miss never blocks the event loop on disk I/O
+        cached = await asyncio.to_thread(embedding_cache.get, text)
+    if cached is not None:
+        return cached
+    try:
+        embedding = await asyncio.wrap_future(batcher.submit(text))
+        embedding_cache.put(text, embedding)
+        return embedding
     except Exception as e:
         logger.error(f"Error generating embedding: {e}")
         raise
 
+@functools.lru_cache(maxsize=8)
+def _get_splitter(chunk_size, chunk_overlap):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
 def chunk_text(text, chunk_size=500, chunk_overlap=100):
-    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-    return splitter.split_text(text)
\ No newline at end of file
+    return _get_splitter(chunk_size, chunk_overlap).split_text(text)
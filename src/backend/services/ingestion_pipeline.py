@@ -0,0 +1,439 @@
+import os
+import json
+import queue
+import argparse
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from backend.data.dataset import iter_data_set, context_column, normalize_text, ensure_dataset_cache, dataset_cache_info
+from backend.services import pinecone_service
+from backend.services.pinecone_service import (
+    UPSERT_BATCH_SIZE, NAMESPACE, ANSWER_CHUNKING, content_vector_id, child_vector_id, parent_vector_id
+)
+from backend.services.embedding_service import encode_bulk, start_encode_pool, stop_encode_pool, chunk_text
+from backend.utils import logger
+
+logger = logger.get_logger()
+
+load_dotenv()
+INGESTION_CHECKPOINT_PATH = os.getenv("INGESTION_CHECKPOINT_PATH", "src/backend/data/ingestion_checkpoint.json")
+INGESTION_CHUNK_SIZE = int(os.getenv("INGESTION_CHUNK_SIZE", 2048))
+INGESTION_QUEUE_SIZE = int(os.getenv("INGESTION_QUEUE_SIZE", 4))
+INGESTION_MANIFEST_PATH = os.getenv("INGESTION_MANIFEST_PATH", "src/backend/data/ingestion_manifest.txt")
+DELETE_BATCH_SIZE = 1000
+ANSWER_CHUNK_SIZE = int(os.getenv("ANSWER_CHUNK_SIZE", 500))
+ANSWER_CHUNK_OVERLAP = int(os.getenv("ANSWER_CHUNK_OVERLAP", 100))
+
+_DONE = object()
+_POLL_INTERVAL = 0.5
+
+class IngestionCheckpoint:
+    """
+    Persists the progress of an ingestion run so an interrupted run can resume.
+
+    The checkpoint records the first source row that has not been committed yet.
+    A batch that was embedded but could not be upserted is saved next to the
+    checkpoint (`.pending.json` / `.pending.npy`) and uploaded first on the next run,
+    so its rows are never embedded twice.
+
+    Args:
+        path (str): Location of the JSON checkpoint file.
+    """
+
+    def __init__(self, path: str = INGESTION_CHECKPOINT_PATH):
+        self.path = path
+        self.pending_meta_path = f"{path}.pending.json"
+        self.pending_vectors_path = f"{path}.pending.npy"
+        self.state = {"next_source_row": 0, "committed_batches": 0, "vectors_upserted": 0}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                self.state.update(json.load(file))
+
+    @property
+    def next_source_row(self) -> int:
+        return self.state["next_source_row"]
+
+    def start(self, dataset_key: str):
+        """
+        Binds the checkpoint to a dataset version. Source row numbers of another
+        version do not match, so progress recorded for it is discarded, together
+        with a pending batch embedded from it.
+        """
+        if self.state.get("dataset") not in (None, dataset_key):
+            logger.info("Dataset changed since the checkpoint was written; starting from the first row.")
+            self.state.update({"next_source_row": 0, "committed_batches": 0, "vectors_upserted": 0})
+            self.clear_pending()
+        self.state["dataset"] = dataset_key
+
+    def commit(self, source_end: int, vectors_upserted: int):
+        """Marks every source row before `source_end` as ingested."""
+        self.state["next_source_row"] = max(self.state["next_source_row"], source_end)
+        self.state["committed_batches"] += 1
+        self.state["vectors_upserted"] += vectors_upserted
+        self._write_json(self.path, self.state)
+
+    def reset(self):
+        """Discards the checkpoint and any pending batch."""
+        for path in (self.path, self.pending_meta_path, self.pending_vectors_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.state = {"next_source_row": 0, "committed_batches": 0, "vectors_upserted": 0}
+
+    def save_pending(self, batch: dict):
+        self._ensure_directory(self.pending_vectors_path)
+        np.save(self.pending_vectors_path, batch["vectors"])
+        self._write_json(self.pending_meta_path, {
+            "start": batch["start"],
+            "end": batch["end"],
+            "ids": batch["ids"],
+            "metadata": batch["metadata"],
+        })
+        logger.warning(f"Saved embedded batch for rows {batch['start']}-{batch['end']} to resume later.")
+
+    def load_pending(self):
+        if not (os.path.exists(self.pending_meta_path) and os.path.exists(self.pending_vectors_path)):
+            return None
+        with open(self.pending_meta_path, "r", encoding="utf-8") as file:
+            batch = json.load(file)
+        batch["vectors"] = np.load(self.pending_vectors_path)
+        return batch
+
+    def clear_pending(self):
+        for path in (self.pending_meta_path, self.pending_vectors_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    @staticmethod
+    def _ensure_directory(path: str):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+    @classmethod
+    def _write_json(cls, path: str, data: dict):
+        cls._ensure_directory(path)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+
+class IngestionManifest:
+    """
+    IDs of the vectors ingested into the index, kept in a local text file.
+
+    Vector IDs are content hashes, so the manifest tells which dataset rows are
+    already indexed: a re-index embeds and upserts only rows whose ID is missing,
+    and deletes IDs that are no longer in the dataset. IDs are appended (and
+    fsynced) as each chunk is committed, so an interrupted run loses nothing; after
+    a complete pass the file is rewritten to the IDs of the current dataset.
+
+    Args:
+        path (str): Location of the manifest file, one ID per line.
+    """
+
+    def __init__(self, path: str = INGESTION_MANIFEST_PATH):
+        self.path = path
+        self.ids = set()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                self.ids.update(line.strip() for line in file if line.strip())
+
+    def __contains__(self, vector_id: str) -> bool:
+        return vector_id in self.ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def record(self, ids: list):
+        """Appends newly ingested IDs."""
+        IngestionCheckpoint._ensure_directory(self.path)
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.writelines(f"{vector_id}\n" for vector_id in ids)
+            file.flush()
+            os.fsync(file.fileno())
+        self.ids.update(ids)
+
+    def replace(self, ids: set):
+        """Rewrites the manifest to exactly `ids`."""
+        IngestionCheckpoint._ensure_directory(self.path)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.writelines(f"{vector_id}\n" for vector_id in sorted(ids))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+        self.ids = set(ids)
+
+    def reset(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.ids = set()
+
+def _vector_ids(df) -> list:
+    return [
+        content_vector_id(question, answer, instruction)
+        for question, answer, instruction in zip(
+            context_column(df, "input").tolist(), context_column(df, "output").tolist(), context_column(df, "instruction").tolist()
+        )
+    ]
+
+def _put(target: queue.Queue, item, stop_event: threading.Event) -> bool:
+    while not stop_event.is_set():
+        try:
+            target.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _get(source: queue.Queue, stop_event: threading.Event):
+    while not stop_event.is_set():
+        try:
+            return source.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            continue
+    return _DONE
+
+def _start_stage(name, work, source, sink, stop_event, errors):
+    """
+    Runs `work` on every item of `source` in a background thread and forwards the results to `sink`.
+    When `source` is `None`, `work` is a generator producing the items instead.
+    """
+    def run():
+        try:
+            if source is None:
+                for item in work():
+                    if not _put(sink, item, stop_event):
+                        return
+                return
+            while True:
+                item = _get(source, stop_event)
+                if item is _DONE:
+                    return
+                if not _put(sink, work(item), stop_event):
+                    return
+        except Exception as e:
+            logger.error(f"Ingestion stage '{name}' failed: {e}", exc_info=True)
+            errors.append(e)
+            stop_event.set()
+        finally:
+            _put(sink, _DONE, stop_event)
+
+    thread = threading.Thread(target=run, name=f"ingestion-{name}", daemon=True)
+    thread.start()
+    return thread
+
+def _build_records(batch: dict) -> dict:
+    """
+    Builds the texts to embed, vector IDs and metadata of a chunk of rows.
+
+    Normalized text is embedded; the metadata handed to the LLM keeps the original
+    text when cached. With `ANSWER_CHUNKING`, every vector embeds the question with
+    (part of) its answer: an answer longer than `ANSWER_CHUNK_SIZE` is split by
+    `chunk_text` and stored as child vectors `<parent>-<n>` instead of one vector,
+    each embedding the question with one normalized chunk, and its metadata holds
+    only that chunk plus `parent_id`, `chunk` and `chunks`, so retrieval can collapse
+    hits to their pair and send only the matching chunks to the LLM.
+    """
+    df = batch.pop("df")
+    texts, ids, metadata = [], [], []
+    for vector_id, embedded, embedded_answer, question, answer, instruction in zip(
+        batch["ids"], df["input"].tolist(), df["output"].tolist(), context_column(df, "input").tolist(),
+        context_column(df, "output").tolist(), context_column(df, "instruction").tolist()
+    ):
+        chunks = chunk_text(answer, ANSWER_CHUNK_SIZE, ANSWER_CHUNK_OVERLAP) if ANSWER_CHUNKING and len(answer) > ANSWER_CHUNK_SIZE else [answer]
+        if len(chunks) == 1:
+            # Short pairs embed the same kind of text as chunks, so their scores compare
+            texts.append(f"{embedded}\n{embedded_answer}" if ANSWER_CHUNKING else embedded)
+            ids.append(vector_id)
+            metadata.append({"question": question, "answer": answer, "instruction": instruction})
+            continue
+        for position, chunk in enumerate(chunks):
+            texts.append(f"{embedded}\n{normalize_text(chunk)}")
+            ids.append(child_vector_id(vector_id, position))
+            metadata.append({
+                "question": question, "answer": chunk, "instruction": instruction,
+                "parent_id": vector_id, "chunk": position, "chunks": len(chunks),
+            })
+    batch.update(texts=texts, ids=ids, metadata=metadata)
+    return batch
+
+def _upsert_batch(batch: dict):
+    ids, vectors, metadata = batch["ids"], batch["vectors"], batch["metadata"]
+    payloads = (
+        (
+            f"rows {batch['start']}-{batch['end']} offset {offset}",
+            [
+                (vector_id, vector.tolist(), meta)
+                for vector_id, vector, meta in zip(
+                    ids[offset:offset + UPSERT_BATCH_SIZE],
+                    vectors[offset:offset + UPSERT_BATCH_SIZE],
+                    metadata[offset:offset + UPSERT_BATCH_SIZE]
+                )
+            ]
+        )
+        for offset in range(0, len(ids), UPSERT_BATCH_SIZE)
+    )
+    report = pinecone_service.upsert_batches_concurrently(payloads)
+    if not report["success"]:
+        raise RuntimeError(f"Failed to upsert {len(report['failures'])} batch(es): {report['failures'][0]['error']}")
+
+def _commit(batch: dict, checkpoint: IngestionCheckpoint, manifest: IngestionManifest):
+    try:
+        _upsert_batch(batch)
+    except Exception:
+        checkpoint.save_pending(batch)
+        raise
+    manifest.record(batch["ids"])
+    checkpoint.commit(batch["end"], len(batch["ids"]))
+    logger.info(f"Committed rows {batch['start']}-{batch['end']} ({len(batch['ids'])} vectors).")
+
+def _delete_removed(ids: list):
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        error = pinecone_service.delete_records_by_ids(ids[start:start + DELETE_BATCH_SIZE])
+        if error:
+            raise RuntimeError(error)
+
+def run_ingestion(chunk_size: int = INGESTION_CHUNK_SIZE, checkpoint_path: str = INGESTION_CHECKPOINT_PATH, reset: bool = False,
+                  manifest_path: str = INGESTION_MANIFEST_PATH, clear_index: bool = False) -> dict:
+    """
+    Streams the dataset into the vector index through overlapped, bounded stages.
+
+    The stages are: read a chunk -> build texts, IDs and metadata (splitting long answers
+    into child chunks with `ANSWER_CHUNKING`) -> embed -> upsert.
+    Each stage runs in its own thread and hands work to the next through a queue of at
+    most `INGESTION_QUEUE_SIZE` chunks, so memory stays flat regardless of dataset size.
+    Upserts within a chunk run concurrently with per-batch retries, and a chunk is only
+    committed once all of its batches succeeded. A checkpoint is written after every committed chunk; rerunning after a crash skips
+    the committed rows and uploads any embedded-but-unsent batch before continuing.
+
+    Runs are incremental: vector IDs are content hashes, rows already listed in the
+    `IngestionManifest` are neither embedded nor upserted, and once the whole dataset
+    has been read, vectors whose rows disappeared are deleted from the index. A
+    dataset refresh therefore only costs the changed rows. Rows are tracked by pair,
+    so changing `ANSWER_CHUNKING` or the chunk size requires `clear_index`.
+
+    Args:
+        chunk_size (int): Number of cleaned dataset rows per chunk.
+        checkpoint_path (str): Location of the checkpoint file.
+        reset (bool): Start from the beginning, discarding the checkpoint and the manifest.
+        manifest_path (str): Location of the manifest of ingested IDs.
+        clear_index (bool): Delete every vector of the namespace first, e.g. vectors
+                            ingested before IDs were content hashes.
+
+    Returns:
+        dict: Operation success status, committed batches, vectors upserted, unchanged rows skipped and vectors deleted during this run.
+    """
+    checkpoint = IngestionCheckpoint(checkpoint_path)
+    manifest = IngestionManifest(manifest_path)
+    if reset or clear_index:
+        checkpoint.reset()
+        manifest.reset()
+    ingested = {parent_vector_id(vector_id) for vector_id in manifest.ids}
+    if clear_index:
+        logger.info(f"Deleting every vector in namespace '{NAMESPACE}'.")
+        pinecone_service.get_index().delete(delete_all=True, namespace=NAMESPACE)
+    checkpoint.start(dataset_cache_info(ensure_dataset_cache())["cache_key"])
+
+    summary = {"success": True, "batches": 0, "vectors": 0, "skipped": 0, "deleted": 0}
+
+    pending = checkpoint.load_pending()
+    if pending is not None:
+        logger.info(f"Uploading pending batch for rows {pending['start']}-{pending['end']} from the previous run.")
+        try:
+            _commit(pending, checkpoint, manifest)
+        except Exception as e:
+            logger.error(f"Pending batch could not be uploaded: {e}")
+            return {**summary, "success": False, "error": str(e)}
+        checkpoint.clear_pending()
+        summary["batches"] += 1
+        summary["vectors"] += len(pending["ids"])
+
+    resume_row = checkpoint.next_source_row
+    if resume_row:
+        logger.info(f"Resuming ingestion from source row {resume_row}.")
+
+    # IDs of every current row, including rows skipped by the checkpoint, to find removed vectors
+    dataset_ids = set()
+
+    def read_chunks():
+        for start, end, df in iter_data_set(chunk_size):
+            ids = _vector_ids(df)
+            new = [vector_id not in ingested and vector_id not in dataset_ids for vector_id in ids]
+            dataset_ids.update(ids)
+            if end <= resume_row:
+                continue
+            new = np.array(new, dtype=bool) & (df.index >= resume_row)
+            summary["skipped"] += int((df.index >= resume_row).sum() - new.sum())
+            if not new.any():
+                continue
+            yield {
+                "start": max(start, resume_row),
+                "end": end,
+                "df": df[new],
+                "ids": [vector_id for vector_id, keep in zip(ids, new) if keep],
+            }
+
+    def embed(batch):
+        batch["vectors"] = encode_bulk(batch.pop("texts"), pool=pool)
+        return batch
+
+    stop_event = threading.Event()
+    errors = []
+    raw_chunks, records, prepared = (queue.Queue(maxsize=INGESTION_QUEUE_SIZE) for _ in range(3))
+    pool = start_encode_pool()
+    threads = [
+        _start_stage("read", read_chunks, None, raw_chunks, stop_event, errors),
+        _start_stage("records", _build_records, raw_chunks, records, stop_event, errors),
+        _start_stage("embed", embed, records, prepared, stop_event, errors),
+    ]
+
+    try:
+        while True:
+            batch = _get(prepared, stop_event)
+            if batch is _DONE:
+                break
+            _commit(batch, checkpoint, manifest)
+            summary["batches"] += 1
+            summary["vectors"] += len(batch["ids"])
+    except Exception as e:
+        errors.append(e)
+        stop_event.set()
+    finally:
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+        stop_encode_pool(pool)
+
+    if errors:
+        logger.error(f"Ingestion stopped at source row {checkpoint.next_source_row}: {errors[0]}")
+        return {**summary, "success": False, "error": str(errors[0])}
+
+    removed = sorted(vector_id for vector_id in manifest.ids if parent_vector_id(vector_id) not in dataset_ids)
+    if removed:
+        logger.info(f"Deleting {len(removed)} vectors whose rows are no longer in the dataset.")
+        try:
+            _delete_removed(removed)
+        except Exception as e:
+            logger.error(f"Removed vectors could not be deleted: {e}")
+            return {**summary, "success": False, "error": str(e)}
+        summary["deleted"] = len(removed)
+    manifest.replace(manifest.ids.difference(removed))
+
+    logger.info(
+        f"Ingestion finished: {summary['batches']} batches, {summary['vectors']} vectors upserted, "
+        f"{summary['skipped']} unchanged rows skipped, {summary['deleted']} vectors deleted."
+    )
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream the health-care dataset into the vector index.")
+    parser.add_argument("--chunk-size", type=int, default=INGESTION_CHUNK_SIZE)
+    parser.add_argument("--checkpoint", default=INGESTION_CHECKPOINT_PATH)
+    parser.add_argument("--reset", action="store_true", help="Ignore the checkpoint and manifest and re-ingest everything.")
+    parser.add_argument("--manifest", default=INGESTION_MANIFEST_PATH)
+    parser.add_argument("--clear-index", action="store_true", help="Delete every vector in the namespace, then re-ingest everything.")
+    args = parser.parse_args()
+    print(run_ingestion(args.chunk_size, args.checkpoint, args.reset, args.manifest, args.clear_index))
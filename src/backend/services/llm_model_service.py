@@ -1,7 +1,9 @@
+import asyncio
 import os
-from typing import List, Dict, Optional
-from groq import Groq
+from typing import AsyncIterator, List, Dict, Optional
+from groq import Groq, AsyncGroq
 from dotenv import load_dotenv
+from backend.services.tokenizer_service import count_message_tokens, count_tokens
 from backend.utils import logger
 
 # Logger instance
@@ -14,8 +16,9 @@ load_dotenv()
 LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME")
 GROQ_API_KEY = os.getenv("GROQ_API")
 
-# Initialize Groq client
+# Initialize Groq clients; the async client keeps API requests off the event loop threads
 client = Groq(api_key=GROQ_API_KEY)
+async_client = AsyncGroq(api_key=GROQ_API_KEY)
 
 # System prompt structure s
 SYSTEM_PROMPT: List[Dict[str, str]] = [
@@ -34,31 +37,91 @@ SYSTEM_PROMPT: List[Dict[str, str]] = [
 MAX_TOKENS = 1024
 MAX_HISTORY_TOKENS = 1000
 DEFAULT_TEMPERATURE = 0.7
+HISTORY_SUMMARY_ENABLED = os.getenv("HISTORY_SUMMARY_ENABLED", "false").lower() == "true"
+HISTORY_SUMMARY_TOKENS = int(os.getenv("HISTORY_SUMMARY_TOKENS", 150))
 
-def truncate_conversation_history(history: List[Dict[str, str]], max_tokens: int = MAX_HISTORY_TOKENS) -> List[Dict[str, str]]:
+# Replies returned instead of a completion; these must never be cached or stored as advice
+NETWORK_ERROR_REPLY = "I'm currently unable to connect to the system. Please try again later."
+RESPONSE_FORMAT_ERROR_REPLY = "I'm sorry, but I couldn't process your request at the moment."
+GENERIC_ERROR_REPLY = "I'm sorry, but I'm unable to provide a response right now. Please try again later."
+INTERRUPTED_NOTICE = "\n\n_The response was interrupted. Please try again._"
+
+def truncate_conversation_history(
+    history: List[Dict[str, str]],
+    max_tokens: int = MAX_HISTORY_TOKENS,
+    summarize: bool = HISTORY_SUMMARY_ENABLED
+) -> List[Dict[str, str]]:
     """
     Truncates conversation history to maintain token limits.
     Retains the most recent interactions if token count exceeds the threshold.
 
+    Messages are measured with the LLM tokenizer (counts are cached per message) and the
+    kept suffix is found in a single pass from the newest message backwards. The caller's
+    list is not modified.
+
     Args:
     - history (List[Dict[str, str]]): List of conversation messages
     - max_tokens (int): Maximum allowable tokens for conversation history
+    - summarize (bool): Replace the dropped messages with a short summary of the user's earlier questions
 
     Returns:
     - List[Dict[str, str]]: Truncated conversation history
     """
-    total_tokens = sum(len(msg["content"]) for msg in history)
-    if total_tokens > max_tokens:
-        logger.warning(f"Conversation history exceeds {max_tokens} tokens. Truncating...")
-        while total_tokens > max_tokens and history:
-            history.pop(0)
-            total_tokens = sum(len(msg["content"]) for msg in history)
-    return history
+    used_tokens = 0
+    start = len(history)
+    while start > 0:
+        message_tokens = count_message_tokens(history[start - 1])
+        if used_tokens + message_tokens > max_tokens:
+            break
+        used_tokens += message_tokens
+        start -= 1
+
+    if start == 0:
+        return list(history)
+
+    logger.warning(f"Conversation history exceeds {max_tokens} tokens. Dropping {start} oldest message(s).")
+    kept = history[start:]
+    if summarize:
+        summary = summarize_dropped_messages(history[:start], HISTORY_SUMMARY_TOKENS)
+        if summary is not None:
+            kept = [summary] + kept
+    return kept
+
+def summarize_dropped_messages(messages: List[Dict[str, str]], max_tokens: int = HISTORY_SUMMARY_TOKENS) -> Optional[Dict[str, str]]:
+    """
+    Builds a compact system message listing the user's earlier questions, newest first.
+
+    The summary is extractive (no extra LLM call) and stays within `max_tokens`, so it
+    preserves the topic of a long conversation at a fixed prompt cost.
+
+    Args:
+    - messages (List[Dict[str, str]]): Messages dropped from the prompt, oldest first
+    - max_tokens (int): Token budget of the summary content
+
+    Returns:
+    - Optional[Dict[str, str]]: The summary message, or None if there is nothing to summarize
+    """
+    prefix = "Earlier in this conversation the user asked about: "
+    budget = max_tokens - count_tokens(prefix)
+    topics = []
+    for message in reversed(messages):
+        if message.get("role") != "user" or not message.get("content"):
+            continue
+        topic = " ".join(message["content"].split())
+        topic_tokens = count_tokens(topic) + 1
+        if topic_tokens > budget:
+            break
+        topics.append(topic)
+        budget -= topic_tokens
+    if not topics:
+        return None
+    return {"role": "system", "content": prefix + "; ".join(topics)}
 
 def build_prompt(
     user_query: str,
     db_response: Optional[str],
-    conversation_history: List[Dict[str, str]]
+    conversation_history: List[Dict[str, str]],
+    truncate: bool = True
 ) -> List[Dict[str, str]]:
     """
     Constructs the message prompt for the LLM with system prompts, context, and user queries.
@@ -67,11 +130,13 @@ def build_prompt(
     - user_query (str): The query entered by the user
     - db_response (Optional[str]): Context retrieved from the vector database
     - conversation_history (List[Dict[str, str]]): Previous conversation history
+    - truncate (bool): Truncate the history; False when it is an already-truncated session window
 
     Returns:
     - List[Dict[str, str]]: Constructed prompt messages
     """
-    conversation_history = truncate_conversation_history(conversation_history)
+    if truncate:
+        conversation_history = truncate_conversation_history(conversation_history)
 
     if db_response and db_response.strip() and "No relevant information found" not in db_response:
         return SYSTEM_PROMPT + conversation_history + [
@@ -120,14 +185,106 @@ def get_health_advice(
         assistant_reply = response.choices[0].message.content.strip()
         return assistant_reply
 
-    except (ConnectionError, TimeoutError) as e:
-        logger.error(f"Network error: {e}")
-        return "I'm currently unable to connect to the system. Please try again later."
+    except Exception as e:
+        return _fallback_reply(e)
+
+async def get_health_advice_async(
+    user_query: str,
+    db_response: Optional[str],
+    conversation_history: List[Dict[str, str]],
+    truncate: bool = True
+) -> str:
+    """
+    Async version of `get_health_advice` for the API.
+
+    The completion request is awaited on the `AsyncGroq` client, so the event loop
+    keeps serving other conversations while the LLM generates this reply.
+
+    Args:
+    - user_query (str): The user's question or statement
+    - db_response (Optional[str]): Retrieved context for the query
+    - conversation_history (List[Dict[str, str]]): History of the conversation
+    - truncate (bool): Truncate the history before building the prompt
+
+    Returns:
+    - str: The assistant's response
+    """
+    try:
+        # Counting tokens may load the tokenizer or encode long messages; keep it off the event loop
+        messages = await asyncio.to_thread(build_prompt, user_query, db_response, conversation_history, truncate)
+
+        response = await async_client.chat.completions.create(
+            model=LLM_MODEL_NAME,
+            messages=messages,
+            max_tokens=MAX_TOKENS,
+            temperature=DEFAULT_TEMPERATURE
+        )
 
-    except KeyError as e:
-        logger.error(f"Unexpected response structure: {e}")
-        return "I'm sorry, but I couldn't process your request at the moment."
+        return response.choices[0].message.content.strip()
 
     except Exception as e:
-        logger.error(f"Unexpected error occurred: {e}")
-        return "I'm sorry, but I'm unable to provide a response right now. Please try again later."
\ No newline at end of file
+        return _fallback_reply(e)
+
+async def stream_health_advice(
+    user_query: str,
+    db_response: Optional[str],
+    conversation_history: List[Dict[str, str]],
+    truncate: bool = True
+) -> AsyncIterator[str]:
+    """
+    Streams the assistant's response token by token as the LLM generates it.
+
+    If the request fails before any token was produced, the fallback message of
+    `get_health_advice` is yielded instead; a failure mid-stream ends the stream
+    after a short notice.
+
+    Args:
+    - user_query (str): The user's question or statement
+    - db_response (Optional[str]): Retrieved context for the query
+    - conversation_history (List[Dict[str, str]]): History of the conversation
+    - truncate (bool): Truncate the history before building the prompt
+
+    Yields:
+    - str: Successive pieces of the assistant's response
+    """
+    produced = False
+    try:
+        # Counting tokens may load the tokenizer or encode long messages; keep it off the event loop
+        messages = await asyncio.to_thread(build_prompt, user_query, db_response, conversation_history, truncate)
+
+        stream = await async_client.chat.completions.create(
+            model=LLM_MODEL_NAME,
+            messages=messages,
+            max_tokens=MAX_TOKENS,
+            temperature=DEFAULT_TEMPERATURE,
+            stream=True
+        )
+
+        async for chunk in stream:
+            token = chunk.choices[0].delta.content if chunk.choices else None
+            if token and not produced:
+                token = token.lstrip()
+            if token:
+                produced = True
+                yield token
+
+    except Exception as e:
+        fallback = _fallback_reply(e)
+        yield fallback if not produced else INTERRUPTED_NOTICE
+
+def _fallback_reply(error: Exception) -> str:
+    """Logs a failed completion request and returns the message shown to the user instead."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        logger.error(f"Network error: {error}")
+        return NETWORK_ERROR_REPLY
+
+    if isinstance(error, KeyError):
+        logger.error(f"Unexpected response structure: {error}")
+        return RESPONSE_FORMAT_ERROR_REPLY
+
+    logger.error(f"Unexpected error occurred: {error}")
+    return GENERIC_ERROR_REPLY
+
+def is_fallback_reply(reply: str) -> bool:
+    """True if `reply` is an error message or was cut short, rather than a complete completion."""
+    return reply in (NETWORK_ERROR_REPLY, RESPONSE_FORMAT_ERROR_REPLY, GENERIC_ERROR_REPLY) or reply.endswith(INTERRUPTED_NOTICE)
@@ -0,0 +1,221 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+from backend.services.chat_history_store import (
+    ChatHistoryStore, conversation_metadata, message_record, conversation_preview, decode_cursor, index_page
+)
+from backend.utils import logger
+
+logger = logger.get_logger()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    conversation_id TEXT PRIMARY KEY,
+    metadata TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT '',
+    preview TEXT NOT NULL DEFAULT '',
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS messages (
+    conversation_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT,
+    content TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    PRIMARY KEY (conversation_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS conversations_by_created_at ON conversations (created_at DESC, conversation_id DESC);
+"""
+# Index columns missing from databases created before the conversation index existed
+INDEX_COLUMNS = {
+    "created_at": "TEXT NOT NULL DEFAULT ''",
+    "preview": "TEXT NOT NULL DEFAULT ''",
+    "message_count": "INTEGER NOT NULL DEFAULT 0",
+}
+
+class SQLiteChatHistoryStore(ChatHistoryStore):
+    """
+    Chat history stored in a local SQLite database.
+
+    Messages are rows keyed by (conversation_id, seq), so an append is one small
+    transaction and a retrieval is one range scan of the primary key. The
+    conversation index lives in the `conversations` table and is updated in the
+    same transaction as the append, so it is never out of date. Appends share one
+    connection behind a lock; reads use a connection per thread and the database
+    runs in WAL mode, so readers never wait for the writer. With the default path
+    ":memory:" nothing is persisted (dev/test mode); otherwise the file survives
+    restarts. Suited to single-node deployments and to load tests without Supabase.
+
+    Args:
+        path (str): Database file, or ":memory:".
+
+    Example:
+        >>> store = SQLiteChatHistoryStore("src/backend/data/chat_history.db")
+        >>> store.append("conversation-1", [{"role": "user", "content": "Hi"}], start_seq=0)
+        {'appended': 1, 'next_seq': 1}
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        # One writer connection shared by all threads; the lock serializes its use
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        with self._lock:
+            if path != ":memory:":
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._migrate()
+            self._connection.executescript(SCHEMA)
+
+    @contextmanager
+    def _reading(self):
+        """
+        Yields the calling thread's read connection.
+
+        An in-memory database exists only in its own connection, so reads then share
+        the writer connection and its lock.
+        """
+        if self.path == ":memory:":
+            with self._lock:
+                yield self._connection
+            return
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            with self._readers_lock:
+                self._readers.append(connection)
+        yield connection
+
+    def _migrate(self):
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(conversations)")}
+        if not columns:
+            return
+        missing = [column for column in INDEX_COLUMNS if column not in columns]
+        for column in missing:
+            self._connection.execute(f"ALTER TABLE conversations ADD COLUMN {column} {INDEX_COLUMNS[column]}")
+        if missing:
+            for conversation_id, metadata in self._connection.execute("SELECT conversation_id, metadata FROM conversations").fetchall():
+                first = self._connection.execute(
+                    "SELECT content FROM messages WHERE conversation_id = ? ORDER BY seq LIMIT 1", (conversation_id,)
+                ).fetchone()
+                count = self._connection.execute("SELECT COUNT(*) FROM messages WHERE conversation_id = ?", (conversation_id,)).fetchone()[0]
+                self._connection.execute(
+                    "UPDATE conversations SET created_at = ?, preview = ?, message_count = ? WHERE conversation_id = ?",
+                    (json.loads(metadata).get("timestamp", ""), conversation_preview([{"content": first[0]}] if first else []), count, conversation_id)
+                )
+            logger.info("Added the conversation index to the local chat history database.")
+
+    def append(self, conversation_id: str, messages: List[Dict[str, str]], start_seq: Optional[int] = None) -> dict:
+        now = datetime.now().isoformat()
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                next_seq = cursor.execute(
+                    "SELECT COALESCE(MAX(seq) + 1, 0) FROM messages WHERE conversation_id = ?", (conversation_id,)
+                ).fetchone()[0]
+                first_seq = next_seq if start_seq is None else start_seq
+                if first_seq > next_seq:
+                    raise ValueError(f"start_seq {first_seq} leaves a gap; the conversation has {next_seq} messages.")
+                pending = messages[next_seq - first_seq:]
+                if pending:
+                    if next_seq == 0:
+                        metadata = conversation_metadata(conversation_id)
+                        cursor.execute(
+                            "INSERT OR IGNORE INTO conversations (conversation_id, metadata, created_at, preview) VALUES (?, ?, ?, ?)",
+                            (conversation_id, json.dumps(metadata), metadata["timestamp"], conversation_preview(pending))
+                        )
+                    cursor.execute(
+                        "UPDATE conversations SET message_count = ? WHERE conversation_id = ?",
+                        (next_seq + len(pending), conversation_id)
+                    )
+                    cursor.executemany(
+                        "INSERT INTO messages (conversation_id, seq, role, content, ts) VALUES (?, ?, ?, ?, ?)",
+                        [
+                            (conversation_id, record["seq"], record["role"], record["content"], record["ts"])
+                            for record in (message_record(next_seq + offset, message, now) for offset, message in enumerate(pending))
+                        ]
+                    )
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+        return {"appended": len(pending), "next_seq": next_seq + len(pending)}
+
+    def retrieve(self, conversation_id: str, after_seq: Optional[int] = None, last: Optional[int] = None) -> Optional[dict]:
+        # Both bounds are primary-key range conditions, so only the selected rows are read
+        query = "SELECT seq, role, content, ts FROM messages WHERE conversation_id = ?"
+        parameters = [conversation_id]
+        if after_seq is not None:
+            query += " AND seq > ?"
+            parameters.append(after_seq)
+        with self._reading() as connection:
+            # One read transaction, so the count and the messages come from the same snapshot
+            connection.execute("BEGIN")
+            try:
+                row = connection.execute(
+                    "SELECT metadata, message_count FROM conversations WHERE conversation_id = ?", (conversation_id,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if last is not None:
+                    query += " ORDER BY seq DESC LIMIT ?"
+                    parameters.append(max(last, 0))
+                    rows = connection.execute(query, parameters).fetchall()[::-1]
+                else:
+                    rows = connection.execute(query + " ORDER BY seq", parameters).fetchall()
+            finally:
+                connection.execute("COMMIT")
+        return {
+            "conversation_id": conversation_id,
+            "messages": [{"seq": seq, "role": role, "content": content, "ts": ts} for seq, role, content, ts in rows],
+            "metadata": json.loads(row[0]),
+            "message_count": row[1]
+        }
+
+    def count_messages(self, conversation_id: str) -> Optional[int]:
+        with self._reading() as connection:
+            row = connection.execute(
+                "SELECT message_count FROM conversations WHERE conversation_id = ?", (conversation_id,)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def list_conversations(self) -> List[str]:
+        with self._reading() as connection:
+            rows = connection.execute("SELECT conversation_id FROM conversations ORDER BY conversation_id").fetchall()
+        return [conversation_id for conversation_id, in rows]
+
+    def list_conversation_index(self, limit: int, cursor: Optional[str] = None) -> dict:
+        query = "SELECT conversation_id, created_at, preview, message_count FROM conversations"
+        parameters = []
+        if cursor is not None:
+            query += " WHERE (created_at, conversation_id) < (?, ?)"
+            parameters.extend(decode_cursor(cursor))
+        query += " ORDER BY created_at DESC, conversation_id DESC LIMIT ?"
+        parameters.append(limit + 1)
+        with self._reading() as connection:
+            rows = connection.execute(query, parameters).fetchall()
+        entries = [
+            {"conversation_id": conversation_id, "created_at": created_at, "preview": preview, "message_count": message_count}
+            for conversation_id, created_at, preview, message_count in rows
+        ]
+        return index_page(entries, limit)
+
+    def close(self):
+        with self._readers_lock:
+            for connection in self._readers:
+                connection.close()
+            self._readers.clear()
+        with self._lock:
+            self._connection.close()
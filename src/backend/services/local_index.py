@@ -0,0 +1,328 @@
+import os
+import json
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from backend.services.vector_store import VectorIndex, as_record
+from backend.utils import logger
+
+logger = logger.get_logger()
+
+VECTORS_FILE = "vectors.f32"
+RECORDS_FILE = "records.jsonl"
+TEMP_SUFFIX = ".tmp"
+MIN_CAPACITY = 1024
+COMPACTION_MIN_DELETED = 1024
+DEFAULT_NAMESPACE_DIR = "_default"
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scales every row to unit length so cosine similarity becomes a dot product."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+class NamespaceStore:
+    """
+    Vectors of one namespace, stored as unit-length rows of a float32 matrix.
+
+    With a directory, the matrix is a memory-mapped file and IDs/metadata are kept in
+    an append-only JSONL log that is replayed on load. Without one, everything stays
+    in memory. Deleted rows are tombstoned and reclaimed by `compact`, which renumbers
+    the rows; callers that track row numbers pass `auto_compact=False` and compact themselves.
+    """
+
+    def __init__(self, dimension: int, directory: Optional[str] = None, auto_compact: bool = True):
+        self.dimension = dimension
+        self.directory = directory
+        self.auto_compact = auto_compact
+        self.ids: List[Optional[str]] = []
+        self.metadata: List[Optional[dict]] = []
+        self.rows: Dict[str, int] = {}
+        self.count = 0
+        self.deleted = 0
+        self.matrix = np.zeros((0, dimension), dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    @property
+    def size(self) -> int:
+        return self.count - self.deleted
+
+    def upsert(self, records: List[tuple]) -> List[int]:
+        """Stores the records and returns the row number assigned to each of them."""
+        if not records:
+            return []
+        vectors = normalize_rows(np.asarray([values for _, values, _ in records], dtype=np.float32))
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(f"Vector dimension {vectors.shape[1]} does not match index dimension {self.dimension}.")
+
+        new_rows = sum(1 for vector_id, _, _ in records if vector_id not in self.rows)
+        self._ensure_capacity(self.count + new_rows)
+
+        log_entries = []
+        assigned_rows = []
+        for (vector_id, _, metadata), vector in zip(records, vectors):
+            row = self.rows.get(vector_id)
+            if row is None:
+                row = self.count
+                self.count += 1
+                self.rows[vector_id] = row
+                self.ids.append(vector_id)
+                self.metadata.append(metadata)
+            else:
+                self.metadata[row] = metadata
+            self.matrix[row] = vector
+            self.alive[row] = True
+            assigned_rows.append(row)
+            log_entries.append({"op": "upsert", "id": vector_id, "row": row, "metadata": metadata})
+        self._persist(log_entries)
+        return assigned_rows
+
+    def delete(self, ids: List[str]):
+        log_entries = []
+        for vector_id in ids:
+            row = self.rows.pop(vector_id, None)
+            if row is None:
+                continue
+            self.ids[row] = None
+            self.metadata[row] = None
+            self.alive[row] = False
+            self.deleted += 1
+            log_entries.append({"op": "delete", "id": vector_id})
+        self._persist(log_entries)
+        if self.auto_compact and self.needs_compaction:
+            self.compact()
+
+    @property
+    def needs_compaction(self) -> bool:
+        return self.deleted >= COMPACTION_MIN_DELETED and self.deleted > self.count // 2
+
+    def query(self, vector: List[float], top_k: int, **kwargs) -> List[tuple]:
+        if self.size == 0 or top_k <= 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        scores = self.matrix[:self.count] @ query
+        if self.deleted:
+            scores = np.where(self.alive[:self.count], scores, -np.inf)
+
+        top_k = min(top_k, self.size)
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        ordered = candidates[np.argsort(-scores[candidates])]
+        return [(self.ids[row], float(scores[row]), self.metadata[row]) for row in ordered]
+
+    def compact(self):
+        """
+        Rewrites the store without tombstoned rows.
+
+        The new matrix and record log are written to temporary files and swapped in
+        with `os.replace`, so a failure while writing leaves the old files intact; a
+        crash between the two renames is finished by `_load`.
+        """
+        live_rows = np.flatnonzero(self.alive[:self.count])
+        ids = [self.ids[row] for row in live_rows]
+        metadata = [self.metadata[row] for row in live_rows]
+        vectors = np.array(self.matrix[live_rows], dtype=np.float32)
+
+        if self.directory:
+            vectors_path = os.path.join(self.directory, VECTORS_FILE)
+            records_path = os.path.join(self.directory, RECORDS_FILE)
+            with open(vectors_path + TEMP_SUFFIX, "wb") as file:
+                vectors.tofile(file)
+                file.flush()
+                os.fsync(file.fileno())
+            with open(records_path + TEMP_SUFFIX, "w", encoding="utf-8") as file:
+                file.writelines(
+                    json.dumps({"op": "upsert", "id": vector_id, "row": row, "metadata": entry}) + "\n"
+                    for row, (vector_id, entry) in enumerate(zip(ids, metadata))
+                )
+                file.flush()
+                os.fsync(file.fileno())
+            self._close_matrix()
+            os.replace(vectors_path + TEMP_SUFFIX, vectors_path)
+            os.replace(records_path + TEMP_SUFFIX, records_path)
+            self._open_matrix(0)
+        else:
+            self.matrix = vectors
+        self.ids, self.metadata = ids, metadata
+        self.rows = {vector_id: row for row, vector_id in enumerate(ids)}
+        self.count, self.deleted = len(ids), 0
+        self.alive = np.ones(max(self.matrix.shape[0], self.count), dtype=bool)
+        logger.info(f"Compacted local vector store to {self.count} vectors.")
+
+    def _ensure_capacity(self, needed: int):
+        capacity = self.matrix.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, MIN_CAPACITY)
+        if self.directory:
+            self._close_matrix()
+            self._open_matrix(new_capacity)
+        else:
+            matrix = np.zeros((new_capacity, self.dimension), dtype=np.float32)
+            matrix[:capacity] = self.matrix
+            self.matrix = matrix
+        alive = np.zeros(new_capacity, dtype=bool)
+        alive[:capacity] = self.alive
+        self.alive = alive
+
+    def _open_matrix(self, capacity: int):
+        path = os.path.join(self.directory, VECTORS_FILE)
+        row_bytes = self.dimension * np.dtype(np.float32).itemsize
+        with open(path, "ab") as file:
+            if file.tell() < capacity * row_bytes:
+                file.truncate(capacity * row_bytes)
+        capacity = os.path.getsize(path) // row_bytes
+        if capacity == 0:
+            self.matrix = np.zeros((0, self.dimension), dtype=np.float32)
+        else:
+            self.matrix = np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+
+    def _close_matrix(self):
+        if isinstance(self.matrix, np.memmap):
+            self.matrix.flush()
+        self.matrix = np.zeros((0, self.dimension), dtype=np.float32)
+
+    def _persist(self, log_entries: List[dict]):
+        if not self.directory or not log_entries:
+            return
+        if isinstance(self.matrix, np.memmap):
+            self.matrix.flush()
+        with open(os.path.join(self.directory, RECORDS_FILE), "a", encoding="utf-8") as file:
+            file.writelines(json.dumps(entry) + "\n" for entry in log_entries)
+            file.flush()
+            os.fsync(file.fileno())
+
+    def _recover_compaction(self):
+        """Completes or discards a compaction interrupted by a crash."""
+        vectors_temp = os.path.join(self.directory, VECTORS_FILE + TEMP_SUFFIX)
+        records_temp = os.path.join(self.directory, RECORDS_FILE + TEMP_SUFFIX)
+        if os.path.exists(records_temp) and not os.path.exists(vectors_temp):
+            # The new matrix is already in place; only the record log was not swapped yet
+            os.replace(records_temp, os.path.join(self.directory, RECORDS_FILE))
+            logger.warning(f"Completed an interrupted compaction of '{self.directory}'.")
+        for path in (vectors_temp, records_temp):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _load(self):
+        self._recover_compaction()
+        self._open_matrix(0)
+        records_path = os.path.join(self.directory, RECORDS_FILE)
+        if os.path.exists(records_path):
+            torn_at = None
+            with open(records_path, "rb") as file:
+                for line in iter(file.readline, b""):
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        if not line.endswith(b"\n"):
+                            # A torn last line from a crash mid-write; cut it off so later appends start on a fresh line
+                            torn_at = file.tell() - len(line)
+                        logger.warning(f"Skipping incomplete record in '{records_path}'.")
+                        continue
+                    if entry["op"] == "upsert":
+                        row = entry["row"]
+                        while len(self.ids) <= row:
+                            self.ids.append(None)
+                            self.metadata.append(None)
+                        self.ids[row] = entry["id"]
+                        self.metadata[row] = entry["metadata"]
+                        self.rows[entry["id"]] = row
+                    else:
+                        row = self.rows.pop(entry["id"], None)
+                        if row is not None:
+                            self.ids[row] = None
+                            self.metadata[row] = None
+            if torn_at is not None:
+                with open(records_path, "r+b") as file:
+                    file.truncate(torn_at)
+        self.count = len(self.ids)
+        self.alive = np.zeros(max(self.matrix.shape[0], self.count), dtype=bool)
+        self.alive[list(self.rows.values())] = True
+        self.deleted = self.count - len(self.rows)
+
+class LocalVectorIndex(VectorIndex):
+    """
+    Local vector index with exact top-k cosine search in NumPy.
+
+    Each namespace keeps its vectors as unit-length rows of a float32 matrix, so a
+    query is one matrix-vector product followed by `argpartition`. With `path`, the
+    matrix is memory-mapped from `<path>/<namespace>/vectors.f32` and survives
+    restarts; without it the index lives in memory only (dev/test mode).
+
+    Args:
+        path (Optional[str]): Directory for persistent storage.
+        dimension (int): Vector dimension. Default is 384 (all-MiniLM-L6-v2).
+
+    Example:
+        >>> index = LocalVectorIndex("vector-db")
+        >>> index.upsert(vectors=[("id-1", embedding, {"answer": "..."})], namespace="ns")
+        >>> index.query(vector=embedding, top_k=3, namespace="ns", include_metadata=True)
+    """
+
+    def __init__(self, path: Optional[str] = None, dimension: int = 384):
+        self.path = path
+        self.dimension = dimension
+        self._namespaces: Dict[str, NamespaceStore] = {}
+        self._lock = threading.RLock()
+        if path:
+            os.makedirs(path, exist_ok=True)
+            for name in sorted(os.listdir(path)):
+                if os.path.isdir(os.path.join(path, name)):
+                    self._namespace("" if name == DEFAULT_NAMESPACE_DIR else name)
+            logger.info(f"Loaded local vector index from '{path}': {self.describe_index_stats()['total_vector_count']} vectors.")
+
+    def _namespace(self, namespace: str) -> NamespaceStore:
+        store = self._namespaces.get(namespace)
+        if store is None:
+            directory = os.path.join(self.path, namespace or DEFAULT_NAMESPACE_DIR) if self.path else None
+            store = self._namespaces[namespace] = self._create_store(directory)
+        return store
+
+    def _create_store(self, directory: Optional[str]) -> NamespaceStore:
+        return NamespaceStore(self.dimension, directory)
+
+    def upsert(self, vectors: List, namespace: str = "") -> dict:
+        records = [as_record(vector) for vector in vectors]
+        with self._lock:
+            self._namespace(namespace).upsert(records)
+        return {"upserted_count": len(records)}
+
+    def query(self, vector: List[float], top_k: int = 10, namespace: str = "", include_metadata: bool = False, **kwargs) -> dict:
+        with self._lock:
+            store = self._namespaces.get(namespace)
+            results = store.query(vector, top_k, **kwargs) if store else []
+        matches = []
+        for vector_id, score, metadata in results:
+            match = {"id": vector_id, "score": score}
+            if include_metadata:
+                match["metadata"] = metadata
+            matches.append(match)
+        return {"matches": matches, "namespace": namespace}
+
+    def delete(self, ids: Optional[List[str]] = None, namespace: str = "", delete_all: bool = False) -> dict:
+        with self._lock:
+            store = self._namespaces.get(namespace)
+            if store is None:
+                return {}
+            if delete_all:
+                store.delete([vector_id for vector_id in store.ids if vector_id is not None])
+                store.compact()
+            else:
+                store.delete(ids or [])
+        return {}
+
+    def describe_index_stats(self) -> dict:
+        with self._lock:
+            namespaces = {name: {"vector_count": store.size} for name, store in self._namespaces.items()}
+        return {
+            "dimension": self.dimension,
+            "namespaces": namespaces,
+            "total_vector_count": sum(stats["vector_count"] for stats in namespaces.values()),
+        }
@@ -1,38 +1,121 @@
 import os
+import asyncio
+import functools
 # # import sys
 # # src_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), "../..", "backend"))
 # # sys.path.append(src_directory)
-from pinecone import Pinecone, ServerlessSpec
 import time
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 from dotenv import load_dotenv
 from backend.utils import logger
 import pandas as pd
-from backend.services.embedding_service import get_text_embedding
-from sentence_transformers import CrossEncoder
-
-reranker = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
+from backend.services.embedding_service import iter_bulk_embeddings
+from backend.services.local_index import LocalVectorIndex
+from backend.services.ann_index import IVFVectorIndex
+from backend.services import reranker_service
+from backend.services.response_cache import response_cache
+from backend.services.reranker_service import RERANK_ENABLED, RERANK_CANDIDATES
 
 load_dotenv()
 PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY")
 logger = logger.get_logger()
 NAMESPACE = "health-care-dataset"
 INDEX_NAME = "health-care-index"
-PINECONE = Pinecone(api_key=PINECONE_API_KEY)
+VECTOR_STORE = os.getenv("VECTOR_STORE", "pinecone")  # "pinecone", "local", "ivf" or "memory"
+LOCAL_VECTOR_STORE_PATH = os.getenv("LOCAL_VECTOR_STORE_PATH", "vector-db")
+UPSERT_BATCH_SIZE = 500
+UPSERT_MAX_IN_FLIGHT = int(os.getenv("UPSERT_MAX_IN_FLIGHT", 4))
+UPSERT_MAX_RETRIES = int(os.getenv("UPSERT_MAX_RETRIES", 3))
+UPSERT_RETRY_BACKOFF = float(os.getenv("UPSERT_RETRY_BACKOFF", 1.0))
+PINECONE_INDEX_READY_TIMEOUT = float(os.getenv("PINECONE_INDEX_READY_TIMEOUT", 120))
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", 8))
+# Long answers are stored as child chunk vectors linked to their parent pair; queries then over-fetch and collapse
+ANSWER_CHUNKING = os.getenv("ANSWER_CHUNKING", "false").lower() == "true"
+ANSWER_CHUNK_OVERFETCH = int(os.getenv("ANSWER_CHUNK_OVERFETCH", 4))
+ANSWER_CHUNKS_PER_HIT = int(os.getenv("ANSWER_CHUNKS_PER_HIT", 2))
+
+_retrieval_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="vector-query")
+
+def child_vector_id(parent_id: str, chunk: int) -> str:
+    return f"{parent_id}-{chunk}"
+
+def parent_vector_id(vector_id: str) -> str:
+    """Returns the ID of the question-answer pair a vector belongs to (itself for a parent)."""
+    return vector_id.split("-", 1)[0]
+
+def collapse_to_parents(matches: list, min_score: float = float("-inf"), max_chunks: int = ANSWER_CHUNKS_PER_HIT) -> list:
+    """
+    Merges chunk hits into one match per question-answer pair.
+
+    A child chunk carries `parent_id`, `chunk` and `chunks` in its metadata. Chunks
+    of the same parent are merged into one match scored by its best hit, whose
+    answer is its best `max_chunks` chunks scoring at least `min_score`, in document
+    order. Matches without a parent pass through unchanged.
+
+    Args:
+        matches (list): Index matches with 'id', 'score' and 'metadata', best first.
+        min_score (float): Minimum score of a chunk included in the answer.
+        max_chunks (int): Maximum chunks per answer.
+
+    Returns:
+        list: One match per parent, best first.
+    """
+    groups = {}
+    for match in matches:
+        metadata = match.get("metadata") or {}
+        parent_id = metadata.get("parent_id") or match.get("id")
+        group = groups.get(parent_id)
+        if group is None:
+            group = groups[parent_id] = {"id": parent_id, "score": match.get("score", 0), "metadata": dict(metadata), "chunks": {}}
+        group["score"] = max(group["score"], match.get("score", 0))
+        if metadata.get("parent_id"):
+            group["chunks"][metadata.get("chunk", 0)] = (match.get("score", 0), metadata.get("answer", ""))
+        else:
+            group["metadata"] = dict(metadata)
+    collapsed = []
+    for group in groups.values():
+        metadata = group["metadata"]
+        if group["chunks"]:
+            ranked = sorted(group["chunks"].items(), key=lambda item: item[1][0], reverse=True)
+            best = [(chunk, text) for chunk, (score, text) in ranked[:max_chunks] if score >= min_score] or [(ranked[0][0], ranked[0][1][1])]
+            metadata["answer"] = " ... ".join(text for _, text in sorted(best))
+        metadata.pop("parent_id", None)
+        metadata.pop("chunk", None)
+        metadata.pop("chunks", None)
+        collapsed.append({"id": group["id"], "score": group["score"], "metadata": metadata})
+    return sorted(collapsed, key=lambda match: match["score"], reverse=True)
+
+def _query_top_k(n_result: int, rerank: bool) -> int:
+    top_k = max(n_result, RERANK_CANDIDATES) if rerank else n_result
+    return top_k * ANSWER_CHUNK_OVERFETCH if ANSWER_CHUNKING else top_k
 
 def rerank_results(query, results, score_threshold=0.5):
-    pairs = [(query, result["metadata"]["question"]) for result in results]
-    scores = reranker.predict(pairs)
-    
-    # Filter based on score threshold
-    filtered_results = [
-        result for score, result in zip(scores, results) if score >= score_threshold
+    """
+    Reranks raw index matches with the cross-encoder and drops those below `score_threshold`.
+
+    Args:
+        query (str): The user query.
+        results (list): Index matches with 'id' and 'metadata.question'.
+        score_threshold (float): Minimum reranker score to keep a match.
+
+    Returns:
+        list: Matches sorted by reranker score in descending order.
+    """
+    candidates = [
+        {"id": result["id"], "question": result["metadata"]["question"], "match": result}
+        for result in results
+    ]
+    reranked = reranker_service.rerank(query, candidates, top_k=len(candidates), timeout_ms=0)
+    return [
+        candidate["match"] for candidate in reranked
+        if candidate.get("reranker_score", score_threshold) >= score_threshold
     ]
-    
-    # Sort remaining results by score in descending order
-    return sorted(filtered_results, key=lambda x: x['score'], reverse=True)
 
-def initialize_pinecone_index(pinecone, index_name, dimension=384, metric="cosine", cloud="aws", region="us-east-1"):
+def initialize_pinecone_index(pinecone, index_name, dimension=384, metric="cosine", cloud="aws", region="us-east-1", ready_timeout=PINECONE_INDEX_READY_TIMEOUT):
     """
     Retrieves an existing Pinecone index or creates a new one if it does not exist.
 
@@ -46,9 +129,10 @@ def initialize_pinecone_index(pinecone, index_name, dimension=384, metric="cosin
         metric (str, optional): Distance metric for the index. Default is "cosine".
         cloud (str, optional): Cloud provider for hosting the index. Default is "aws".
         region (str, optional): Region where the index will be hosted. Default is "us-east-1".
+        ready_timeout (float, optional): Seconds to wait for a new index to become ready.
 
     Returns:
-        pinecone.Index: The Pinecone index instance.
+        pinecone.Index: The Pinecone index instance, or None if it could not be initialized.
 
     Raises:
         Exception: If an error occurs during index creation or retrieval.
@@ -57,6 +141,8 @@ def initialize_pinecone_index(pinecone, index_name, dimension=384, metric="cosin
         >>> index = get_or_create_index(pinecone, "sample_index")
         Logs: "Index 'sample_index' is ready and accessible."
     """
+    from pinecone import ServerlessSpec
+
     try:
         logger.info(f"Checking if the index '{index_name}' exists...")
 
@@ -73,16 +159,20 @@ def initialize_pinecone_index(pinecone, index_name, dimension=384, metric="cosin
             )
             logger.info(f"Index '{index_name}' creation initiated. Waiting for it to be ready...")
 
-            # Wait until index is ready
+            # Wait until index is ready, backing off between polls
+            deadline = time.monotonic() + ready_timeout
+            delay = 0.25
             while True:
                 index_status = pinecone.describe_index(index_name)
                 if index_status.status.get("ready", False):
                     index = pinecone.Index(index_name)
                     logger.info(f"Index '{index_name}' is ready and accessible.")
                     return index
-                else:
-                    logger.debug(f"Index '{index_name}' is not ready yet. Checking again in 1 second.")
-                    time.sleep(1)
+                if time.monotonic() + delay > deadline:
+                    raise TimeoutError(f"Index '{index_name}' was not ready after {ready_timeout} seconds.")
+                logger.debug(f"Index '{index_name}' is not ready yet. Checking again in {delay:.2f} seconds.")
+                time.sleep(delay)
+                delay = min(delay * 2, 5.0)
         else:
             # Return the existing index
             index = pinecone.Index(index_name)
@@ -93,7 +183,51 @@ def initialize_pinecone_index(pinecone, index_name, dimension=384, metric="cosin
         logger.error(f"Error occurred while getting or creating the Pinecone index: {str(e)}", exc_info=True)
         return None
     
-index = initialize_pinecone_index(PINECONE, INDEX_NAME)
+def create_vector_index(backend=VECTOR_STORE):
+    """
+    Creates the vector index selected by the `VECTOR_STORE` setting.
+
+    Args:
+        backend (str): "pinecone" for the hosted index, "local" for the memory-mapped
+                       NumPy index stored under `LOCAL_VECTOR_STORE_PATH`, "ivf" for the
+                       approximate (IVF) local index in the same directory, or "memory"
+                       for a non-persistent local index (dev/test mode, no network).
+
+    Returns:
+        The index instance. All backends expose the same `query/upsert/delete` calls.
+    """
+    if backend == "local":
+        logger.info(f"Using the local vector index at '{LOCAL_VECTOR_STORE_PATH}'.")
+        return LocalVectorIndex(LOCAL_VECTOR_STORE_PATH)
+    if backend == "ivf":
+        logger.info(f"Using the local IVF vector index at '{LOCAL_VECTOR_STORE_PATH}'.")
+        return IVFVectorIndex(LOCAL_VECTOR_STORE_PATH)
+    if backend == "memory":
+        logger.info("Using the in-memory vector index.")
+        return LocalVectorIndex()
+    from pinecone import Pinecone
+    return initialize_pinecone_index(Pinecone(api_key=PINECONE_API_KEY), INDEX_NAME)
+
+index = None
+_index_lock = threading.Lock()
+
+def get_index():
+    """
+    Returns the vector index, creating it on first use.
+
+    Opening the index (network round trips for Pinecone, replaying the log for the
+    local backends) is kept out of import time so the API starts immediately. A
+    failed initialization is not cached; the next call tries again.
+    """
+    global index
+    if index is None:
+        with _index_lock:
+            if index is None:
+                index = create_vector_index()
+    return index
+
+def is_index_loaded() -> bool:
+    return index is not None
     
 def delete_records_by_ids(ids_to_delete):
     """
@@ -118,23 +252,28 @@ def delete_records_by_ids(ids_to_delete):
         Logs: "IDs deleted successfully."
 
     Notes:
-        - The method assumes `get_index()` initializes the index object.
+        - The index is opened by `get_index()` on first use.
         - Deletion occurs within the specified `NAMESPACE`.
     """
     try:
-        index.delete(ids=ids_to_delete, namespace=NAMESPACE)
+        get_index().delete(ids=ids_to_delete, namespace=NAMESPACE)
+        reranker_service.clear_score_cache()
+        response_cache.invalidate()
         logger.info("IDs deleted successfully.")
     except Exception as e:
         return f"Failed to delete the IDs: {e}"
     
 
-def retrieve_relevant_metadata(embedding, prompt, n_result=3, score_threshold=0.47):
+def retrieve_relevant_metadata(embedding, prompt, n_result=3, score_threshold=0.47, rerank=RERANK_ENABLED):
     """
     Retrieves and reranks relevant context data based on a given prompt.
+
+    With `rerank`, the top `RERANK_CANDIDATES` matches are fetched, reranked by the
+    cross-encoder in one batched call and truncated to `n_result`.
     """
     try:
-        response = index.query(
-            top_k=n_result,
+        response = get_index().query(
+            top_k=_query_top_k(n_result, rerank),
             vector=embedding,
             namespace=NAMESPACE,
             include_metadata=True
@@ -149,77 +288,168 @@ def retrieve_relevant_metadata(embedding, prompt, n_result=3, score_threshold=0.
                 "score": str(entry.get('score', 0)),
                 "id": str(entry.get('id', 'N/A'))
             }
-            for entry in response.get('matches', [])
+            for entry in collapse_to_parents(response.get('matches', []), score_threshold)
             if float(entry.get('score', 0)) >= score_threshold
         ]
 
+        # Rerank the filtered results using a reranker model
+        if rerank and filtered_results:
+            filtered_results = reranker_service.rerank(prompt, filtered_results, top_k=n_result)
+            for item in filtered_results:
+                if "reranker_score" in item:
+                    item["reranker_score"] = str(item["reranker_score"])
+        filtered_results = filtered_results[:n_result]
+
         logger.info(f"Retrieved filtered data: {filtered_results}")
         return filtered_results if filtered_results else [{"response": "No relevant data found."}]
 
-        # # Rerank the filtered results using a reranker model
-        # if filtered_results:
-        #     pairs = [(prompt, item["question"]) for item in filtered_results]
-        #     scores = reranker.predict(pairs)  # Predict relevance scores
+    except Exception as e:
+        logger.error(f"Failed to fetch context for prompt: '{prompt}'. Error: {e}")
+        return [{"response": "Failed to fetch data due to an error."}]
 
-        #     # Attach reranker scores and sort by relevance
-        #     for item, score in zip(filtered_results, scores):
-        #         item["reranker_score"] = score
 
-        #     filtered_results.sort(key=lambda x: x["reranker_score"], reverse=True)
+def upsert_batch_with_retry(vectors, target_index=None, max_retries=UPSERT_MAX_RETRIES, backoff=UPSERT_RETRY_BACKOFF):
+    """
+    Upserts one batch of vectors, retrying with exponential backoff and jitter.
 
-        # return filtered_results if filtered_results else [{"response": "No relevant data found."}]
+    Args:
+        vectors (list): Vectors in any format accepted by `index.upsert`.
+        target_index: Index to write to. Defaults to `get_index()`.
+        max_retries (int): Maximum number of attempts.
+        backoff (float): Base delay in seconds; doubled after every failed attempt.
 
-    except Exception as e:
-        logger.error(f"Failed to fetch context for prompt: '{prompt}'. Error: {e}")
-        return [{"response": "Failed to fetch data due to an error."}]
+    Returns:
+        int: Number of attempts needed.
 
+    Raises:
+        Exception: The last error when every attempt failed.
+    """
+    target_index = target_index if target_index is not None else get_index()
+    for attempt in range(1, max_retries + 1):
+        try:
+            target_index.upsert(vectors=vectors, namespace=NAMESPACE)
+            return attempt
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = backoff * (2 ** (attempt - 1)) * (0.5 + random.random())
+            logger.warning(f"Upsert attempt {attempt} failed: {e}. Retrying in {delay:.2f}s.")
+            time.sleep(delay)
+
+def upsert_batches_concurrently(batches, max_in_flight=UPSERT_MAX_IN_FLIGHT, target_index=None, max_retries=UPSERT_MAX_RETRIES, backoff=UPSERT_RETRY_BACKOFF):
+    """
+    Uploads batches of vectors with several upserts in flight at once.
+
+    `batches` may be a lazy iterable; at most `max_in_flight` batches are held by the
+    uploader at any time, so a slow index applies back-pressure to the producer.
+    Every batch is retried independently and failures are reported per batch
+    instead of aborting the whole upload.
+
+    Args:
+        batches (Iterable[Tuple[Any, list]]): Pairs of (batch label, vectors).
+        max_in_flight (int): Maximum number of concurrent upsert requests.
+        target_index: Index to write to. Defaults to `get_index()`.
+        max_retries (int): Maximum number of attempts per batch.
+        backoff (float): Base retry delay in seconds.
+
+    Returns:
+        dict: Operation success status, number of batches and vectors uploaded,
+              and a `failures` list with the label, size and error of each failed batch.
+
+    Example:
+        >>> report = upsert_batches_concurrently([("rows 0-499", vectors)], target_index=LocalVectorIndex())
+        >>> report["success"]
+        True
+    """
+    slots = threading.Semaphore(max_in_flight)
+    lock = threading.Lock()
+    report = {"success": True, "batches": 0, "vectors": 0, "failures": []}
+
+    def upload(label, vectors):
+        try:
+            upsert_batch_with_retry(vectors, target_index, max_retries, backoff)
+            with lock:
+                report["batches"] += 1
+                report["vectors"] += len(vectors)
+        except Exception as e:
+            logger.error(f"Error uploading batch {label}: {e}")
+            with lock:
+                report["failures"].append({"batch": label, "size": len(vectors), "error": str(e)})
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="pinecone-upsert") as uploader:
+        for label, vectors in batches:
+            slots.acquire()
+            uploader.submit(upload, label, vectors)
+
+    report["success"] = not report["failures"]
+    return report
+
+def content_vector_id(question: str, answer: str, instruction: str = "") -> str:
+    """
+    Returns the vector ID of a question-answer pair: a hash of its content.
+
+    The same content always gets the same ID, so re-ingesting a row updates its
+    vector in place instead of adding a duplicate, whatever its position.
+    """
+    content = "\x1f".join(text or "" for text in (question, answer, instruction))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
 
 def upsert_vector_data(df: pd.DataFrame):
 
     """
     Generates embeddings for the given DataFrame and uploads data to Pinecone in batches.
+
+    Questions are encoded in large, length-sorted batches by `iter_bulk_embeddings`.
+    Encoded batches are uploaded by `upsert_batches_concurrently` with up to
+    `UPSERT_MAX_IN_FLIGHT` requests in flight, overlapping with the encoding of the next batch.
+    Vector IDs are content hashes (`content_vector_id`), so upserting a pair again updates it in place.
     
     Parameters:
-    - df (pd.DataFrame): DataFrame containing 'input', 'question', and 'answer' columns.
+    - df (pd.DataFrame): DataFrame containing 'input', 'output', and 'instruction' columns.
     
     Returns:
-    - None
+    - dict: Upload report from `upsert_batches_concurrently`.
     """
 
+    questions = df["input"].tolist()
+    answers = df["output"].tolist()
+    instructions = df["instruction"].tolist() if "instruction" in df else [""] * len(df)
+
+    def build_batches():
+        with tqdm(total=len(questions), desc="Generating Embeddings") as progress:
+            for positions, embeddings in iter_bulk_embeddings(questions):
+                for start in range(0, len(positions), UPSERT_BATCH_SIZE):
+                    vectors = []
+                    for position, embedding in zip(positions[start:start + UPSERT_BATCH_SIZE], embeddings[start:start + UPSERT_BATCH_SIZE]):
+                        position = int(position)
+                        question = questions[position]
+                        vector_id = content_vector_id(question, answers[position], instructions[position])
+                        metadata = {
+                            "question": question,
+                            "answer": answers[position],
+                            "instruction": instructions[position],
+                        }
+                        vectors.append((vector_id, embedding.tolist(), metadata))
+                    yield f"starting at row {int(positions[start])}", vectors
+                progress.update(len(positions))
+
     try:
-        df["embedding"] = [
-            get_text_embedding([q])[0] 
-            for q in tqdm(df["input"], desc="Generating Embeddings")
-        ]
+        report = upsert_batches_concurrently(build_batches())
+        reranker_service.clear_score_cache()
+        response_cache.invalidate()
     except Exception as e:
         logger.error(f"Error generating embeddings: {e}")
-        return
+        return {"success": False, "batches": 0, "vectors": 0, "failures": [{"batch": "all", "size": len(df), "error": str(e)}]}
 
-    # # Upload data to Pinecone in batches
-    BATCH_SIZE = 500
+    if report["success"]:
+        logger.info("All question-answer pairs stored successfully!")
+    else:
+        logger.error(f"{len(report['failures'])} batch(es) failed to upload.")
+    return report
 
-    for i in tqdm(range(0, len(df), BATCH_SIZE), desc="Uploading Data to Pinecone"):
-        batch = df.iloc[i : i + BATCH_SIZE]
-    
-        vectors = []
-        for idx, (embedding, (_, row_data)) in enumerate(zip(batch["embedding"], batch.iterrows())):
-            question = row_data.get("input")
-            vector_id = f"{question[:50]}:{i + idx}"  # Ensures IDs remain unique across 
-            metadata = {
-                "question": row_data.get("input"),
-                "answer": row_data.get("output"),
-                "instruction": row_data.get("instruction"),
-            }
-            vectors.append((vector_id, embedding, metadata))
-
-        try:
-            index.upsert(vectors=vectors,namespace=NAMESPACE)
-        except Exception as e:
-            logger.error(f"Error uploading batch starting at index {i}: {e}")
-
-    logger.info("All question-answer pairs stored successfully!")
-
-def retrieve_context_from_pinecone(embedding, n_result=3, score_threshold=0.4):
+def retrieve_context_from_pinecone(embedding, n_result=3, score_threshold=0.4, query=None, rerank=RERANK_ENABLED):
     """
     Retrieves relevant context from Pinecone using vector embeddings.
 
@@ -227,6 +457,8 @@ def retrieve_context_from_pinecone(embedding, n_result=3, score_threshold=0.4):
     - embedding (list): Embedding vector for query.
     - n_result (int): Number of top results to retrieve.
     - score_threshold (float): Minimum score threshold for relevance.
+    - query (str, optional): Query text, required for reranking.
+    - rerank (bool): Over-fetch `RERANK_CANDIDATES` matches and rerank them with the cross-encoder.
 
     Returns:
     - str: Combined context or fallback message.
@@ -235,9 +467,11 @@ def retrieve_context_from_pinecone(embedding, n_result=3, score_threshold=0.4):
         logger.warning("Invalid embedding received.")
         return "No relevant context found."
 
+    rerank = rerank and bool(query)
+
     try:
-        response = index.query(
-            top_k=n_result,
+        response = get_index().query(
+            top_k=_query_top_k(n_result, rerank),
             vector=embedding,
             namespace=NAMESPACE,
             include_metadata=True
@@ -249,16 +483,26 @@ def retrieve_context_from_pinecone(embedding, n_result=3, score_threshold=0.4):
             return "No relevant context found."
 
         # Filter and extract metadata
-        filtered_results = []
-        for entry in response.get('matches', []):
+        candidates = []
+        for entry in collapse_to_parents(response.get('matches', []), score_threshold):
             score = entry.get('score', 0)
-            answer = entry.get('metadata', {}).get('answer', 'N/A')
+            metadata = entry.get('metadata', {})
 
             if score >= score_threshold:
-                filtered_results.append(f"{answer} (Score: {score:.2f})")
+                candidates.append({
+                    "id": entry.get('id'),
+                    "question": metadata.get('question', ''),
+                    "answer": metadata.get('answer', 'N/A'),
+                    "score": score
+                })
             else:
                 logger.info(f"Entry skipped due to low score: {score:.2f}")
 
+        if rerank and candidates:
+            candidates = reranker_service.rerank(query, candidates, top_k=n_result)
+
+        filtered_results = [f"{item['answer']} (Score: {item['score']:.2f})" for item in candidates[:n_result]]
+
         # Combine results
         context = "\n".join(filtered_results) if filtered_results else "No relevant context found."
         
@@ -266,4 +510,18 @@ def retrieve_context_from_pinecone(embedding, n_result=3, score_threshold=0.4):
 
     except Exception as e:
         logger.error(f"Unexpected error in Pinecone retrieval: {e}", exc_info=True)
-        return "Error retrieving context. Please try again later."
\ No newline at end of file
+        return "Error retrieving context. Please try again later."
+
+async def retrieve_context_from_pinecone_async(embedding, n_result=3, score_threshold=0.4, query=None, rerank=RERANK_ENABLED):
+    """
+    Runs `retrieve_context_from_pinecone` on the dedicated retrieval executor.
+
+    The index query (a blocking HTTP call for Pinecone, a NumPy scan for the local
+    backends) and the optional reranking never run on the event loop. At most
+    `RETRIEVAL_WORKERS` retrievals run at once; further requests wait in the executor queue.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _retrieval_executor,
+        functools.partial(retrieve_context_from_pinecone, embedding, n_result, score_threshold, query, rerank)
+    )
@@ -0,0 +1,144 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Optional, Tuple
+from dotenv import load_dotenv
+from backend.services.embedding_cache import normalize_query
+from backend.utils import logger
+
+logger = logger.get_logger()
+
+load_dotenv()
+RERANKER_MODEL_NAME = os.getenv("RERANKER_MODEL_NAME", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 20))
+RERANK_TIMEOUT_MS = float(os.getenv("RERANK_TIMEOUT_MS", 0))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", 10000))
+# Scorings allowed in the background executor (running plus queued) when RERANK_TIMEOUT_MS is set
+RERANK_MAX_PENDING = int(os.getenv("RERANK_MAX_PENDING", 2))
+
+_model = None
+_model_lock = threading.Lock()
+_score_cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+_cache_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+_pending_slots = threading.BoundedSemaphore(max(RERANK_MAX_PENDING, 1))
+
+def get_reranker():
+    """
+    Returns the cross-encoder, loading it on first use.
+
+    Processes that never rerank never pay for loading the model weights.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import CrossEncoder
+                logger.info(f"Loading reranker model '{RERANKER_MODEL_NAME}'...")
+                _model = CrossEncoder(RERANKER_MODEL_NAME)
+    return _model
+
+def is_reranker_loaded() -> bool:
+    return _model is not None
+
+def score_documents(query: str, documents: List[Tuple[str, str]]) -> List[float]:
+    """
+    Scores (query, document) pairs with the cross-encoder.
+
+    Scores are cached per (normalized query, document ID); only uncached pairs are
+    sent to the model, all of them in a single batched `predict` call.
+
+    Args:
+        query (str): The user query.
+        documents (List[Tuple[str, str]]): Pairs of (document ID, document text).
+
+    Returns:
+        List[float]: Relevance score of each document, in input order.
+    """
+    key = normalize_query(query)
+    scores: List[Optional[float]] = []
+    missing = []
+    with _cache_lock:
+        for position, (doc_id, text) in enumerate(documents):
+            score = _score_cache.get((key, doc_id))
+            if score is None:
+                missing.append(position)
+            else:
+                _score_cache.move_to_end((key, doc_id))
+            scores.append(score)
+
+    if missing:
+        predicted = get_reranker().predict([(query, documents[position][1]) for position in missing])
+        with _cache_lock:
+            for position, score in zip(missing, predicted):
+                score = float(score)
+                scores[position] = score
+                _score_cache[(key, documents[position][0])] = score
+            while len(_score_cache) > RERANK_CACHE_SIZE:
+                _score_cache.popitem(last=False)
+    return scores
+
+def rerank(query: str, candidates: List[dict], top_k: int, text_key: str = "question", id_key: str = "id", timeout_ms: float = RERANK_TIMEOUT_MS) -> List[dict]:
+    """
+    Reorders retrieval candidates by cross-encoder relevance and keeps the best `top_k`.
+
+    Each returned candidate gets a `reranker_score` entry. If scoring takes longer than
+    `timeout_ms`, the candidates are returned in their original (vector score) order;
+    a scoring that already started still finishes in the background and fills the
+    cache for next time, while one still queued is cancelled. At most
+    `RERANK_MAX_PENDING` scorings wait in the background; beyond that, requests
+    skip reranking instead of growing the backlog.
+
+    Args:
+        query (str): The user query.
+        candidates (List[dict]): Candidates ordered by vector similarity.
+        top_k (int): Number of candidates to return.
+        text_key (str): Key holding the text compared with the query.
+        id_key (str): Key holding the document ID used for caching.
+        timeout_ms (float): Latency cap for scoring; 0 disables the cap.
+
+    Returns:
+        List[dict]: At most `top_k` candidates.
+    """
+    if not candidates:
+        return []
+    documents = [(str(candidate.get(id_key)), str(candidate.get(text_key, ""))) for candidate in candidates]
+    try:
+        if timeout_ms > 0:
+            scores = _score_with_timeout(query, documents, timeout_ms)
+            if scores is None:
+                return candidates[:top_k]
+        else:
+            scores = score_documents(query, documents)
+    except Exception as e:
+        logger.error(f"Reranking failed: {e}. Falling back to vector ranking.")
+        return candidates[:top_k]
+
+    for candidate, score in zip(candidates, scores):
+        candidate["reranker_score"] = score
+    return sorted(candidates, key=lambda candidate: candidate["reranker_score"], reverse=True)[:top_k]
+
+def _score_with_timeout(query: str, documents: List[Tuple[str, str]], timeout_ms: float) -> Optional[List[float]]:
+    """Scores documents in the background executor; returns None when busy or too slow."""
+    if not _pending_slots.acquire(blocking=False):
+        logger.warning("Reranker backlog is full. Falling back to vector ranking.")
+        return None
+    try:
+        future = _executor.submit(score_documents, query, documents)
+    except Exception:
+        _pending_slots.release()
+        raise
+    future.add_done_callback(lambda _: _pending_slots.release())
+    try:
+        return future.result(timeout=timeout_ms / 1000)
+    except FutureTimeoutError:
+        future.cancel()
+        logger.warning(f"Reranking exceeded {timeout_ms} ms. Falling back to vector ranking.")
+        return None
+
+def clear_score_cache():
+    """Drops every cached score, e.g. after the knowledge base changed."""
+    with _cache_lock:
+        _score_cache.clear()
@@ -0,0 +1,187 @@
+import os
+import time
+import hashlib
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from dotenv import load_dotenv
+from backend.services.embedding_cache import normalize_query
+from backend.utils import logger
+
+logger = logger.get_logger()
+
+load_dotenv()
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 10000))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 3600))
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", 0.95))
+RESPONSE_CACHE_CONTEXT_TURNS = int(os.getenv("RESPONSE_CACHE_CONTEXT_TURNS", 2))
+
+def context_fingerprint(conversation_history: List[Dict[str, str]], turns: int = RESPONSE_CACHE_CONTEXT_TURNS) -> str:
+    """
+    Hashes the `turns` messages preceding the latest user query.
+
+    Two questions only share a cached answer when they were asked after the same
+    short context, so a follow-up like "what about children?" is not answered
+    with a reply written for a different conversation.
+
+    Args:
+        conversation_history (List[Dict[str, str]]): Conversation ending with the user query.
+        turns (int): Number of preceding messages included in the fingerprint.
+
+    Returns:
+        str: Hex digest of the normalized context.
+    """
+    context = conversation_history[:-1][-turns:] if turns > 0 else []
+    digest = hashlib.sha1()
+    for message in context:
+        digest.update(f"{message.get('role', '')}\x1f{normalize_query(message.get('content', ''))}\x1e".encode("utf-8"))
+    return digest.hexdigest()
+
+class SemanticResponseCache:
+    """
+    Cache of assistant replies looked up by query-embedding similarity.
+
+    Query embeddings are stored as unit-length rows of a fixed-size float32 matrix,
+    so a lookup is a single matrix-vector product over the live slots. A hit needs a
+    cosine similarity of at least `threshold` and an identical context fingerprint.
+    Expired entries are skipped and reclaimed; when the cache is full, the least
+    recently used entry is evicted.
+
+    `invalidate` drops every entry and bumps `generation`. Callers read the generation
+    before computing a reply and pass it to `put`, so a reply built from the old
+    knowledge base is not stored after an invalidation.
+
+    Args:
+        max_entries (int): Maximum number of cached replies.
+        ttl_seconds (Optional[float]): Entry lifetime; `None` or 0 disables expiry.
+        threshold (float): Minimum cosine similarity for a hit.
+        dimension (int): Embedding dimension.
+
+    Example:
+        >>> cache = SemanticResponseCache(max_entries=1000, threshold=0.95)
+        >>> generation = cache.generation
+        >>> cache.put(embedding, fingerprint, "Drink plenty of water.", generation)
+        >>> cache.get(similar_embedding, fingerprint)
+        'Drink plenty of water.'
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, ttl_seconds: Optional[float] = RESPONSE_CACHE_TTL_SECONDS, threshold: float = RESPONSE_CACHE_THRESHOLD, dimension: int = 384):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds or None
+        self.threshold = threshold
+        self.dimension = dimension
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._matrix = np.zeros((max_entries, dimension), dtype=np.float32)
+        self._live = np.zeros(max_entries, dtype=bool)
+        self._created_at = np.zeros(max_entries, dtype=np.float64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._fingerprints: List[Optional[str]] = [None] * max_entries
+        self._replies: List[Optional[str]] = [None] * max_entries
+        self._lock = threading.Lock()
+
+    def get(self, embedding: List[float], fingerprint: str) -> Optional[str]:
+        """
+        Returns the reply cached for the most similar query with the same context, or `None`.
+
+        Args:
+            embedding (List[float]): Embedding of the user query.
+            fingerprint (str): Context fingerprint from `context_fingerprint`.
+
+        Returns:
+            Optional[str]: The cached reply.
+        """
+        query = self._normalize(embedding)
+        if query is None:
+            return None
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            slots = np.flatnonzero(self._live)
+            if len(slots):
+                scores = self._matrix[slots] @ query
+                for position in np.argsort(-scores):
+                    if scores[position] < self.threshold:
+                        break
+                    slot = slots[position]
+                    if self._fingerprints[slot] == fingerprint:
+                        self._last_used[slot] = now
+                        self.hits += 1
+                        return self._replies[slot]
+            self.misses += 1
+            return None
+
+    def put(self, embedding: List[float], fingerprint: str, reply: str, generation: int):
+        """
+        Stores a reply unless the cache was invalidated after `generation` was read.
+
+        Args:
+            embedding (List[float]): Embedding of the user query.
+            fingerprint (str): Context fingerprint from `context_fingerprint`.
+            reply (str): Assistant reply to cache.
+            generation (int): Value of `generation` read before the reply was computed.
+        """
+        vector = self._normalize(embedding)
+        if vector is None or not reply or self.max_entries == 0:
+            return
+        now = time.time()
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._expire(now)
+            free = np.flatnonzero(~self._live)
+            if len(free):
+                slot = free[0]
+            else:
+                slot = int(np.argmin(self._last_used))
+                self.evictions += 1
+            self._matrix[slot] = vector
+            self._live[slot] = True
+            self._created_at[slot] = now
+            self._last_used[slot] = now
+            self._fingerprints[slot] = fingerprint
+            self._replies[slot] = reply
+
+    def invalidate(self):
+        """Drops every cached reply, e.g. after the knowledge base changed."""
+        with self._lock:
+            self.generation += 1
+            self._live[:] = False
+            self._fingerprints = [None] * self.max_entries
+            self._replies = [None] * self.max_entries
+        logger.info("Semantic response cache invalidated.")
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the number of live entries."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": int(self._live.sum()),
+                "max_entries": self.max_entries,
+                "generation": self.generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def _normalize(self, embedding: List[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        if vector.shape != (self.dimension,):
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _expire(self, now: float):
+        if self.ttl_seconds is None:
+            return
+        expired = self._live & (now - self._created_at > self.ttl_seconds)
+        for slot in np.flatnonzero(expired):
+            self._fingerprints[slot] = None
+            self._replies[slot] = None
+        self._live &= ~expired
+
+response_cache = SemanticResponseCache()
@@ -1,13 +1,20 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 class ConversationInput(BaseModel):
-    conversation_history: list[dict]
+    conversation_history: list[dict] = []
+    conversation_id: Optional[str] = None
+    message: Optional[str] = None
 
 class ChatHistoryRequest(BaseModel):
     conversation_id: str
     messages: List[dict]
 
+class ChatHistoryAppendRequest(BaseModel):
+    conversation_id: str
+    messages: List[dict]
+    start_seq: Optional[int] = None
+
 class UpsertRequest(BaseModel):
     data: list
 
@@ -17,4 +24,5 @@ class DeleteRequest(BaseModel):
 class MetadataRequest(BaseModel):
     prompt: str
     n_result: int = 3
-    score_threshold: float = 0.45
\ No newline at end of file
+    score_threshold: float = 0.45
+    rerank: Optional[bool] = None
\ No newline at end of file
@@ -0,0 +1,77 @@
+import os
+import time
+import threading
+from dotenv import load_dotenv
+from backend.services import embedding_service, pinecone_service, reranker_service, tokenizer_service
+from backend.utils import logger
+
+logger = logger.get_logger()
+
+load_dotenv()
+STARTUP_MODE = os.getenv("STARTUP_MODE", "background")  # "background", "eager" or "lazy"
+
+_status = {"state": "pending", "components": {}, "started_at": None, "finished_at": None, "error": None}
+_status_lock = threading.Lock()
+_warmup_thread = None
+
+def _components():
+    components = [
+        ("embedding_model", embedding_service.get_model, embedding_service.is_model_loaded),
+        ("vector_index", pinecone_service.get_index, pinecone_service.is_index_loaded),
+        ("tokenizer", tokenizer_service.load_tokenizer, tokenizer_service.is_tokenizer_resolved),
+    ]
+    if reranker_service.RERANK_ENABLED:
+        components.append(("reranker_model", reranker_service.get_reranker, reranker_service.is_reranker_loaded))
+    return components
+
+def _set_status(**changes):
+    with _status_lock:
+        _status.update(changes)
+
+def warm_up():
+    """
+    Loads the embedding model, the vector index, the prompt tokenizer and (when enabled) the reranker.
+
+    Runs the encoder once so the first user request does not pay for lazy
+    initialization inside the model. Every component is attempted even if an
+    earlier one fails; the error of the first failure is recorded.
+    """
+    _set_status(state="loading", started_at=time.time(), error=None)
+    errors = []
+    for name, load, _ in _components():
+        started = time.perf_counter()
+        try:
+            if load() is None:
+                raise RuntimeError(f"{name} could not be initialized.")
+            if name == "embedding_model":
+                embedding_service.encode_texts(["warm-up"])
+            with _status_lock:
+                _status["components"][name] = {"ready": True, "seconds": round(time.perf_counter() - started, 3)}
+            logger.info(f"Warm-up: {name} ready in {time.perf_counter() - started:.2f}s.")
+        except Exception as e:
+            logger.error(f"Warm-up: failed to load {name}: {e}", exc_info=True)
+            errors.append(f"{name}: {e}")
+            with _status_lock:
+                _status["components"][name] = {"ready": False, "error": str(e)}
+    _set_status(state="failed" if errors else "ready", finished_at=time.time(), error=errors[0] if errors else None)
+
+def start_background_warmup() -> threading.Thread:
+    """Starts `warm_up` in a daemon thread (once) and returns the thread."""
+    global _warmup_thread
+    with _status_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=warm_up, name="startup-warmup", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+def is_ready() -> bool:
+    """True once every component is loaded, whether by warm-up or by a first request."""
+    return all(loaded() for _, _, loaded in _components())
+
+def readiness() -> dict:
+    """Returns the readiness flag together with the warm-up progress of each component."""
+    with _status_lock:
+        status = {**_status, "components": dict(_status["components"])}
+    for name, _, loaded in _components():
+        status["components"].setdefault(name, {"ready": loaded()})
+    return {"ready": is_ready(), "mode": STARTUP_MODE, **status}
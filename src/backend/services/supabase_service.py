@@ -1,10 +1,15 @@
 import json
 import os
 import sys
+import threading
 src_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), "../..", "backend"))
 sys.path.append(src_directory)
 from datetime import datetime
-from supabase import create_client, StorageException
+from typing import List, Optional
+from backend.services.chat_history_store import (
+    ChatHistoryStore, conversation_metadata, message_record, conversation_preview, decode_cursor, index_page, select_range
+)
+from backend.services.local_chat_history_store import SQLiteChatHistoryStore
 from backend.utils import logger
 from dotenv import load_dotenv
 
@@ -16,16 +21,27 @@ load_dotenv()
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 SUPABASE_BUCKET = os.getenv('SUPABASE_BUCKET')
-LLM_MODEL_NAME = os.getenv('LLM_MODEL_NAME')
+CHAT_HISTORY_STORE = os.getenv('CHAT_HISTORY_STORE', 'supabase')  # "supabase", "sqlite" or "memory"
+CHAT_HISTORY_SQLITE_PATH = os.getenv('CHAT_HISTORY_SQLITE_PATH', 'src/backend/data/chat_history.db')
+CHAT_HISTORY_INDEX_TABLE = os.getenv('CHAT_HISTORY_INDEX_TABLE', 'conversation_index')
 BUCKET_FOLDER = "chat-history"
-
-# Supabase Client Initialization
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+CHAT_HISTORY_COMPACT_SEGMENTS = int(os.getenv('CHAT_HISTORY_COMPACT_SEGMENTS', 32))
+SEGMENT_SUFFIX = ".jsonl"
+# Compaction merges small segments into segments of this many messages
+COMPACTED_SEGMENT_MESSAGES = 64
+META_FILE = "meta.json"
+APPEND_CONFLICT_RETRIES = 3
+CLAIMS_FOLDER = "claims"
+CLAIM_SUFFIX = ".claim"
+# A claim older than this whose segment was never written is treated as left behind by a crashed writer
+APPEND_CLAIM_TIMEOUT_SECONDS = int(os.getenv('APPEND_CLAIM_TIMEOUT_SECONDS', 60))
+# Storage list calls return at most this many objects per page
+LIST_PAGE_SIZE = 1000
 
 # File Path Generator
 def _get_file_path(conversation_id: str) -> str:
     """
-    Generates the file path for storing chat history JSON files.
+    Generates the file path of a conversation stored in the legacy single-file format.
 
     Args:
         conversation_id (str): Unique identifier for the conversation.
@@ -33,7 +49,28 @@ def _get_file_path(conversation_id: str) -> str:
     Returns:
         str: Path to the chat history JSON file.
     """
-    return f"chat-history/{conversation_id}.json"
+    return f"{BUCKET_FOLDER}/{conversation_id}.json"
+
+def _get_conversation_folder(conversation_id: str) -> str:
+    """Returns the folder holding the append-only segments of a conversation."""
+    return f"{BUCKET_FOLDER}/{conversation_id}"
+
+def _get_segment_path(conversation_id: str, first_seq: int, last_seq: int) -> str:
+    """
+    Generates the path of a history segment holding messages `first_seq`..`last_seq`.
+
+    Sequence numbers are encoded in the name so the next free sequence number and the
+    segments covering a range are known from a folder listing alone.
+    """
+    return f"{_get_conversation_folder(conversation_id)}/{first_seq:08d}-{last_seq:08d}{SEGMENT_SUFFIX}"
+
+def _get_claim_path(conversation_id: str, first_seq: int) -> str:
+    """
+    Generates the path of the marker claiming the segment that starts at `first_seq`.
+
+    Claims live in a subfolder, so they do not show up in segment listings.
+    """
+    return f"{_get_conversation_folder(conversation_id)}/{CLAIMS_FOLDER}/{first_seq:08d}{CLAIM_SUFFIX}"
 
 # JSON Loader with Safe Handling
 def _load_json(data: bytes) -> dict:
@@ -52,23 +89,500 @@ def _load_json(data: bytes) -> dict:
         logger.error("Failed to decode JSON data.")
         return {}
 
-# JSON Dumper with Indentation
+# Compact JSON Dumper
 def _dump_json(data: dict) -> str:
     """
-    Formats data as a JSON string with indentation for better readability.
+    Formats data as compact JSON (no indentation or spaces after separators).
 
     Args:
         data (dict): The data to format.
 
     Returns:
-        str: Formatted JSON string.
+        str: JSON string.
+    """
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+def _load_segment(data: bytes) -> list:
+    """Parses a JSONL segment into its message records, skipping undecodable lines."""
+    records = []
+    for line in data.decode('utf-8').splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            logger.error("Skipping undecodable chat history line.")
+    return records
+
+def _next_sequence(segments: list) -> int:
+    return max((last_seq for _, last_seq, _ in segments), default=-1) + 1
+
+def _small_segments(segments: list) -> list:
+    """Returns the segments from the first one holding fewer than `COMPACTED_SEGMENT_MESSAGES` messages onwards."""
+    for position, (first_seq, last_seq, _) in enumerate(segments):
+        if last_seq - first_seq + 1 < COMPACTED_SEGMENT_MESSAGES:
+            return segments[position:]
+    return []
+
+class SupabaseChatHistoryStore(ChatHistoryStore):
+    """
+    Chat history stored in a Supabase storage bucket as append-only JSONL segments.
+
+    Each conversation is a folder holding `meta.json` and segments named after the
+    sequence numbers they cover, so an append uploads only the new messages and
+    never rewrites existing objects. Before writing a segment, an append claims its
+    first sequence number with a marker under `claims/`, so concurrent appends at the
+    same position conflict even when they carry different numbers of messages; the
+    claim is removed once the segment is written. Conversations stored in the legacy
+    single-file format (`chat-history/<id>.json`) are read as is and migrated on
+    their next append.
+    The Supabase client is created with the store, not at import time.
+
+    The conversation index is a Postgres table of the same project, upserted after
+    every append and read with keyset pagination. It must be created once::
+
+        create table conversation_index (
+            conversation_id text primary key,
+            created_at text not null,
+            preview text not null default '',
+            message_count integer not null default 0
+        );
+        create index conversation_index_by_created_at on conversation_index (created_at desc, conversation_id desc);
+
+    Conversations stored before the index existed are added by `rebuild_index`, or
+    on their next append.
+
+    Args:
+        url (str): Supabase project URL.
+        key (str): Supabase API key.
+        bucket (str): Storage bucket name.
+        compact_segments (int): Number of segments after which a conversation is compacted.
+        index_table (str): Name of the conversation index table.
     """
-    return json.dumps(data, indent=4)
+
+    def __init__(self, url: str = SUPABASE_URL, key: str = SUPABASE_KEY, bucket: str = SUPABASE_BUCKET,
+                 compact_segments: int = CHAT_HISTORY_COMPACT_SEGMENTS, index_table: str = CHAT_HISTORY_INDEX_TABLE):
+        from supabase import create_client, StorageException
+        self.storage_error = StorageException
+        self.client = create_client(url, key)
+        self.bucket = bucket
+        self.compact_segments = compact_segments
+        self.index_table = index_table
+
+    def _bucket(self):
+        return self.client.storage.from_(self.bucket)
+
+    def _list_folder(self, folder: str) -> list:
+        """Lists a folder page by page, sorted by name."""
+        items, offset = [], 0
+        while True:
+            page = self._bucket().list(
+                folder, {"limit": LIST_PAGE_SIZE, "offset": offset, "sortBy": {"column": "name", "order": "asc"}}
+            ) or []
+            items.extend(page)
+            if len(page) < LIST_PAGE_SIZE:
+                return items
+            offset += LIST_PAGE_SIZE
+
+    def _list_segments(self, conversation_id: str) -> list:
+        """
+        Lists the segments of a conversation, ordered by first sequence number.
+
+        Returns:
+            list: Tuples of (first_seq, last_seq, path).
+        """
+        folder = _get_conversation_folder(conversation_id)
+        segments = []
+        for item in self._list_folder(folder):
+            name = item.get('name', '')
+            if not name.endswith(SEGMENT_SUFFIX):
+                continue
+            try:
+                first_seq, last_seq = (int(part) for part in name[:-len(SEGMENT_SUFFIX)].split('-'))
+            except ValueError:
+                continue
+            segments.append((first_seq, last_seq, f"{folder}/{name}"))
+        segments.sort()
+        return segments
+
+    def _upload(self, path: str, content: str, content_type: str, upsert: bool):
+        self._bucket().upload(
+            path, content.encode('utf-8'),
+            file_options={"content-type": content_type, "upsert": "true" if upsert else "false"}
+        )
+
+    def _is_stale_claim(self, conversation_id: str, first_seq: int) -> bool:
+        """Tells whether the claim on `first_seq` is old and no segment holds that message."""
+        try:
+            claimed_at = datetime.fromisoformat(self._bucket().download(_get_claim_path(conversation_id, first_seq)).decode('utf-8').strip())
+        except (self.storage_error, ValueError):
+            return False
+        if (datetime.now() - claimed_at).total_seconds() < APPEND_CLAIM_TIMEOUT_SECONDS:
+            return False
+        # Compaction may have merged the claimed segment into one starting earlier
+        return all(not first <= first_seq <= last for first, last, _ in self._list_segments(conversation_id))
+
+    def _claim(self, conversation_id: str, first_seq: int):
+        """
+        Claims the segment starting at `first_seq` before it is written.
+
+        The claim is uploaded with upsert off, so exactly one writer gets each first
+        sequence number, whatever the number of messages it appends. A claim older
+        than `APPEND_CLAIM_TIMEOUT_SECONDS` without a segment is replaced, so a writer
+        that crashed between claiming and writing does not block the conversation.
+
+        Raises:
+            StorageException: If another writer holds the claim.
+        """
+        path = _get_claim_path(conversation_id, first_seq)
+        try:
+            self._upload(path, datetime.now().isoformat(), "text/plain", upsert=False)
+            return
+        except self.storage_error:
+            if not self._is_stale_claim(conversation_id, first_seq):
+                raise
+        logger.warning(f"Replacing the stale claim on message {first_seq} of conversation {conversation_id}.")
+        self._bucket().remove([path])
+        self._upload(path, datetime.now().isoformat(), "text/plain", upsert=False)
+
+    def _write_segment(self, conversation_id: str, first_seq: int, messages: list):
+        now = datetime.now().isoformat()
+        lines = [_dump_json(message_record(first_seq + offset, message, now)) for offset, message in enumerate(messages)]
+        # Conflicts are detected on the first sequence number alone: a writer appending a different
+        # number of messages at the same position would otherwise get a distinct segment name
+        self._claim(conversation_id, first_seq)
+        try:
+            # Claims are released once their segment exists, so a writer that listed the segments
+            # before another one stored these messages must find them here
+            if any(first <= first_seq <= last for first, last, _ in self._list_segments(conversation_id)):
+                raise self.storage_error(f"Message {first_seq} of conversation {conversation_id} is already stored.")
+            self._upload(_get_segment_path(conversation_id, first_seq, first_seq + len(messages) - 1), "\n".join(lines) + "\n", "application/x-ndjson", upsert=False)
+        finally:
+            self._release_claims(conversation_id, [first_seq])
+
+    def _release_claims(self, conversation_id: str, seqs: list):
+        """Removes claims; a failure is logged, as a leftover claim only costs storage."""
+        try:
+            self._bucket().remove([_get_claim_path(conversation_id, seq) for seq in seqs])
+        except Exception as e:
+            logger.error(f"Failed to release chat history claims of conversation {conversation_id}: {e}")
+
+    def _prune_claims(self, conversation_id: str, last_seq: int):
+        """Removes claims left behind on messages up to `last_seq`, which are all stored."""
+        seqs = []
+        for item in self._list_folder(f"{_get_conversation_folder(conversation_id)}/{CLAIMS_FOLDER}"):
+            name = item.get('name', '')
+            if name.endswith(CLAIM_SUFFIX) and name[:-len(CLAIM_SUFFIX)].isdigit() and int(name[:-len(CLAIM_SUFFIX)]) <= last_seq:
+                seqs.append(int(name[:-len(CLAIM_SUFFIX)]))
+        if seqs:
+            self._release_claims(conversation_id, seqs)
+
+    def _write_meta(self, conversation_id: str, created_at: str = None) -> dict:
+        metadata = conversation_metadata(conversation_id, created_at)
+        self._upload(f"{_get_conversation_folder(conversation_id)}/{META_FILE}", _dump_json(metadata), "application/json", upsert=True)
+        return metadata
+
+    def _read_meta(self, conversation_id: str) -> dict:
+        try:
+            return _load_json(self._bucket().download(f"{_get_conversation_folder(conversation_id)}/{META_FILE}"))
+        except self.storage_error:
+            return {}
+
+    def _read_legacy_file(self, conversation_id: str) -> Optional[dict]:
+        try:
+            return _load_json(self._bucket().download(_get_file_path(conversation_id)))
+        except self.storage_error:
+            return None
+
+    def _migrate_legacy_file(self, conversation_id: str) -> list:
+        """
+        Converts a conversation stored as a single JSON file into a first segment.
+
+        Returns:
+            list: Segments after the migration (empty if there was no legacy file).
+        """
+        legacy = self._read_legacy_file(conversation_id)
+        if legacy is None:
+            return []
+        messages = legacy.get('messages', [])
+        self._write_meta(conversation_id, legacy.get('metadata', {}).get('timestamp'))
+        if messages:
+            self._write_segment(conversation_id, 0, messages)
+        self._bucket().remove([_get_file_path(conversation_id)])
+        logger.info(f"Migrated legacy chat history file of conversation {conversation_id} to segments.")
+        return self._list_segments(conversation_id)
+
+    def _read_messages(self, segments: list) -> list:
+        """Downloads the given segments and returns their messages ordered by sequence number, without duplicates."""
+        messages = {}
+        for _, _, path in segments:
+            for record in _load_segment(self._bucket().download(path)):
+                messages[record['seq']] = record
+        return [messages[seq] for seq in sorted(messages)]
+
+    def compact(self, conversation_id: str) -> int:
+        """
+        Merges the small segments at the end of a conversation into segments of
+        `COMPACTED_SEGMENT_MESSAGES` messages.
+
+        Full segments are left alone, so compaction only reads the recent tail and a
+        range read downloads just the few segments covering the range. Merged segments
+        are written before the old ones are removed, so concurrent readers always see
+        every message (duplicates are resolved by sequence number).
+        """
+        segments = _small_segments(self._list_segments(conversation_id))
+        if len(segments) < 2:
+            return 0
+        messages = self._read_messages(segments)
+        written = set()
+        for start in range(0, len(messages), COMPACTED_SEGMENT_MESSAGES):
+            chunk = messages[start:start + COMPACTED_SEGMENT_MESSAGES]
+            path = _get_segment_path(conversation_id, chunk[0]['seq'], chunk[-1]['seq'])
+            self._upload(path, "\n".join(_dump_json(message) for message in chunk) + "\n", "application/x-ndjson", upsert=True)
+            written.add(path)
+        stale = [path for _, _, path in segments if path not in written]
+        if stale:
+            self._bucket().remove(stale)
+        self._prune_claims(conversation_id, messages[-1]['seq'])
+        logger.info(f"Compacted {len(segments)} chat history segments of conversation {conversation_id}.")
+        return len(segments)
+
+    def append(self, conversation_id: str, messages: list, start_seq: int = None) -> dict:
+        """
+        Appends messages to a conversation as a new JSONL segment.
+
+        Only the new messages are uploaded; existing segments are never rewritten, so an
+        append costs O(new messages). Once a conversation ends with `compact_segments`
+        small segments, they are compacted.
+        """
+        for attempt in range(1, APPEND_CONFLICT_RETRIES + 1):
+            segments = self._list_segments(conversation_id) or self._migrate_legacy_file(conversation_id)
+            next_seq = _next_sequence(segments)
+            first_seq = next_seq if start_seq is None else start_seq
+            if first_seq > next_seq:
+                raise ValueError(f"start_seq {first_seq} leaves a gap; the conversation has {next_seq} messages.")
+
+            pending = messages[next_seq - first_seq:]
+            if not pending:
+                return {"appended": 0, "next_seq": next_seq}
+
+            try:
+                metadata = self._write_meta(conversation_id) if next_seq == 0 else None
+                self._write_segment(conversation_id, next_seq, pending)
+                break
+            except self.storage_error as e:
+                # Most likely a concurrent append took the same sequence numbers; re-read and retry
+                if attempt == APPEND_CONFLICT_RETRIES:
+                    raise
+                logger.warning(f"Append to conversation {conversation_id} conflicted ({e}). Retrying.")
+
+        logger.info(f"Appended {len(pending)} message(s) to conversation {conversation_id}.")
+        self._update_index(conversation_id, next_seq + len(pending), metadata, pending)
+        if len(_small_segments(segments)) + 1 >= self.compact_segments:
+            try:
+                self.compact(conversation_id)
+            except Exception as e:
+                logger.error(f"Failed to compact chat history of conversation {conversation_id}: {e}")
+        return {"appended": len(pending), "next_seq": next_seq + len(pending)}
+
+    def _index(self):
+        return self.client.table(self.index_table)
+
+    def _index_entry(self, conversation_id: str) -> Optional[dict]:
+        """Builds the index entry of a stored conversation from its messages and metadata."""
+        data = self.retrieve(conversation_id)
+        if data is None:
+            return None
+        return {
+            "conversation_id": conversation_id,
+            "created_at": data.get("metadata", {}).get("timestamp") or "",
+            "preview": conversation_preview(data.get("messages", [])),
+            "message_count": len(data.get("messages", []))
+        }
+
+    def _update_index(self, conversation_id: str, message_count: int, metadata: Optional[dict], pending: list):
+        """
+        Records an append in the conversation index. A failure is logged and does not fail
+        the append; the entry is repaired on the next append or by `rebuild_index`.
+        """
+        try:
+            if metadata is not None:
+                entry = {
+                    "conversation_id": conversation_id,
+                    "created_at": metadata["timestamp"],
+                    "preview": conversation_preview(pending),
+                    "message_count": message_count
+                }
+                self._index().upsert(entry, ignore_duplicates=True).execute()
+                return
+            # Concurrent appends may finish out of order; the count only ever grows
+            response = self._index().update({"message_count": message_count}).eq("conversation_id", conversation_id).lt("message_count", message_count).execute()
+            if response.data or self._index().select("conversation_id").eq("conversation_id", conversation_id).execute().data:
+                return
+            # Not indexed yet: stored before the index existed, or an earlier index update failed
+            entry = self._index_entry(conversation_id)
+            if entry is not None:
+                self._index().upsert(entry).execute()
+        except Exception as e:
+            logger.error(f"Failed to update the conversation index for {conversation_id}: {e}")
+
+    def rebuild_index(self) -> int:
+        """
+        Adds every stored conversation to the conversation index.
+
+        Returns:
+            int: Number of conversations indexed.
+        """
+        indexed = 0
+        for conversation_id in self.list_conversations():
+            entry = self._index_entry(conversation_id)
+            if entry is not None:
+                self._index().upsert(entry).execute()
+                indexed += 1
+        logger.info(f"Rebuilt the conversation index: {indexed} conversation(s).")
+        return indexed
+
+    def list_conversation_index(self, limit: int, cursor: Optional[str] = None) -> dict:
+        query = self._index().select("conversation_id,created_at,preview,message_count")
+        if cursor is not None:
+            created_at, conversation_id = decode_cursor(cursor)
+            query = query.or_(
+                f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",conversation_id.lt."{conversation_id}")'
+            )
+        response = query.order("created_at", desc=True).order("conversation_id", desc=True).limit(limit + 1).execute()
+        return index_page(response.data or [], limit)
+
+    def _retrieve_legacy(self, conversation_id: str, after_seq: Optional[int], last: Optional[int]) -> Optional[dict]:
+        legacy = self._read_legacy_file(conversation_id)
+        if not legacy:
+            return None
+        messages = [{**message, "seq": seq} for seq, message in enumerate(legacy.get('messages', []))]
+        return {
+            "conversation_id": conversation_id,
+            "messages": select_range(messages, after_seq, last),
+            "metadata": legacy.get('metadata', {}),
+            "message_count": len(messages)
+        }
+
+    def retrieve(self, conversation_id: str, after_seq: Optional[int] = None, last: Optional[int] = None) -> Optional[dict]:
+        segments = self._list_segments(conversation_id)
+        if not segments:
+            # Conversations written before the append-only format are single JSON files
+            return self._retrieve_legacy(conversation_id, after_seq, last)
+        message_count = _next_sequence(segments)
+        first_seq = after_seq + 1 if after_seq is not None else 0
+        if last is not None:
+            first_seq = max(first_seq, message_count - max(last, 0))
+        # Segment names carry their sequence numbers, so only the segments covering the range are downloaded
+        covering = [segment for segment in segments if segment[1] >= first_seq]
+        messages = [message for message in self._read_messages(covering) if message['seq'] >= first_seq]
+        return {
+            "conversation_id": conversation_id,
+            "messages": select_range(messages, after_seq, last),
+            "metadata": self._read_meta(conversation_id),
+            "message_count": message_count
+        }
+
+    def count_messages(self, conversation_id: str) -> Optional[int]:
+        segments = self._list_segments(conversation_id)
+        if segments:
+            return _next_sequence(segments)
+        legacy = self._read_legacy_file(conversation_id)
+        return len(legacy.get('messages', [])) if legacy else None
+
+    def list_conversations(self) -> List[str]:
+        conversation_ids = set()
+        for item in self._list_folder(BUCKET_FOLDER):
+            name = item.get('name', '')
+            if item.get('id') is None:
+                conversation_ids.add(name)
+            elif name.endswith('.json'):
+                conversation_ids.add(name[:-len('.json')])
+        return sorted(conversation_ids)
+
+def create_chat_history_store(backend: str = CHAT_HISTORY_STORE) -> ChatHistoryStore:
+    """
+    Creates the chat history store selected by the `CHAT_HISTORY_STORE` setting.
+
+    Args:
+        backend (str): "supabase" for the Supabase storage bucket, "sqlite" for the local
+                       SQLite database at `CHAT_HISTORY_SQLITE_PATH`, or "memory" for a
+                       non-persistent SQLite database (dev/test mode, no network).
+
+    Returns:
+        ChatHistoryStore: The store. All backends expose the same `append/retrieve/list_conversations` calls.
+    """
+    if backend == "sqlite":
+        logger.info(f"Using the local chat history database at '{CHAT_HISTORY_SQLITE_PATH}'.")
+        return SQLiteChatHistoryStore(CHAT_HISTORY_SQLITE_PATH)
+    if backend == "memory":
+        logger.info("Using the in-memory chat history store.")
+        return SQLiteChatHistoryStore()
+    return SupabaseChatHistoryStore()
+
+store = None
+_store_lock = threading.Lock()
+
+def get_chat_history_store() -> ChatHistoryStore:
+    """Returns the chat history store, creating it on first use."""
+    global store
+    if store is None:
+        with _store_lock:
+            if store is None:
+                store = create_chat_history_store()
+    return store
+
+def compact_chat_history(conversation_id: str) -> dict:
+    """
+    Merges the stored pieces of a conversation (the segments, with Supabase) into one.
+
+    Args:
+        conversation_id (str): Unique identifier for the conversation.
+
+    Returns:
+        dict: Operation success status and the number of segments merged.
+    """
+    try:
+        return {"success": True, "merged": get_chat_history_store().compact(conversation_id)}
+    except Exception as e:
+        logger.error(f"Failed to compact chat history of conversation {conversation_id}: {e}")
+        return {"success": False, "error": "Failed to compact chat history."}
+
+def append_chat_messages(conversation_id: str, new_messages: list, start_seq: int = None) -> dict:
+    """
+    Appends messages to a conversation.
+
+    Only the new messages are written, so an append costs O(new messages). With
+    `start_seq` (the sequence number of the first message in `new_messages`), the
+    append is idempotent: messages that are already stored are skipped, so a retried
+    request does not create duplicates. Without it, the messages are appended after
+    the last stored one.
+
+    Args:
+        conversation_id (str): Unique identifier for the conversation.
+        new_messages (list): Chat messages (`role`, `content`) to append.
+        start_seq (int, optional): Sequence number of the first message.
+
+    Returns:
+        dict: Operation success status, number of messages appended and the next sequence number.
+
+    Raises:
+        ValueError: If `start_seq` is beyond the end of the stored conversation.
+    """
+    try:
+        return {"success": True, **get_chat_history_store().append(conversation_id, new_messages, start_seq)}
+    except ValueError:
+        raise
+    except Exception as e:
+        logger.error(f"Chat history storage error while appending to conversation {conversation_id}: {e}")
+        return {"success": False, "error": "Failed to store chat history. Storage error occurred."}
 
 def store_chat_history(conversation_id: str, new_messages: list) -> dict:
     """
-    Stores or updates chat history in Supabase storage. If the file exists,
-    appends new messages; otherwise, creates a new file.
+    Stores the chat history of a conversation, given as the full list of its messages.
+
+    Messages that are already stored are skipped and only the new tail is appended,
+    so posting the whole history after every turn no longer duplicates it.
 
     Args:
         conversation_id (str): Unique identifier for the conversation.
@@ -77,107 +591,104 @@ def store_chat_history(conversation_id: str, new_messages: list) -> dict:
     Returns:
         dict: Operation success status and related message.
     """
-    try:
-        file_path = _get_file_path(conversation_id)
-        metadata = {
-            "timestamp": datetime.now().isoformat(),
-            "language": "en",
-            "model": LLM_MODEL_NAME
-        }
+    response = append_chat_messages(conversation_id, new_messages, start_seq=0)
+    if response['success']:
+        return {"success": True, "message": "Chat history stored successfully."}
+    return response
 
-        # Load Existing Data
-        try:
-            existing_data = supabase.storage.from_(SUPABASE_BUCKET).download(file_path)
-            chat_data = _load_json(existing_data)
-            if 'messages' not in chat_data:
-                chat_data['messages'] = []
-            chat_data['messages'].extend(new_messages)
-            logger.info(f"Messages appended to existing file for conversation ID: {conversation_id}")
-        except StorageException as e:
-            logger.warning(f"No existing file found. Creating new one for ID: {conversation_id}")
-            chat_data = {
-                "conversation_id": conversation_id,
-                "messages": new_messages,
-                "metadata": metadata
-            }
-
-        updated_json_data = _dump_json(chat_data)
-        supabase.storage.from_(SUPABASE_BUCKET).upload(
-            file_path, updated_json_data.encode('utf-8'),
-            file_options={"content-type": "application/json", "upsert": "true"}
-        )
+def retrieve_chat_history(conversation_id: str, after_seq: int = None, last: int = None) -> dict:
+    """
+    Retrieves the chat history of a conversation from the configured store.
 
-        return {"success": True, "message": "Chat history stored successfully."}
+    Args:
+        conversation_id (str): Unique identifier for the conversation.
+        after_seq (int, optional): Return only messages with a greater sequence number.
+        last (int, optional): Return only the last `last` of the selected messages.
 
-    except StorageException as e:
-        logger.error(f"Supabase Storage error: {e}")
-        return {"success": False, "error": "Failed to store chat history. Storage error occurred."}
+    Returns:
+        dict: Retrieved chat data (with the total `message_count`) or error message on failure.
+    """
+    try:
+        data = get_chat_history_store().retrieve(conversation_id, after_seq, last)
+        if data is None:
+            logger.warning(f"No chat history found for ID: {conversation_id}")
+            return {"success": False, "message": "No chat history found."}
+        return {"success": True, "data": data}
     except Exception as e:
-        logger.error(f"Unexpected error while storing chat history: {e}")
-        return {"success": False, "error": "Unexpected error occurred while storing chat history."}
+        logger.error(f"Chat history storage error while retrieving ID {conversation_id}: {e}")
+        return {"success": False, "error": "Failed to retrieve chat history. Storage error occurred."}
 
-def retrieve_chat_history(conversation_id: str) -> dict:
+def count_chat_messages(conversation_id: str) -> dict:
     """
-    Retrieves chat history from Supabase storage based on the given conversation ID.
+    Returns the number of stored messages of a conversation without reading them.
 
     Args:
         conversation_id (str): Unique identifier for the conversation.
 
     Returns:
-        dict: Retrieved chat data or error message on failure.
+        dict: Operation success status and `message_count` (`None` if the conversation does not exist).
     """
     try:
-        file_path = _get_file_path(conversation_id)
-        existing_data = supabase.storage.from_(SUPABASE_BUCKET).download(file_path)
+        return {"success": True, "message_count": get_chat_history_store().count_messages(conversation_id)}
+    except Exception as e:
+        logger.error(f"Chat history storage error while counting messages of ID {conversation_id}: {e}")
+        return {"success": False, "error": "Failed to count chat messages. Storage error occurred."}
 
-        if not existing_data:
-            logger.warning(f"No chat history found for ID: {conversation_id}")
-            return {"success": False, "message": "No chat history found."}
+def list_conversation_index(limit: int = 20, cursor: str = None) -> dict:
+    """
+    Returns one page of the conversation index, newest conversation first.
 
-        return {"success": True, "data": _load_json(existing_data)}
+    Each entry holds the conversation ID, creation time, a preview of the first
+    message and the message count, so listing conversations reads no messages.
 
-    except StorageException as e:
-        logger.error(f"Supabase Storage error while retrieving chat history: {e}")
-        return {"success": False, "error": "Failed to retrieve chat history. Storage error occurred."}
+    Args:
+        limit (int): Maximum number of conversations in the page.
+        cursor (str, optional): `next_cursor` of the previous page.
+
+    Returns:
+        dict: Operation success status, `conversations` and `next_cursor` (`None` on the last page).
+
+    Raises:
+        ValueError: If `cursor` is malformed.
+    """
+    try:
+        return {"success": True, **get_chat_history_store().list_conversation_index(limit, cursor)}
+    except ValueError:
+        raise
     except Exception as e:
-        logger.error(f"Unexpected error retrieving chat history for ID {conversation_id}: {e}")
-        return {"success": False, "error": "Unexpected error occurred while retrieving chat history."}
-    
+        logger.error(f"Chat history storage error while listing conversations: {e}")
+        return {"success": False, "error": "Failed to list conversations. Storage error occurred."}
+
 def get_bucket_items():
     """
-    Retrieves item names from a specified Supabase storage bucket and returns them as a list, 
-    excluding the '.json' extension and omitting the last item in the response.
+    Retrieves the IDs of all stored conversations and returns them as a list.
 
-    This function uses the globally defined `SUPABASE_BUCKET` and `BUCKET_FOLDER` variables 
-    to identify the bucket and folder path.
+    Lists every conversation; use `list_conversation_index` to page through them.
 
     Returns:
-        list: A list of item names with '.json' removed, excluding the last item in the bucket.
+        list: A list of conversation IDs.
 
     Logs:
-        - An error if there are no items found in the bucket.
+        - An error if there are no stored conversations.
         - An error if an exception occurs during the fetching process.
 
     Example:
-        Suppose the bucket contains:
-        - "2025-03-18.json"
-        - "2025-03-19.json"
-        - "2025-03-20.json"
+        Suppose the store contains:
+        - "2025-03-18"
+        - "2025-03-19"
+        - "2025-03-20"
 
         The function will return:
-        ['2025-03-18', '2025-03-19']
+        ['2025-03-18', '2025-03-19', '2025-03-20']
 
     Raises:
         Exception: Logs an error if fetching bucket items fails.
     """
     try:
-        response = supabase.storage.from_(SUPABASE_BUCKET).list(BUCKET_FOLDER)
-        conversation_ids = []
-        if response:
-            for item in response[:-1]:
-                conversation_ids.append(item['name'].replace('.json', ''))
+        conversation_ids = get_chat_history_store().list_conversations()
+        if conversation_ids:
             return conversation_ids
         else:
             logger.error("No items found in the bucket.")
     except Exception as e:
-        logger.error(f"Error fetching bucket items: {e}")
\ No newline at end of file
+        logger.error(f"Error fetching bucket items: {e}")
@@ -0,0 +1,96 @@
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, Optional
+from dotenv import load_dotenv
+from backend.utils import logger
+
+logger = logger.get_logger()
+
+load_dotenv()
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME")
+# Hugging Face tokenizers of the model families served by Groq, matched on the model name prefix
+MODEL_TOKENIZERS = {
+    "llama-3": "NousResearch/Meta-Llama-3-8B-Instruct",
+    "llama3": "NousResearch/Meta-Llama-3-8B-Instruct",
+    "llama2": "hf-internal-testing/llama-tokenizer",
+    "mixtral": "mistralai/Mixtral-8x7B-Instruct-v0.1",
+}
+TOKEN_COUNT_CACHE_SIZE = int(os.getenv("TOKEN_COUNT_CACHE_SIZE", 65536))
+# Tokens added by the chat template around every message (role header and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+# Characters per token assumed when no tokenizer can be loaded
+FALLBACK_CHARS_PER_TOKEN = 4
+
+_tokenizer = None
+_tokenizer_failed = False
+_tokenizer_lock = threading.Lock()
+
+def tokenizer_name_for(model_name: Optional[str]) -> Optional[str]:
+    """Returns the tokenizer matching an LLM model name, or `None` for an unknown model."""
+    model_name = (model_name or "").lower()
+    for prefix, tokenizer_name in MODEL_TOKENIZERS.items():
+        if model_name.startswith(prefix):
+            return tokenizer_name
+    return None
+
+# An explicit setting wins; otherwise the tokenizer follows the configured LLM
+LLM_TOKENIZER_NAME = os.getenv("LLM_TOKENIZER_NAME") or tokenizer_name_for(LLM_MODEL_NAME)
+
+def get_tokenizer():
+    """
+    Returns the Hugging Face tokenizer used to count prompt tokens, loading it on first use.
+
+    Returns `None` if no tokenizer is known for `LLM_MODEL_NAME` and `LLM_TOKENIZER_NAME`
+    is not set, or if the tokenizer cannot be loaded (e.g. no network access and no
+    local copy); token counts then fall back to a character-based estimate.
+    """
+    global _tokenizer, _tokenizer_failed
+    if _tokenizer is None and not _tokenizer_failed:
+        with _tokenizer_lock:
+            if _tokenizer is None and not _tokenizer_failed:
+                if not LLM_TOKENIZER_NAME:
+                    logger.warning(f"No tokenizer known for model '{LLM_MODEL_NAME}'; set LLM_TOKENIZER_NAME. Estimating token counts from length.")
+                    _tokenizer_failed = True
+                    return None
+                try:
+                    from transformers import AutoTokenizer
+                    logger.info(f"Loading tokenizer '{LLM_TOKENIZER_NAME}'...")
+                    _tokenizer = AutoTokenizer.from_pretrained(LLM_TOKENIZER_NAME)
+                except Exception as e:
+                    logger.warning(f"Could not load tokenizer '{LLM_TOKENIZER_NAME}': {e}. Estimating token counts from length.")
+                    _tokenizer_failed = True
+    return _tokenizer
+
+def load_tokenizer() -> str:
+    """Resolves the token counter ahead of the first request and returns its name."""
+    return LLM_TOKENIZER_NAME if get_tokenizer() is not None else "length estimate"
+
+def is_tokenizer_resolved() -> bool:
+    """True once the tokenizer is loaded or known to be unavailable."""
+    return _tokenizer is not None or _tokenizer_failed
+
+@lru_cache(maxsize=TOKEN_COUNT_CACHE_SIZE)
+def count_tokens(text: str) -> int:
+    """
+    Returns the number of tokens in `text`.
+
+    Counts are memoized per text, so a message is tokenized once no matter how many
+    later prompts include it.
+
+    Args:
+        text (str): Text to measure.
+
+    Returns:
+        int: Token count.
+    """
+    if not text:
+        return 0
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return -(-len(text) // FALLBACK_CHARS_PER_TOKEN)
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+def count_message_tokens(message: Dict[str, str]) -> int:
+    """Returns the tokens a chat message occupies in the prompt, including template overhead."""
+    return count_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
@@ -0,0 +1,41 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+class VectorIndex(ABC):
+    """
+    Interface shared by the vector index backends.
+
+    The methods mirror the subset of `pinecone.Index` used by `pinecone_service`,
+    so a hosted Pinecone index and the local backends are interchangeable.
+    Query responses are dictionaries of the form::
+
+        {"matches": [{"id": str, "score": float, "metadata": dict}], "namespace": str}
+
+    Vectors passed to `upsert` may be `(id, values)` / `(id, values, metadata)` tuples
+    or `{"id", "values", "metadata"}` dictionaries, as accepted by Pinecone.
+    """
+
+    @abstractmethod
+    def upsert(self, vectors: List, namespace: str = "") -> dict:
+        """Inserts or replaces vectors by ID."""
+
+    @abstractmethod
+    def query(self, vector: List[float], top_k: int = 10, namespace: str = "", include_metadata: bool = False, **kwargs) -> dict:
+        """Returns the `top_k` vectors most similar to `vector` by cosine similarity."""
+
+    @abstractmethod
+    def delete(self, ids: Optional[List[str]] = None, namespace: str = "", delete_all: bool = False) -> dict:
+        """Deletes vectors by ID, or every vector of the namespace when `delete_all` is set."""
+
+    @abstractmethod
+    def describe_index_stats(self) -> dict:
+        """Returns per-namespace and total vector counts."""
+
+def as_record(vector) -> tuple:
+    """
+    Normalizes a vector in any Pinecone upsert format to an `(id, values, metadata)` tuple.
+    """
+    if isinstance(vector, dict):
+        return vector["id"], vector["values"], vector.get("metadata", {})
+    vector_id, values, *rest = vector
+    return vector_id, values, rest[0] if rest else {}
@@ -0,0 +1,154 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+import streamlit as st
+from dotenv import load_dotenv
+from frontend.utils import logger
+
+load_dotenv()
+logger = logger.get_logger()
+
+API_URL = os.getenv("API_URL", "http://localhost:8000").rstrip("/")
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", 5))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", 30))
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", 3))
+API_RETRY_BACKOFF = float(os.getenv("API_RETRY_BACKOFF", 0.5))
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", 20))
+# Responses worth retrying: the backend is restarting, overloaded or behind a failing proxy
+RETRY_STATUS_CODES = {502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+# Latency samples kept per endpoint for the percentiles
+LATENCY_SAMPLES = 1000
+
+class LatencyMetrics:
+    """
+    Request counts, errors and latency percentiles per endpoint.
+
+    Latency is measured until the response headers arrive, so a streamed reply
+    reports its time to first byte.
+    """
+
+    def __init__(self, samples: int = LATENCY_SAMPLES):
+        self.samples = samples
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, elapsed_ms: float, error: bool = False):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = {"count": 0, "errors": 0, "retries": 0, "latencies": deque(maxlen=self.samples)}
+            stats["count"] += 1
+            stats["errors"] += int(error)
+            stats["latencies"].append(elapsed_ms)
+
+    def record_retry(self, endpoint: str):
+        with self._lock:
+            if endpoint in self._endpoints:
+                self._endpoints[endpoint]["retries"] += 1
+
+    def summary(self) -> list:
+        """Returns one row per endpoint: request, error and retry counts, and p50/p95/max latency in ms."""
+        rows = []
+        with self._lock:
+            for endpoint, stats in sorted(self._endpoints.items()):
+                latencies = sorted(stats["latencies"])
+                rows.append({
+                    "endpoint": endpoint,
+                    "requests": stats["count"],
+                    "errors": stats["errors"],
+                    "retries": stats["retries"],
+                    "p50_ms": round(latencies[len(latencies) // 2], 1) if latencies else None,
+                    "p95_ms": round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], 1) if latencies else None,
+                    "max_ms": round(latencies[-1], 1) if latencies else None,
+                })
+        return rows
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """
+    Returns the process-wide HTTP session to the backend.
+
+    Cached with `st.cache_resource`, so every rerun and every user session of the
+    Streamlit server shares one keep-alive connection pool instead of opening a new
+    TCP connection per request.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=API_POOL_SIZE, pool_maxsize=API_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    logger.info(f"Created pooled HTTP session for {API_URL}.")
+    return session
+
+@st.cache_resource
+def get_metrics() -> LatencyMetrics:
+    """Returns the process-wide request latency metrics."""
+    return LatencyMetrics()
+
+def _backoff(attempt: int) -> float:
+    # Full jitter: retries of many clients do not hit a recovering backend at the same moment
+    return random.uniform(0, API_RETRY_BACKOFF * (2 ** attempt))
+
+def request(method: str, path: str, retries: int = None, timeout=None, **kwargs) -> requests.Response:
+    """
+    Sends a request to the backend over the pooled session.
+
+    Connection errors, timeouts and 502/503/504 responses are retried with exponential
+    backoff and full jitter. Only idempotent methods are retried by default; pass
+    `retries` for a POST that is safe to repeat.
+
+    Args:
+        method (str): HTTP method.
+        path (str): Path relative to `API_URL`, e.g. "/chat-history/retrieve".
+        retries (int, optional): Retries after the first attempt.
+        timeout (float or tuple, optional): Read timeout, or (connect, read) timeouts.
+        **kwargs: Passed to `requests.Session.request` (`json`, `params`, `headers`, `stream`, ...).
+
+    Returns:
+        requests.Response: The last response; the caller checks its status.
+
+    Raises:
+        requests.exceptions.RequestException: If the last attempt failed without a response.
+    """
+    method = method.upper()
+    if retries is None:
+        retries = API_MAX_RETRIES if method in IDEMPOTENT_METHODS else 0
+    if timeout is None:
+        timeout = (API_CONNECT_TIMEOUT, API_READ_TIMEOUT)
+    elif not isinstance(timeout, tuple):
+        timeout = (API_CONNECT_TIMEOUT, timeout)
+    endpoint = f"{method} {path}"
+    session, metrics = get_session(), get_metrics()
+
+    for attempt in range(retries + 1):
+        start = time.perf_counter()
+        try:
+            response = session.request(method, f"{API_URL}{path}", timeout=timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            metrics.record(endpoint, (time.perf_counter() - start) * 1000, error=True)
+            if attempt == retries:
+                raise
+            logger.warning(f"{endpoint} failed ({e}). Retrying ({attempt + 1}/{retries}).")
+        else:
+            failed = response.status_code in RETRY_STATUS_CODES
+            metrics.record(endpoint, (time.perf_counter() - start) * 1000, error=failed or response.status_code >= 500)
+            if not failed or attempt == retries:
+                return response
+            logger.warning(f"{endpoint} returned {response.status_code}. Retrying ({attempt + 1}/{retries}).")
+            response.close()
+        metrics.record_retry(endpoint)
+        time.sleep(_backoff(attempt))
+
+def get(path: str, **kwargs) -> requests.Response:
+    return request("GET", path, **kwargs)
+
+def post(path: str, **kwargs) -> requests.Response:
+    return request("POST", path, **kwargs)
+
+def latency_summary() -> list:
+    """Returns the request latency metrics of this Streamlit process, one row per endpoint."""
+    return get_metrics().summary()
@@ -1,8 +1,8 @@
-import os
 import base64
 import requests
 from dotenv import load_dotenv
 from frontend.utils import logger
+from frontend.app import api_client
 import json
 import time
 import streamlit as st
@@ -16,8 +16,6 @@ PAGE_ICON = "src/frontend/images/page_icon.jpg"
 GITHUB_LINK = "https://github.com/Vela-Test1993/yuvabe-care-companion-ai"
 ABOUT_US = "An AI-powered assistant for personalized healthcare guidance."
 
-API_URL = os.getenv("API_URL", "http://localhost:8000")
-
 def config_homepage(page_title=PAGE_TITLE):
     """
     Configures the Streamlit homepage with essential settings.
@@ -106,6 +104,10 @@ def typewriter_effect(text, speed=0.03, gradient=False):
     placeholder = st.empty()
     displayed_text = ""
 
+    if speed <= 0 and not gradient:
+        placeholder.markdown(text)
+        return
+
     for char in text:
         displayed_text += char
         
@@ -127,6 +129,29 @@ def typewriter_effect(text, speed=0.03, gradient=False):
         
         time.sleep(speed)
 
+def stream_markdown(chunks):
+    """
+    Renders text incrementally as its chunks arrive and returns the complete text.
+
+    Unlike `typewriter_effect`, nothing is delayed: each chunk is shown as soon as the
+    iterator produces it (e.g. tokens streamed by the chat API).
+
+    Args:
+        chunks (Iterable[str]): Pieces of the text, in order.
+
+    Returns:
+        str: The concatenated text.
+    """
+    placeholder = st.empty()
+    displayed_text = ""
+
+    for chunk in chunks:
+        displayed_text += chunk
+        placeholder.markdown(displayed_text + "▌")
+
+    placeholder.markdown(displayed_text)
+    return displayed_text
+
 def custom_navbar():
     """
     Renders a custom navigation bar with a modern design for the Streamlit application.
@@ -285,8 +310,8 @@ def set_bg_image(file_path, opacity=0.5):
 
 def get_api_response(endpoint:str, prompt: list):
     try:
-        logger.info(f"Sending user prompt to API endpoint: {API_URL}{endpoint}")
-        response = requests.post(f"{API_URL}{endpoint}", json={"prompt": prompt})
+        logger.info(f"Sending user prompt to API endpoint: {api_client.API_URL}{endpoint}")
+        response = api_client.post(endpoint, json={"prompt": prompt})
         if response.status_code == 200:
             return response.json()
         else:
@@ -303,8 +328,7 @@ def upsert_data_request(start, end):
     }
 
     try:
-        url = "http://localhost:8000/data/upsert_data"
-        response = requests.post(url, data=json.dumps(payload), headers=headers)
+        response = api_client.post("/data/upsert_data", data=json.dumps(payload), headers=headers)
         return response.json()
     except requests.exceptions.HTTPError as http_err:
         logger.info(f"HTTP error occurred: {http_err}")
@@ -318,7 +342,7 @@ def fetch_response(prompt, chat_history):
             "chat_history": chat_history,
             "latest_prompt": prompt
         }
-        response = requests.post(API_URL, json=payload, timeout=15)
+        response = api_client.post("", json=payload, timeout=15)
 
         if response.status_code == 200:
             return response.json().get("response", "Sorry, I couldn't generate a response.")
@@ -328,15 +352,6 @@ def fetch_response(prompt, chat_history):
     except requests.exceptions.RequestException as e:
         return f"Error: {str(e)}"
     
-def store_chat_history_in_db(conversation_id, messages):
-    try:
-        API_URL = f"http://localhost:8000/chat-history/store"
-        payload = {"conversation_id": conversation_id, 'messages': messages}
-        response = requests.post(API_URL, json=payload)
-        logger.info("Successfully added the chat in db")
-    except Exception as e:
-        logger.info(f"Failed to add the chat in db {e}")
-
 def display_message_box(role, content):
     """
     Displays a styled message box for user or assistant content.
@@ -364,67 +379,123 @@ def display_message_box(role, content):
                 </div>
             """, unsafe_allow_html=True)
 
-def get_chat_history_from_db(conversation_id: str, retries=3, delay=5):
-    API_URL = "http://127.0.0.1:8000/chat-history/retrieve"
-    for attempt in range(retries):
-        try:
-            response = requests.get(API_URL, params={"conversation_id": conversation_id}, timeout=30)
-            response.raise_for_status()
-            return response.json()
-        except ConnectionError:
-            logger.warning(f"Retrying... Attempt {attempt + 1}")
-            time.sleep(delay)
-    raise Exception("Failed to connect after multiple attempts")
+def get_chat_history_from_db(conversation_id: str, last=None, after_seq=None, retries=None):
+    """
+    Fetches the stored history of a conversation, or only a range of it.
 
-def display_chat_history(conversation_id):
+    The ETag of every response is kept in the session, and sent back as
+    `If-None-Match`, so an unchanged conversation is answered with 304 and
+    served from the session instead of being downloaded again.
+
+    Args:
+        conversation_id (str): Unique identifier for the conversation.
+        last (int, optional): Fetch only the last N messages.
+        after_seq (int, optional): Fetch only messages with a greater sequence number.
+        retries (int, optional): Retries on connection errors (default `API_MAX_RETRIES`, with jittered backoff).
+    """
+    params = {"conversation_id": conversation_id}
+    if last is not None:
+        params["last"] = last
+    if after_seq is not None:
+        params["after_seq"] = after_seq
+    cache = st.session_state.setdefault("chat_history_etags", {})
+    cache_key = (conversation_id, last, after_seq)
+    cached = cache.get(cache_key)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    response = api_client.get("/chat-history/retrieve", params=params, headers=headers, retries=retries)
+    if response.status_code == 304 and cached:
+        return cached[1]
+    response.raise_for_status()
+    chat_history = response.json()
+    if response.headers.get("ETag"):
+        cache[cache_key] = (response.headers["ETag"], chat_history)
+    return chat_history
+
+def _fetch_displayable_history(conversation_id, last=None):
+    with st.spinner("Fetching chat history..."):
+        chat_history = get_chat_history_from_db(conversation_id, last=last)
+    if not chat_history or "data" not in chat_history or not chat_history["data"].get("messages"):
+        st.error("No chat history found for this conversation.")
+        return None
+    return chat_history
+
+def display_chat_history(conversation_id, preview=None, last=None):
     """
     Displays the chat history for a given conversation ID in the Streamlit app.
 
     Args:
         conversation_id (str): Unique identifier for the conversation.
+        preview (str, optional): Start of the first message, as listed by the conversation index.
+            When given, the conversation is downloaded only once its sidebar button is clicked.
+        last (int, optional): Show only the last N messages; only those are downloaded.
     """
     try:
-        with st.spinner("Fetching chat history..."):
-            chat_history = get_chat_history_from_db(conversation_id)
-            
-            if not chat_history or "data" not in chat_history or not chat_history["data"].get("messages"):
-                st.error("No chat history found for this conversation.")
+        chat_history = None
+        if preview is None:
+            chat_history = _fetch_displayable_history(conversation_id)
+            if chat_history is None:
                 return
-            
-            first_message_content = chat_history["data"]["messages"][0].get('content', '').strip()
-            button_text = first_message_content[:20] if first_message_content else "No Content"
-
-            if st.sidebar.button(f"Show History for {button_text} : {conversation_id}", key=f"show_history_{conversation_id}"):
-                st.subheader(f"Chat History for Conversation ID: {conversation_id}")
-
-                for message in chat_history["data"]["messages"]:
-                    role = message.get('role', '').capitalize()
-                    content = message.get('content', '').strip()
-
-                    if role == 'User':
-                        st.markdown(f"**{role}:** {content}")
-                    elif role == 'Assistant':
-                        st.markdown(f"""
-                                    <div style="
-                                        background-color: #f0f2f6; 
-                                        padding: 15px; 
-                                        border-left: 5px solid #4CAF50; 
-                                        border-radius: 8px; 
-                                        margin-bottom: 10px;
-                                        box-shadow: 2px 2px 8px rgba(0, 0, 0, 0.1);">
-                                        <strong style="color: #333; font-size: 16px;">{role}:</strong>
-                                        <div style="margin-top: 5px; color: #555; font-size: 14px;">{content}</div>
-                                    </div>
-                                """, unsafe_allow_html=True)
+            preview = chat_history["data"]["messages"][0].get('content', '')
+
+        first_message_content = preview.strip()
+        button_text = first_message_content[:20] if first_message_content else "No Content"
+
+        if st.sidebar.button(f"Show History for {button_text} : {conversation_id}", key=f"show_history_{conversation_id}"):
+            if chat_history is None or last is not None:
+                chat_history = _fetch_displayable_history(conversation_id, last=last)
+                if chat_history is None:
+                    return
+            st.subheader(f"Chat History for Conversation ID: {conversation_id}")
+
+            for message in chat_history["data"]["messages"]:
+                role = message.get('role', '').capitalize()
+                content = message.get('content', '').strip()
+
+                if role == 'User':
+                    st.markdown(f"**{role}:** {content}")
+                elif role == 'Assistant':
+                    st.markdown(f"""
+                                <div style="
+                                    background-color: #f0f2f6; 
+                                    padding: 15px; 
+                                    border-left: 5px solid #4CAF50; 
+                                    border-radius: 8px; 
+                                    margin-bottom: 10px;
+                                    box-shadow: 2px 2px 8px rgba(0, 0, 0, 0.1);">
+                                    <strong style="color: #333; font-size: 16px;">{role}:</strong>
+                                    <div style="margin-top: 5px; color: #555; font-size: 14px;">{content}</div>
+                                </div>
+                            """, unsafe_allow_html=True)
 
     except Exception as e:
         logger.error(f"Error retrieving chat history for {conversation_id}: {e}")
         st.error("An unexpected error occurred while retrieving chat history.")
 
+def get_conversation_index(limit=20, cursor=None):
+    """
+    Fetches one page of the conversation index, newest conversation first.
+
+    Args:
+        limit (int): Maximum number of conversations.
+        cursor (str, optional): `next_cursor` of the previous page.
+
+    Returns:
+        Optional[dict]: `conversations` (ID, creation time, preview, message count) and `next_cursor`, or None on failure.
+    """
+    params = {"limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+    try:
+        response = api_client.get("/chat-history/conversations", params=params, timeout=10)
+        response.raise_for_status()
+        return response.json()
+    except Exception as e:
+        logger.error(f"Failed to get the conversation index {e}")
+        return None
+
 def get_bucket_items():
-    API_URL = "http://127.0.0.1:8000/chat-history/bucket-items"
     try:
-        response = requests.get(API_URL)
+        response = api_client.get("/chat-history/bucket-items")
         response.raise_for_status()
         return response.json()
     except Exception as e:
@@ -1,8 +1,8 @@
 import requests
-from frontend.app import common_functions
+from frontend.app import common_functions, api_client
 import streamlit as st
 
-API_BASE_URL = "http://localhost:8000/knowledge-base"
+API_BASE_PATH = "/knowledge-base"
 
 def upsert_data():
     """
@@ -43,7 +43,7 @@ def upsert_data():
             # API Call 
             with st.spinner("⏳ Processing your data..."):
                 try:
-                    response = requests.post(f"{API_BASE_URL}/upsert-data", json=payload)
+                    response = api_client.post(f"{API_BASE_PATH}/upsert-data", json=payload)
                     response_data = response.json()
 
                     if response.status_code == 200:
@@ -91,7 +91,7 @@ def delete_records():
             # ✅ API Call with Improved Error Handling
             with st.spinner("⏳ Deleting records..."):
                 try:
-                    response = requests.post(f"{API_BASE_URL}/delete-records", json=payload)
+                    response = api_client.post(f"{API_BASE_PATH}/delete-records", json=payload, retries=api_client.API_MAX_RETRIES)
                     response_data = response.json()
 
                     if response.status_code == 200:
@@ -156,7 +156,7 @@ def render_metadata_fetch_form():
             # 🔄 Enhanced API Request with Better Error Handling
             with st.spinner("⏳ Fetching metadata..."):
                 try:
-                    response = requests.post(f"{API_BASE_URL}/fetch-metadata", json=payload)
+                    response = api_client.post(f"{API_BASE_PATH}/fetch-metadata", json=payload, retries=api_client.API_MAX_RETRIES)
                     response.raise_for_status()  
                     metadata = response.json().get('metadata', [])
 
@@ -1,5 +1,5 @@
 import streamlit as st
-from frontend.app import pinecone_data_handler,common_functions
+from frontend.app import pinecone_data_handler,common_functions,api_client
 
 # # Page Configuration
 common_functions.config_homepage()
@@ -94,6 +94,14 @@ def render_admin_portal():
             st.divider()
             pinecone_data_handler.delete_records()
 
+    # Backend latency seen by this Streamlit process
+    with st.expander("📈 API Latency"):
+        latency = api_client.latency_summary()
+        if latency:
+            st.dataframe(latency, use_container_width=True)
+        else:
+            st.info("No API requests recorded yet.")
+
 # Call the function to render the Admin Portal
 if __name__ == "__main__":
     render_admin_portal()
\ No newline at end of file
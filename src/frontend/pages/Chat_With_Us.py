@@ -1,10 +1,13 @@
+import json
+import uuid
 import streamlit as st
 import requests
-from frontend.app import common_functions
+from frontend.app import common_functions, api_client
 from datetime import datetime
 
-API_URL = "http://localhost:8000/chat/get-health-advice/"
+STREAM_HEALTH_ADVICE_PATH = "/chat/stream-health-advice"
 NUMBER_OF_MESSAGES_TO_DISPLAY = 20
+SIDEBAR_CONVERSATIONS = 3
 common_functions.config_homepage()
 common_functions.set_page_title()
 # common_functions.set_bg_image("src/frontend/images/health_care_baner_2.jpg")
@@ -15,23 +18,36 @@ def initialize_conversation():
     
     return [{"role": "assistant", "content": assistant_message}]
 
-# Function to fetch advice from the API
-def fetch_health_advice(conversation_history):
+# Function to stream advice from the API token by token.
+# The server keeps the conversation's history, so only the new message is sent.
+def stream_health_advice(conversation_id, message):
     try:
-        response = requests.post(
-            API_URL,
-            json={"conversation_history": conversation_history}
-        )
-        response.raise_for_status()
-        return response.json().get("reply", "I couldn't process your request at the moment.")
+        with api_client.post(
+            STREAM_HEALTH_ADVICE_PATH,
+            json={"conversation_id": conversation_id, "message": message},
+            stream=True,
+            timeout=120
+        ) as response:
+            response.raise_for_status()
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    event = None
+                elif line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:") and event != "done":
+                    token = json.loads(line[len("data:"):]).get("token")
+                    if token:
+                        yield token
     except requests.exceptions.RequestException as e:
         st.error(f"API Connection Error: {e}")
-        return "I'm currently unable to respond. Please try again later."
+        yield "I'm currently unable to respond. Please try again later."
     
-conversation_ids = common_functions.get_bucket_items()
-if conversation_ids:
-    for conversation_id in conversation_ids[-3:]:
-        common_functions.display_chat_history(conversation_id)
+# One small request for the sidebar: the index already holds each conversation's preview
+conversation_page = common_functions.get_conversation_index(limit=SIDEBAR_CONVERSATIONS)
+if conversation_page:
+    for entry in conversation_page["conversations"]:
+        common_functions.display_chat_history(entry["conversation_id"], entry.get("preview", ""), last=NUMBER_OF_MESSAGES_TO_DISPLAY)
 
 def render_chatbot():
 
@@ -39,7 +55,8 @@ def render_chatbot():
         st.session_state.conversation_history = []
 
     if 'conversation_id' not in st.session_state:
-        st.session_state.conversation_id = datetime.now().strftime("%Y-%m-%d")
+        # Unique per chat session: stored history and server sessions are keyed by this ID
+        st.session_state.conversation_id = f"{datetime.now().strftime('%Y-%m-%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
     
     # Display chat history
     for message in st.session_state.conversation_history [-NUMBER_OF_MESSAGES_TO_DISPLAY:]:
@@ -62,22 +79,20 @@ def render_chatbot():
         # Display user's input
         user_avatar_image = "src/frontend/images/healthy.png"
         with st.chat_message('user',avatar=user_avatar_image):
-            common_functions.typewriter_effect(user_input)
+            st.markdown(user_input)
             
         # Append user input to session history
         st.session_state.conversation_history.append({"role": "user", "content": user_input})
         
-        # Fetch assistant response
-        assistant_reply = fetch_health_advice(st.session_state.conversation_history)
-
-        # Append assistant's reply to conversation history first
-        st.session_state.conversation_history.append({"role": "assistant", "content": assistant_reply})
-        common_functions.store_chat_history_in_db(st.session_state.conversation_id,st.session_state.conversation_history)
-
-        # Display only the assistant's latest response
+        # Stream the assistant's response as it is generated
         doctor_avatar_image = "src/frontend/images/chat_doctor_logo.png"
         with st.chat_message('assistant',avatar=doctor_avatar_image):
-            common_functions.typewriter_effect(assistant_reply)
+            assistant_reply = common_functions.stream_markdown(
+                stream_health_advice(st.session_state.conversation_id, user_input)
+            )
+
+        # Append assistant's reply to conversation history; the server stores the turn
+        st.session_state.conversation_history.append({"role": "assistant", "content": assistant_reply})
 
 if __name__ == "__main__":
     render_chatbot()